@@ -21,6 +21,23 @@ class AppStrings(StrEnum):
 
     select_generation_checkpoint = "Выберите файл поколения"
 
+    pause_button = "Пауза"
+    resume_button = "Продолжить"
+    cancel_button = "Отменить"
+
+    training_started = "Обучение запущено..."
+    training_progress = ("Поколение {generation}: лучший фитнес {best_fitness:.2f}, средний {mean_fitness:.2f}, "
+                         "видов {species}, {steps_per_second:.0f} кадров/с")
+    training_eta = ", осталось {eta}"
+    training_pausing = "Пауза после текущего поколения..."
+    training_paused = "Обучение приостановлено перед поколением {generation}"
+    training_resumed = "Обучение продолжено с поколения {generation}..."
+    training_running = "Обучение продолжается..."
+    training_cancelling = "Отмена после текущего поколения..."
+    training_cancelled = "Обучение отменено"
+    training_finished = "Обучение завершено, лучший фитнес {best_fitness:.2f}"
+    training_error = "Ошибка обучения"
+
 
 class NeatConfigStrings(StrEnum):
     ...
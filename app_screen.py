@@ -0,0 +1,137 @@
+"""The two-button launcher window. Training and replay import sources.main only when their button is pressed,
+so the window shows up without loading neat, pymunk and the rest of the training.
+Training runs in a background process, the window polls its progress and can pause, resume and cancel it."""
+
+from tkinter import Tk
+from customtkinter import (set_appearance_mode, set_default_color_theme, CTkLabel,
+                           CTkButton)
+from tkinter.filedialog import askopenfilename
+from tkinter.messagebox import showerror, showinfo
+from datetime import timedelta
+from app_consts import AppStrings
+from os.path import abspath
+from os import getcwd
+
+set_appearance_mode("Dark")
+set_default_color_theme("green")
+
+# Milliseconds between two looks at the progress of the training
+POLL_INTERVAL = 200
+
+
+class AppScreen(Tk):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.title("NEAT")
+        self.title_label = CTkLabel(self, text=AppStrings.neat_breakout_title, text_color="black",
+                                    font=("Roboto", 24, "bold"))
+        self.start_learning_button = CTkButton(self, text=AppStrings.start_learning_button, width=300,
+                                               command=self.start_learning)
+        self.load_generation_button = CTkButton(self, text=AppStrings.load_generation_button, width=300,
+                                                command=self.load_generation)
+        self.progress_label = CTkLabel(self, text="", text_color="black", wraplength=300)
+        self.pause_button = CTkButton(self, text=AppStrings.pause_button, width=145, command=self.toggle_pause)
+        self.cancel_button = CTkButton(self, text=AppStrings.cancel_button, width=145, command=self.cancel_learning)
+        self.current_sources_path = abspath(getcwd())
+        self.training = None
+        self.protocol("WM_DELETE_WINDOW", self.close)
+
+        self.grid_gui()
+
+        self.mainloop()
+
+    def grid_gui(self):
+        self.title_label.grid(row=0, column=0, padx=10, pady=10)
+        self.start_learning_button.grid(row=1, column=0, padx=10, pady=10)
+        self.load_generation_button.grid(row=2, column=0, padx=10, pady=10)
+
+    def grid_training(self):
+        self.progress_label.grid(row=3, column=0, padx=10, pady=10)
+        self.pause_button.grid(row=4, column=0, padx=10, pady=10, sticky="w")
+        self.cancel_button.grid(row=4, column=0, padx=10, pady=10, sticky="e")
+
+    def hide_training(self):
+        self.pause_button.grid_forget()
+        self.cancel_button.grid_forget()
+
+    def load_generation(self):
+        file_name = askopenfilename(defaultextension="", title=AppStrings.select_generation_checkpoint,
+                                    initialdir=self.current_sources_path, filetypes=(("NONE", "*"),))
+        try:
+            from sources.main import run_generation_checkpoint
+            run_generation_checkpoint(file_name)
+
+        except Exception:
+            showerror(title=AppStrings.loading_generation_file_error, message=AppStrings.select_correct_generation_file)
+
+    def start_learning(self):
+        config_path = askopenfilename(defaultextension=".txt", title=AppStrings.set_path_to_config_file,
+                                      initialdir=self.current_sources_path, filetypes=(("TXT", "*.txt"),))
+
+        if not config_path:
+            showerror(title=AppStrings.config_file_not_found, message=AppStrings.set_path_to_config_file)
+            return
+
+        from sources.training_process import TrainingProcess
+        self.training = TrainingProcess(config_path)
+        self.training.start()
+        self.start_learning_button.configure(state="disabled")
+        self.pause_button.configure(text=AppStrings.pause_button, state="normal")
+        self.cancel_button.configure(state="normal")
+        self.progress_label.configure(text=AppStrings.training_started)
+        self.grid_training()
+        self.after(POLL_INTERVAL, self.poll_training)
+
+    def poll_training(self):
+        for event in self.training.poll():
+            if event["type"] == "generation":
+                text = AppStrings.training_progress.format(**event)
+                if event["eta"] is not None:
+                    text += AppStrings.training_eta.format(eta=timedelta(seconds=round(event["eta"])))
+                if self.training.pause_event.is_set():
+                    text += "\n" + AppStrings.training_pausing
+                self.progress_label.configure(text=text)
+            elif event["type"] == "paused":
+                self.progress_label.configure(text=AppStrings.training_paused.format(**event))
+            elif event["type"] == "resumed":
+                self.progress_label.configure(text=AppStrings.training_resumed.format(**event))
+            elif event["type"] == "finished":
+                self.progress_label.configure(text=AppStrings.training_finished.format(**event))
+                showinfo(title=AppStrings.neat_breakout_title, message=AppStrings.training_finished.format(**event))
+            elif event["type"] == "cancelled":
+                self.progress_label.configure(text=AppStrings.training_cancelled)
+            elif event["type"] == "error":
+                self.progress_label.configure(text=AppStrings.training_error)
+                showerror(title=AppStrings.training_error, message=event["error"], detail=event["traceback"])
+
+        if self.training.finished:
+            self.training.join()
+            self.training = None
+            self.hide_training()
+            self.start_learning_button.configure(state="normal")
+        else:
+            self.after(POLL_INTERVAL, self.poll_training)
+
+    def toggle_pause(self):
+        if self.training.pause_event.is_set():
+            self.training.resume()
+            self.pause_button.configure(text=AppStrings.pause_button)
+            # Resumed before the pause began the training just goes on, without a resumed event
+            self.progress_label.configure(text=AppStrings.training_running)
+        else:
+            self.training.pause()
+            self.pause_button.configure(text=AppStrings.resume_button)
+            self.progress_label.configure(text=AppStrings.training_pausing)
+
+    def cancel_learning(self):
+        self.training.cancel()
+        self.pause_button.configure(state="disabled")
+        self.cancel_button.configure(state="disabled")
+        self.progress_label.configure(text=AppStrings.training_cancelling)
+
+    def close(self):
+        # A running training stops after its current generation
+        if self.training is not None:
+            self.training.cancel()
+        self.destroy()
+
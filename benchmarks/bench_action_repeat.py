@@ -0,0 +1,54 @@
+"""Fitness against throughput when the network decides only every few frames.
+
+The genomes of the generation 45 checkpoint play the same seeded episodes with their action held for 1, 2, 4
+and 8 frames, seeing the last observation or the mean of the interval's observations. Reports the network
+activations, the time per phase, the frames per second and the mean and best fitness. The genomes were trained
+deciding every frame, so the fitness shows what the interval costs a controller that was not trained for it.
+Stacked observations need more network inputs than these genomes have and are left out.
+
+Run from the repository root:
+    python -m benchmarks.bench_action_repeat
+"""
+
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+from sources.evaluation import play_episodes
+from sources.main import load_config
+from sources.profiling import profiler
+
+CHECKPOINT = "checkpoints/checkpoint_generation45"
+SEEDS = [42, 43]
+INTERVALS = (1, 2, 4, 8)
+
+
+def play(genomes: list, config) -> tuple[np.ndarray, float, dict, dict]:
+    evaluation_config = config.evaluation_config
+    profiler.enabled = True
+    profiler.take()
+    start = time.perf_counter()
+    fitness = play_episodes(genomes, config, SEEDS, evaluation_config.backend, evaluation_config.episode_limits())
+    seconds = time.perf_counter() - start
+    samples, counters = profiler.take()
+    profiler.enabled = False
+    return np.mean(fitness, axis=1), seconds, samples, counters
+
+
+if __name__ == "__main__":
+    genomes = list(neat.Checkpointer.restore_checkpoint(CHECKPOINT).population.values())
+    config = load_config("NeatConf.txt")
+    for mode in ("last", "mean"):
+        for interval in INTERVALS:
+            config.evaluation_config.decision_interval = interval
+            config.evaluation_config.observation_mode = mode
+            fitness, seconds, samples, counters = play(genomes, config)
+            activate, physics = sum(samples.get("activate", [])), sum(samples.get("physics", []))
+            print(f"{mode:>4} every {interval} frames: {counters.get('decisions', 0):>9} decisions, "
+                  f"activate {activate:6.2f} sec, physics {physics:6.2f} sec, total {seconds:6.2f} sec, "
+                  f"{counters.get('steps', 0) / seconds:9.0f} frames/sec, "
+                  f"fitness mean {fitness.mean():7.2f} best {fitness.max():7.2f}")
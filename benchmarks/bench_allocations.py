@@ -0,0 +1,110 @@
+"""Measures memory allocated by one tick of the game loop.
+
+The old tick formatted a state string for every shape and built a new tuple of inputs and a new output list for
+neat.nn.FeedForwardNetwork.activate. The current tick writes the observation into the buffer of the environment
+and activates the compiled network on it, a StateRecorder writes one row of its preallocated array.
+For every variant the transient bytes allocated inside a tick (tracemalloc peak above the memory before the tick)
+and the memory blocks left over after it are averaged over windows of ticks. Transient bytes have to stay flat
+from the first window to the last and nothing may be retained on average, free lists of the interpreter make
+single windows go up and down.
+
+Run from the repository root:
+    python -m benchmarks.bench_allocations
+"""
+
+import sys
+import tracemalloc
+
+import neat
+import numpy as np
+
+from sources.batch_network import create_batch_network
+from sources.breakout_env import BreakoutEnv
+from sources.main import choose_action
+from sources.state_recorder import StateRecorder
+
+CHECKPOINT = "checkpoints 04.01.2024 14_25/checkpoint_generation_30"
+WINDOWS = 5
+WINDOW_TICKS = 2000
+
+
+def old_tick(env: BreakoutEnv, network) -> float:
+    state = []
+    for x in env.space.shapes:
+        s = "%s %s %s" % (x, x.body.position, x.body.velocity)
+        state.append(s)
+    ball_x, ball_y = env.ball_body.position
+    player_x, player_y = env.player_body.position
+    output = network.activate((ball_x, ball_y, abs(player_x - ball_x), abs(player_y - ball_y)))
+    reward, _ = env.step(output.index(max(output)) - 1)
+    return reward
+
+
+def new_tick(env: BreakoutEnv, network) -> float:
+    reward, _ = env.step(choose_action(network, env.observation()))
+    return reward
+
+
+def measure(tick, env: BreakoutEnv, network) -> list[tuple[float, float]]:
+    """Average transient bytes and retained blocks per tick for every window."""
+    env.reset(42)
+    network.reset()
+    for _ in range(WINDOW_TICKS):
+        tick(env, network)
+
+    windows = []
+    for _ in range(WINDOWS):
+        transient = 0
+        blocks = sys.getallocatedblocks()
+        for _ in range(WINDOW_TICKS):
+            if env.done:
+                env.reset(42)
+                network.reset()
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            tick(env, network)
+            _, peak = tracemalloc.get_traced_memory()
+            transient += peak - current
+        windows.append((transient / WINDOW_TICKS, (sys.getallocatedblocks() - blocks) / WINDOW_TICKS))
+    return windows
+
+
+class StatelessNetwork:
+    """neat.nn.FeedForwardNetwork with the reset the measurements call."""
+
+    def __init__(self, network):
+        self.network = network
+
+    def activate(self, inputs):
+        return self.network.activate(inputs)
+
+    def reset(self):
+        pass
+
+
+if __name__ == "__main__":
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    config = population.config
+    config.genome_config.feed_forward = True
+    genome = max(population.population.values(), key=lambda g: len(g.connections))
+
+    env = BreakoutEnv()
+    tracemalloc.start()
+    results = {
+        "old tick": measure(old_tick, env, StatelessNetwork(neat.nn.FeedForwardNetwork.create(genome, config))),
+        "buffered tick": measure(new_tick, env, create_batch_network([genome], config)),
+    }
+    env.recorder = StateRecorder(WINDOW_TICKS * (WINDOWS + 1))
+    results["buffered tick + recorder"] = measure(new_tick, env, create_batch_network([genome], config))
+    tracemalloc.stop()
+
+    flat = True
+    for name, windows in results.items():
+        transient = np.array([w[0] for w in windows])
+        retained = np.array([w[1] for w in windows])
+        print(f"{name}: transient bytes per tick {np.round(transient).astype(int).tolist()}, "
+              f"retained blocks per tick {np.round(retained, 2).tolist()}")
+        if name != "old tick":
+            flat &= bool(transient.max() <= 1.1 * transient.min() + 64 and abs(retained.mean()) < 0.5)
+    print(f"flat: {flat}")
+    sys.exit(0 if flat else 1)
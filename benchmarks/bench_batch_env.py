@@ -0,0 +1,61 @@
+"""Compares environment-steps per second of the single-game loop and of BatchBreakoutEnv.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_env
+"""
+
+import time
+
+import numpy as np
+
+from sources.batch_env import BatchBreakoutEnv
+from sources.breakout_env import BreakoutEnv
+
+GAMES_COUNT = 20
+STEPS = 300
+
+
+def random_actions() -> np.ndarray:
+    return np.random.default_rng(0).integers(-1, 2, size=(STEPS, GAMES_COUNT))
+
+
+def single_loop(actions: np.ndarray) -> tuple[float, int, np.ndarray]:
+    envs = [BreakoutEnv() for _ in range(GAMES_COUNT)]
+    fitness = np.zeros(GAMES_COUNT)
+    steps = 0
+    start = time.perf_counter()
+    for i, env in enumerate(envs):
+        env.reset(i)
+        for step in range(STEPS):
+            if env.done:
+                break
+            env.observation()
+            reward, _ = env.step(int(actions[step, i]))
+            fitness[i] += reward
+            steps += 1
+    return time.perf_counter() - start, steps, fitness
+
+
+def batch(actions: np.ndarray) -> tuple[float, int, np.ndarray]:
+    env = BatchBreakoutEnv(GAMES_COUNT)
+    fitness = np.zeros(GAMES_COUNT)
+    steps = 0
+    start = time.perf_counter()
+    env.reset(range(GAMES_COUNT))
+    for step in range(STEPS):
+        if env.done.all():
+            break
+        steps += np.count_nonzero(~env.done)
+        _, rewards, _ = env.step(actions[step])
+        fitness += rewards
+    return time.perf_counter() - start, steps, fitness
+
+
+if __name__ == "__main__":
+    actions = random_actions()
+    single_seconds, single_steps, single_fitness = single_loop(actions)
+    batch_seconds, batch_steps, batch_fitness = batch(actions)
+    print(f"single game loop: {single_steps / single_seconds:.0f} env-steps/sec")
+    print(f"batch of {GAMES_COUNT}: {batch_steps / batch_seconds:.0f} env-steps/sec, "
+          f"x{(batch_steps / batch_seconds) / (single_steps / single_seconds):.2f}")
+    print(f"same fitness: {np.allclose(single_fitness, batch_fitness)}")
@@ -0,0 +1,113 @@
+"""Checks BatchFeedForwardNetwork against neat.nn.FeedForwardNetwork and BatchRecurrentNetwork against
+neat.nn.RecurrentNetwork and compares their speed.
+
+Genomes are evolved from NeatConf.txt with every node given a random activation and aggregation
+from the options listed there, so all of them are covered.
+
+Run from the repository root:
+    python -m benchmarks.bench_batch_network
+"""
+
+import random
+import sys
+import time
+
+import neat
+import numpy as np
+
+from sources.batch_network import BatchFeedForwardNetwork, BatchRecurrentNetwork
+from sources.compact_genome import genome_type
+from sources.speciation import species_set_type
+
+GENOMES_COUNT = 200
+MUTATIONS = 30
+INPUTS_COUNT = 200
+
+config = neat.config.Config(genome_type("NeatConf.txt"), neat.DefaultReproduction,
+                            species_set_type("NeatConf.txt"), neat.DefaultStagnation,
+                            "NeatConf.txt")
+
+
+def random_genomes() -> list[neat.DefaultGenome]:
+    genome_config = config.genome_config
+    activations = genome_config.activation_options
+    aggregations = genome_config.aggregation_options
+    genomes = []
+    for key in range(GENOMES_COUNT):
+        genome = config.genome_type(key)
+        genome.configure_new(genome_config)
+        for _ in range(MUTATIONS):
+            genome.mutate(genome_config)
+        for node in genome.nodes.values():
+            node.activation = random.choice(activations)
+            node.aggregation = random.choice(aggregations)
+        genomes.append(genome)
+    return genomes
+
+
+def check_feed_forward(genomes, inputs) -> bool:
+    networks = [neat.nn.FeedForwardNetwork.create(genome, config) for genome in genomes]
+    start = time.perf_counter()
+    expected = np.array([[network.activate(tuple(row[i])) for i, network in enumerate(networks)] for row in inputs])
+    python_seconds = time.perf_counter() - start
+
+    network = BatchFeedForwardNetwork.create(genomes, config)
+    start = time.perf_counter()
+    outputs = network.activate(inputs)
+    batch_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for row in inputs:
+        network.activate(row)
+    population_seconds = time.perf_counter() - start
+
+    error = np.abs(outputs - expected).max()
+    same_actions = np.array_equal(outputs.argmax(axis=-1), expected.argmax(axis=-1))
+    activations = INPUTS_COUNT * GENOMES_COUNT
+    print("feed forward")
+    print(f"max output error: {error:.2e}, same actions: {same_actions}")
+    print(f"FeedForwardNetwork.activate: {activations / python_seconds:.0f} genome activations/sec")
+    print(f"whole population per call: {activations / population_seconds:.0f} genome activations/sec")
+    print(f"whole batch in one call: {activations / batch_seconds:.0f} genome activations/sec")
+    return error < 1e-9
+
+
+def check_recurrent(genomes, inputs) -> bool:
+    """inputs is one episode, every row is the next step of all genomes. Half way through the network is
+    recompiled for every other genome and has to continue from their state."""
+    networks = [neat.nn.RecurrentNetwork.create(genome, config) for genome in genomes]
+    start = time.perf_counter()
+    expected = np.array([[network.activate(tuple(row[i])) for i, network in enumerate(networks)] for row in inputs])
+    python_seconds = time.perf_counter() - start
+
+    network = BatchRecurrentNetwork.create(genomes, config)
+    network.reset()
+    start = time.perf_counter()
+    outputs = np.array([network.activate(row) for row in inputs])
+    population_seconds = time.perf_counter() - start
+
+    kept = np.arange(0, GENOMES_COUNT, 2)
+    network.reset()
+    for row in inputs[:INPUTS_COUNT // 2]:
+        network.activate(row)
+    compacted = BatchRecurrentNetwork.create([genomes[i] for i in kept], config)
+    compacted.take_state(network, kept)
+    continued = np.array([compacted.activate(row[kept]) for row in inputs[INPUTS_COUNT // 2:]])
+
+    error = np.abs(outputs - expected).max()
+    compacted_error = np.abs(continued - expected[INPUTS_COUNT // 2:, kept]).max()
+    same_actions = np.array_equal(outputs.argmax(axis=-1), expected.argmax(axis=-1))
+    activations = INPUTS_COUNT * GENOMES_COUNT
+    print("recurrent")
+    print(f"max output error: {error:.2e}, after recompiling: {compacted_error:.2e}, same actions: {same_actions}")
+    print(f"RecurrentNetwork.activate: {activations / python_seconds:.0f} genome activations/sec")
+    print(f"whole population per call: {activations / population_seconds:.0f} genome activations/sec")
+    return error < 1e-9 and compacted_error < 1e-9
+
+
+if __name__ == "__main__":
+    random.seed(0)
+    genomes = random_genomes()
+    inputs = np.random.default_rng(0).uniform(-1000, 1000, size=(INPUTS_COUNT, GENOMES_COUNT, 4))
+    results = [check_feed_forward(genomes, inputs), check_recurrent(genomes, inputs)]
+    sys.exit(0 if all(results) else 1)
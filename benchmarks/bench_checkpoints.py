@@ -0,0 +1,142 @@
+"""Compares disk use and restore time of neat.Checkpointer and CheckpointStore.
+
+The shipped checkpoints are written into a store, then a longer run with a cheap fitness function is saved
+by both every generation. Every restored generation has to match the checkpoint it came from.
+
+Run from the repository root:
+    python -m benchmarks.bench_checkpoints
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+import neat
+
+from sources.checkpoint_store import CheckpointStore, PopulationCheckpointer
+from sources.fitness_cache import genome_hash
+from sources.compact_genome import genome_type
+from sources.speciation import species_set_type
+
+CHECKPOINTS = "checkpoints 04.01.2024 14_25"
+LONG_RUN_GENERATIONS = 100
+LONG_RUN_POPULATION = 100
+
+
+def directory_size(path: str, prefix: str = "") -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path) if name.startswith(prefix))
+
+
+def same_population(a: dict, b: dict) -> bool:
+    return (list(a) == list(b)
+            and all(genome_hash(a[key]) == genome_hash(b[key]) and a[key].fitness == b[key].fitness for key in a))
+
+
+def compare_restore(checkpoint_files: list[str], store: CheckpointStore, config) -> bool:
+    ok = True
+    checkpointer_seconds = store_seconds = 0.0
+    for generation, file_name in enumerate(checkpoint_files):
+        start = time.perf_counter()
+        expected = neat.Checkpointer.restore_checkpoint(file_name)
+        checkpointer_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        restored = store.restore(config, generation)
+        store_seconds += time.perf_counter() - start
+        ok &= same_population(expected.population, restored.population)
+        ok &= {sid: set(s.members) for sid, s in expected.species.species.items()} == \
+              {sid: set(s.members) for sid, s in restored.species.species.items()}
+
+    last = neat.Checkpointer.restore_checkpoint(checkpoint_files[-1])
+    key = next(iter(last.population))
+    start = time.perf_counter()
+    neat.Checkpointer.restore_checkpoint(checkpoint_files[-1]).population[key]
+    checkpointer_genome_seconds = time.perf_counter() - start
+    # A fresh store reads the index too
+    start = time.perf_counter()
+    genome = CheckpointStore(store.directory).load_genome(key, config)
+    store_genome_seconds = time.perf_counter() - start
+    ok &= genome_hash(genome) == genome_hash(last.population[key])
+
+    count = len(checkpoint_files)
+    print(f"  restore a generation: Checkpointer {checkpointer_seconds / count * 1000:.2f} ms, "
+          f"store {store_seconds / count * 1000:.2f} ms")
+    print(f"  load one genome: Checkpointer {checkpointer_genome_seconds * 1000:.2f} ms, "
+          f"store {store_genome_seconds * 1000:.2f} ms")
+    print(f"  restored generations match: {ok}")
+    return ok
+
+
+def shipped_checkpoints(directory: str) -> bool:
+    print(f"shipped checkpoints in {CHECKPOINTS!r}")
+    prefix = "checkpoint_generation_"
+    generations = sorted(int(name[len(prefix):]) for name in os.listdir(CHECKPOINTS) if name.startswith(prefix))
+    checkpoint_files = [os.path.join(CHECKPOINTS, f"{prefix}{generation}") for generation in generations]
+
+    store = CheckpointStore(directory)
+    for generation, file_name in zip(generations, checkpoint_files):
+        population = neat.Checkpointer.restore_checkpoint(file_name)
+        store.save_generation(population.config, population.population, population.species, generation)
+    config = population.config
+
+    checkpointer_bytes = directory_size(CHECKPOINTS, prefix)
+    store_bytes = directory_size(directory)
+    print(f"  disk: Checkpointer {checkpointer_bytes / 1024:.0f} KiB, store {store_bytes / 1024:.0f} KiB, "
+          f"x{checkpointer_bytes / store_bytes:.1f} smaller")
+    return compare_restore(checkpoint_files, store, config)
+
+
+def long_run(directory: str) -> bool:
+    print(f"run of {LONG_RUN_GENERATIONS} generations with {LONG_RUN_POPULATION} genomes")
+    config = neat.config.Config(genome_type("NeatConf.txt"), neat.DefaultReproduction,
+                                species_set_type("NeatConf.txt"), neat.DefaultStagnation,
+                                "NeatConf.txt")
+    config.pop_size = LONG_RUN_POPULATION
+    config.no_fitness_termination = True
+
+    def eval_genomes(genomes, config):
+        # Cheap stand-in for playing the game, fitness grows with the size of the network
+        for _, genome in genomes:
+            genome.fitness = len(genome.connections) + random.random()
+
+    random.seed(0)
+    checkpoints_directory = os.path.join(directory, "checkpointer")
+    os.makedirs(checkpoints_directory)
+    prefix = os.path.join(checkpoints_directory, "checkpoint_generation_")
+    checkpointer = PopulationCheckpointer(None, None, prefix)
+    store = CheckpointStore(os.path.join(directory, "store"))
+    population = neat.Population(config)
+
+    # Both save the state their end_generation gets, the state population.run leaves behind
+    checkpointer_seconds = 0.0
+    store_seconds = []
+    for generation in range(LONG_RUN_GENERATIONS):
+        population.run(eval_genomes, 1)
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            checkpointer.save_checkpoint(config, population.population, population.species, generation)
+        checkpointer_seconds += time.perf_counter() - start
+        start = time.perf_counter()
+        store.save_generation(config, population.population, population.species, generation)
+        store_seconds.append(time.perf_counter() - start)
+
+    checkpointer_bytes = directory_size(checkpoints_directory)
+    store_bytes = directory_size(store.directory)
+    print(f"  disk: Checkpointer {checkpointer_bytes / 1024:.0f} KiB, store {store_bytes / 1024:.0f} KiB, "
+          f"x{checkpointer_bytes / store_bytes:.1f} smaller")
+    print(f"  save a generation: Checkpointer {checkpointer_seconds / LONG_RUN_GENERATIONS * 1000:.2f} ms, "
+          f"store {sum(store_seconds) / LONG_RUN_GENERATIONS * 1000:.2f} ms, the first ten "
+          f"{sum(store_seconds[:10]) * 100:.2f} ms, the last ten {sum(store_seconds[-10:]) * 100:.2f} ms")
+
+    checkpoint_files = [f"{prefix}{generation}" for generation in range(LONG_RUN_GENERATIONS)]
+    return compare_restore(checkpoint_files, store, config)
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        results = [shipped_checkpoints(os.path.join(directory, "shipped")),
+                   long_run(os.path.join(directory, "long"))]
+    sys.exit(0 if all(results) else 1)
@@ -0,0 +1,104 @@
+"""Memory and pickling of DefaultGenome and CompactGenome populations.
+
+Populations of 20, 200 and 2000 genomes of both types evolve from the same random seed with random fitness, so
+their structure grows like in training. Checks that both evolved the same genomes, then reports the memory a
+genome of the last generation takes, measured while unpickling the population, and how long pickling it for the
+worker processes and checkpoints and unpickling it take.
+
+Run from the repository root:
+    python -m benchmarks.bench_compact_genome
+"""
+
+import configparser
+import os
+import pickle
+import random
+import tempfile
+import time
+import tracemalloc
+
+import neat
+from neat.reporting import ReporterSet
+
+from sources.compact_genome import CompactGenome
+from sources.fitness_cache import genome_hash
+
+POPULATION_SIZES = (20, 200, 2000)
+GENERATIONS = 10
+REPEATS = 5
+SEED = 0
+
+
+def genome_config(genome_type, directory: str) -> neat.config.Config:
+    """NeatConf.txt with its genome section named after genome_type."""
+    parser = configparser.ConfigParser()
+    parser.read("NeatConf.txt")
+    section = next(name for name in ("DefaultGenome", "CompactGenome") if parser.has_section(name))
+    parser[genome_type.__name__] = parser[section]
+    if section != genome_type.__name__:
+        parser.remove_section(section)
+    path = os.path.join(directory, f"{genome_type.__name__}.txt")
+    with open(path, "w") as f:
+        parser.write(f)
+    return neat.config.Config(genome_type, neat.DefaultReproduction, neat.DefaultSpeciesSet,
+                              neat.DefaultStagnation, path)
+
+
+def evolve(config, size: int) -> dict:
+    random.seed(SEED)
+    config.pop_size = size
+    reporters = ReporterSet()
+    stagnation = config.stagnation_type(config.stagnation_config, reporters)
+    reproduction = config.reproduction_type(config.reproduction_config, reporters, stagnation)
+    species_set = config.species_set_type(config.species_set_config, reporters)
+    population = reproduction.create_new(config.genome_type, config.genome_config, size)
+    for generation in range(GENERATIONS):
+        species_set.speciate(config, population, generation)
+        for genome in population.values():
+            genome.fitness = random.random()
+        population = reproduction.reproduce(config, species_set, size, generation)
+    return population
+
+
+def best_seconds(function) -> float:
+    seconds = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        function()
+        seconds.append(time.perf_counter() - start)
+    return min(seconds)
+
+
+def unpickled_size(data: bytes) -> int:
+    tracemalloc.start()
+    population = pickle.loads(data)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del population
+    return size
+
+
+if __name__ == "__main__":
+    with tempfile.TemporaryDirectory() as directory:
+        configs = {genome_type.__name__: genome_config(genome_type, directory)
+                   for genome_type in (neat.DefaultGenome, CompactGenome)}
+    for size in POPULATION_SIZES:
+        populations = {name: evolve(config, size) for name, config in configs.items()}
+        hashes = {name: [genome_hash(g) for g in population.values()] for name, population in populations.items()}
+        genes = sum(len(g.nodes) + len(g.connections) for g in populations["DefaultGenome"].values()) / size
+        print(f"population {size}, {genes:.1f} genes per genome, "
+              f"same genomes: {hashes['DefaultGenome'] == hashes['CompactGenome']}")
+        baseline = None
+        for name, population in populations.items():
+            data = pickle.dumps(population, pickle.HIGHEST_PROTOCOL)
+            restored = pickle.loads(data)
+            exact = [genome_hash(g) for g in restored.values()] == hashes[name] and \
+                [g.fitness for g in restored.values()] == [g.fitness for g in population.values()]
+            memory = unpickled_size(data) / size
+            dump = best_seconds(lambda: pickle.dumps(population, pickle.HIGHEST_PROTOCOL))
+            load = best_seconds(lambda: pickle.loads(data))
+            baseline = baseline or (memory, len(data), dump, load)
+            print(f"  {name:<14} {memory:8.0f} bytes per genome ({baseline[0] / memory:.1f}x), "
+                  f"pickle {len(data) / size:6.0f} bytes per genome ({baseline[1] / len(data):.1f}x), "
+                  f"dumps {1000 * dump:7.2f} ms ({baseline[2] / dump:.1f}x), "
+                  f"loads {1000 * load:7.2f} ms ({baseline[3] / load:.1f}x), round trip exact: {exact}")
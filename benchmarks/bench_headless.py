@@ -0,0 +1,44 @@
+"""Compares evaluation speed of the headless mode with the rendered one.
+
+Run from the repository root:
+    python -m benchmarks.bench_headless
+"""
+
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+
+from sources import main as game
+from sources.compact_genome import genome_type
+from sources.speciation import species_set_type
+
+GENOMES_COUNT = 5
+
+
+config = neat.config.Config(genome_type("NeatConf.txt"), neat.DefaultReproduction,
+                            species_set_type("NeatConf.txt"), neat.DefaultStagnation,
+                            "NeatConf.txt")
+
+
+def evaluate(headless: bool) -> float:
+    random.seed(0)
+    population = neat.Population(config)
+    genomes = list(population.population.items())[:GENOMES_COUNT]
+
+    start = time.perf_counter()
+    game.eval_genomes(genomes, config, headless=headless)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    rendered = evaluate(headless=False)
+    headless = evaluate(headless=True)
+    for name, seconds in (("rendered", rendered), ("headless", headless)):
+        print(f"{name}: {GENOMES_COUNT / seconds:.2f} genomes/sec, "
+              f"{3600 / (seconds * config.pop_size / GENOMES_COUNT):.1f} generations/hour "
+              f"(pop_size = {config.pop_size})")
+    print(f"speedup: x{rendered / headless:.1f}")
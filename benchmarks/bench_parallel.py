@@ -0,0 +1,49 @@
+"""Measures how evaluation of one generation scales with the number of pool workers
+and checks that pooled fitness matches serial fitness.
+
+Run from the repository root:
+    python -m benchmarks.bench_parallel
+"""
+
+import multiprocessing
+import random
+import time
+
+import neat
+
+from sources import main as game
+from sources.evaluation_config import EvaluationConfig
+from sources.compact_genome import genome_type
+from sources.speciation import species_set_type
+
+config = neat.config.Config(genome_type("NeatConf.txt"), neat.DefaultReproduction,
+                            species_set_type("NeatConf.txt"), neat.DefaultStagnation,
+                            "NeatConf.txt")
+config.evaluation_config = EvaluationConfig("NeatConf.txt")
+# The fitness cache lives as long as the process, every run has to play all genomes again
+config.evaluation_config.fitness_cache_size = 0
+
+
+def evaluate(pool) -> tuple[float, list[float]]:
+    random.seed(0)
+    genomes = list(neat.Population(config).population.items())
+
+    start = time.perf_counter()
+    game.eval_genomes(genomes, config, pool=pool)
+    return time.perf_counter() - start, [g.fitness for _, g in genomes]
+
+
+if __name__ == "__main__":
+    # The first run of every process builds its batch environment, it is left out
+    evaluate(None)
+    serial_seconds, serial_fitness = evaluate(None)
+    print(f"serial: {config.pop_size / serial_seconds:.2f} genomes/sec")
+
+    workers = 1
+    while workers <= min(multiprocessing.cpu_count(), config.pop_size):
+        with multiprocessing.Pool(workers) as pool:
+            evaluate(pool)
+            seconds, fitness = evaluate(pool)
+        print(f"{workers} workers: {config.pop_size / seconds:.2f} genomes/sec, "
+              f"x{serial_seconds / seconds:.2f}, same fitness as serial: {fitness == serial_fitness}")
+        workers *= 2
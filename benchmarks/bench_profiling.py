@@ -0,0 +1,49 @@
+"""Overhead of the profiler on headless evaluation.
+
+Times play_genomes with the profiler disabled, only counting like during training from the GUI and enabled,
+and the cost of one disabled phase, which is all instrumented code pays when nobody profiles.
+
+Run from the repository root:
+    python -m benchmarks.bench_profiling
+"""
+
+import time
+import timeit
+
+import neat
+
+from sources.evaluation import play_genomes
+from sources.evaluation_config import EvaluationConfig
+from sources.profiling import profiler
+
+CHECKPOINT = "checkpoints 04.01.2024 14_25/checkpoint_generation_30"
+REPEATS = 3
+
+
+def evaluation_seconds(genomes: list, config, enabled: bool, counting: bool = False) -> float:
+    profiler.enabled = enabled
+    profiler.counting = counting
+    limits = EvaluationConfig("NeatConf.txt").episode_limits()
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        play_genomes(genomes, config, 42, "numpy", limits)
+        best = min(best, time.perf_counter() - start)
+    profiler.enabled = profiler.counting = False
+    profiler.take()
+    return best
+
+
+if __name__ == "__main__":
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    genomes = list(population.population.values())
+    disabled = evaluation_seconds(genomes, population.config, False)
+    counting = evaluation_seconds(genomes, population.config, False, True)
+    enabled = evaluation_seconds(genomes, population.config, True)
+
+    calls = 1_000_000
+    phase_seconds = timeit.timeit("with profiler.phase('physics'): pass", globals=globals(), number=calls)
+    print(f"play_genomes: disabled {disabled:.3f} sec, counting {counting:.3f} sec, enabled {enabled:.3f} sec, "
+          f"overhead when counting {100 * (counting / disabled - 1):.1f}%, "
+          f"when enabled {100 * (enabled / disabled - 1):.1f}%")
+    print(f"one disabled phase: {phase_seconds / calls * 1e9:.0f} ns")
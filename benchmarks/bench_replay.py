@@ -0,0 +1,60 @@
+"""Recorded episodes against playing a generation again.
+
+The genomes of the generation 45 checkpoint are evaluated with recording on, their episodes are written to an
+action log and read back. Reports the size of the log, how long replaying the best genome's episode takes next
+to evaluating the whole generation and whether every replayed episode scores its recorded fitness exactly.
+
+Run from the repository root:
+    python -m benchmarks.bench_replay
+"""
+
+import os
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+from sources.action_log import ActionLog, save_action_log
+from sources.main import eval_genomes, load_config
+
+CHECKPOINT = "checkpoints/checkpoint_generation45"
+
+if __name__ == "__main__":
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT).population
+    config = load_config("NeatConf.txt")
+    config.evaluation_config.record_actions = True
+    config.evaluation_config.fitness_cache_size = 0
+    start = time.perf_counter()
+    eval_genomes(list(population.items()), config)
+    generation_seconds = time.perf_counter() - start
+
+    path = os.path.join(tempfile.mkdtemp(), "actions_generation_45.npz")
+    save_action_log(path, population, config, 45)
+    start = time.perf_counter()
+    log = ActionLog(path)
+    load_seconds = time.perf_counter() - start
+    episodes = log.frames.size
+    print(f"log of {len(log.genome_keys)} genomes, {episodes} episodes, {log.frames.sum()} frames: "
+          f"{os.path.getsize(path) / 1024:.1f} KiB, {os.path.getsize(path) / episodes:.0f} bytes per episode, "
+          f"loaded in {1000 * load_seconds:.2f} ms")
+
+    best = log.best_genome_key()
+    row = log.rows[best]
+    for episode in range(log.episodes):
+        start = time.perf_counter()
+        fitness = log.replay(best, episode)
+        seconds = time.perf_counter() - start
+        print(f"best genome {best}, episode {episode}: {log.frames[row, episode]} frames replayed in "
+              f"{1000 * seconds:.1f} ms (generation {generation_seconds:.2f} sec), fitness {fitness:.3f}, "
+              f"recorded {log.episode_fitness[row, episode]:.3f}")
+
+    start = time.perf_counter()
+    mismatches = log.verify()
+    print(f"replayed all {episodes} episodes in {time.perf_counter() - start:.2f} sec, "
+          f"{len(mismatches)} differ from their recorded fitness")
+    for key, episode, recorded, replayed in mismatches[:10]:
+        print(f"  genome {key} episode {episode}: recorded {recorded:.6f}, replayed {replayed:.6f}, "
+              f"off by {np.abs(recorded - replayed):.2e}")
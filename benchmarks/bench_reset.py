@@ -0,0 +1,42 @@
+"""Per-episode setup cost of BreakoutEnv.
+
+Times a reset of a played environment against building the scene from scratch, which is what every game
+cost before environments restored their scene, and checks that a reused environment plays a genome
+exactly like a new one after it has played other genomes.
+
+Run from the repository root:
+    python -m benchmarks.bench_reset
+"""
+
+import timeit
+
+import neat
+
+from sources.batch_network import create_batch_network
+from sources.breakout_env import BreakoutEnv
+from sources.evaluation_config import EvaluationConfig
+from sources.main import main
+
+CHECKPOINT = "checkpoints 04.01.2024 14_25/checkpoint_generation_30"
+RESETS = 1000
+SEED = 42
+
+
+def play(env: BreakoutEnv, genome, config, limits) -> float:
+    return main(env, create_batch_network([genome], config), SEED, True, limits)
+
+
+if __name__ == "__main__":
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    genomes = list(population.population.values())
+    limits = EvaluationConfig("NeatConf.txt").episode_limits()
+
+    env = BreakoutEnv()
+    play(env, genomes[0], population.config, limits)
+    reset = min(timeit.repeat(lambda: env.reset(SEED), number=RESETS, repeat=3)) / RESETS
+    build = min(timeit.repeat(BreakoutEnv, number=RESETS // 10, repeat=3)) / (RESETS // 10)
+    print(f"reset {reset * 1e6:.1f} us, new scene {build * 1e6:.1f} us, x{build / reset:.0f} faster")
+
+    fresh = [play(BreakoutEnv(), genome, population.config, limits) for genome in genomes]
+    reused = [play(env, genome, population.config, limits) for genome in reversed(genomes)][::-1]
+    print(f"reused environment plays like a new one: {fresh == reused}")
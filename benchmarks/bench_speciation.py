@@ -0,0 +1,84 @@
+"""Speciation time per generation with neat's DefaultSpeciesSet and with VectorSpeciesSet.
+
+Populations of 20, 200 and 2000 genomes evolve for a few generations with random fitness, so their structure grows
+like in training. They are speciated with the compatibility threshold of NeatConf.txt, which keeps the trained
+populations in a single species, and with lower thresholds that split them into many. Every generation is speciated
+by DefaultSpeciesSet, by VectorSpeciesSet without and with its distance cache, each keeping its own species.
+Reports the median time per generation, the cache hits and whether all three placed every genome in the same
+species with the same representatives.
+
+Run from the repository root:
+    python -m benchmarks.bench_speciation
+"""
+
+import itertools
+import random
+import time
+from types import SimpleNamespace
+
+import neat
+import numpy as np
+from neat.reporting import ReporterSet
+
+from sources.main import load_config
+from sources.speciation import VectorSpeciesSet
+
+POPULATION_SIZES = (20, 200, 2000)
+COMPATIBILITY_THRESHOLDS = (None, 1.0)
+GENERATIONS = 8
+DISTANCE_CACHE_SIZE = 200000
+SEED = 0
+
+
+def speciate(species_set, config, population: dict, generation: int) -> float:
+    start = time.perf_counter()
+    species_set.speciate(config, population, generation)
+    return time.perf_counter() - start
+
+
+def assignment(species_set) -> tuple:
+    representatives = {sid: s.representative.key for sid, s in species_set.species.items()}
+    return species_set.genome_to_species, representatives
+
+
+if __name__ == "__main__":
+    config = load_config("NeatConf.txt")
+    for threshold, size in itertools.product(COMPATIBILITY_THRESHOLDS, POPULATION_SIZES):
+        threshold = threshold or config.species_set_config.compatibility_threshold
+        random.seed(SEED)
+        config.pop_size = size
+        reporters = ReporterSet()
+        stagnation = config.stagnation_type(config.stagnation_config, reporters)
+        reproduction = config.reproduction_type(config.reproduction_config, reporters, stagnation)
+        population = reproduction.create_new(config.genome_type, config.genome_config, size)
+        species_sets = {
+            "DefaultSpeciesSet": neat.DefaultSpeciesSet(SimpleNamespace(compatibility_threshold=threshold), reporters),
+            "vector": VectorSpeciesSet(SimpleNamespace(compatibility_threshold=threshold, distance_cache_size=0),
+                                       reporters),
+            "vector, cached": VectorSpeciesSet(SimpleNamespace(compatibility_threshold=threshold,
+                                                               distance_cache_size=DISTANCE_CACHE_SIZE), reporters)}
+        seconds = {name: [] for name in species_sets}
+        differences = 0
+        for generation in range(GENERATIONS):
+            for name, species_set in species_sets.items():
+                seconds[name].append(speciate(species_set, config, population, generation))
+            expected = assignment(species_sets["DefaultSpeciesSet"])
+            differences += sum(assignment(s) != expected for s in species_sets.values())
+            for genome in population.values():
+                genome.fitness = random.random()
+            population = reproduction.reproduce(config, species_sets["DefaultSpeciesSet"], size, generation)
+            # Reproduction drops the stagnant species of the species set it is given and reorders the rest,
+            # which decides the order new representatives are chosen in, the others follow it
+            for species_set in species_sets.values():
+                species_set.species = {sid: species_set.species[sid]
+                                       for sid in species_sets["DefaultSpeciesSet"].species}
+
+        default = np.median(seconds["DefaultSpeciesSet"])
+        cached = species_sets["vector, cached"].distances
+        genes = np.mean([len(g.nodes) + len(g.connections) for g in population.values()])
+        print(f"population {size}, threshold {threshold}: {len(species_sets['DefaultSpeciesSet'].species)} species, "
+              f"{genes:.1f} genes per genome, {differences} speciations differ")
+        for name, times in seconds.items():
+            median = np.median(times)
+            print(f"  {name:<18} {1000 * median:9.2f} ms per generation, {default / median:6.1f}x")
+        print(f"  distance cache: {cached.hits} hits, {cached.misses} misses, {len(cached.pairs) // 2} pairs kept")
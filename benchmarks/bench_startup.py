@@ -0,0 +1,48 @@
+"""Import time of the launcher and of the modules training and its worker processes start from.
+
+Every module is imported in a fresh interpreter, the best of a few runs is reported together with the heavy
+packages the import pulled in. The launcher window and the evaluation workers should load none of the GUI and
+plotting packages they do not use.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup
+"""
+
+import json
+import subprocess
+import sys
+
+REPEATS = 5
+HEAVY = ("customtkinter", "tkinter", "pygame", "matplotlib", "graphviz", "neat", "pymunk", "numpy")
+MODULES = ("start_app", "app_screen", "sources.main", "sources.evaluation", "sources.distributed")
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+try:
+    import {module}
+    error = None
+except ImportError as e:
+    error = repr(e)
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "error": error,
+                  "loaded": [name for name in {heavy!r} if name in sys.modules]}}))
+"""
+
+
+def measure(module: str) -> dict:
+    runs = []
+    for _ in range(REPEATS):
+        output = subprocess.run([sys.executable, "-c", PROBE.format(module=module, heavy=HEAVY)],
+                                capture_output=True, text=True, check=True,
+                                env={"PYGAME_HIDE_SUPPORT_PROMPT": "1"}).stdout
+        runs.append(json.loads(output.splitlines()[-1]))
+    return min(runs, key=lambda run: run["seconds"])
+
+
+if __name__ == "__main__":
+    for module in MODULES:
+        result = measure(module)
+        status = f" (import failed: {result['error']})" if result["error"] else ""
+        print(f"{module:<22} {1000 * result['seconds']:8.1f} ms  loads {', '.join(result['loaded']) or 'nothing heavy'}"
+              f"{status}")
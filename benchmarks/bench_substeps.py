@@ -0,0 +1,69 @@
+"""Longer frames with adaptive substeps against the default 1 / fps frames.
+
+A paddle that follows the ball plays the same seeds twice: once with default frames and its action held for
+a few of them, once with frames that many times as long that pymunk splits into default steps only near
+a collision. Reports the steps of the space, the time and how far the ball paths drift apart. Bounces off the
+tilted paddle normal and brick corners grow rounding differences, so the paths are compared over the first
+seconds of play and by the time the ball is one pixel apart.
+
+Run from the repository root:
+    python -m benchmarks.bench_substeps
+"""
+
+import time
+
+import numpy as np
+
+from sources.breakout_env import BreakoutEnv, fps
+
+SEEDS = range(10)
+TICKS = 6000
+COMPARED_TICKS = 2 * fps
+
+
+def follow_ball(env: BreakoutEnv) -> int:
+    offset = env.ball_body.position.x - env.player_body.position.x
+    return 0 if abs(offset) < 20 else int(np.sign(offset))
+
+
+def compare(frame_ticks: int):
+    physics_steps = np.zeros(2, dtype=np.int64)
+    seconds = np.zeros(2)
+    close = 0
+    apart_ticks = []
+    for seed in SEEDS:
+        default, long = BreakoutEnv(), BreakoutEnv(frame_ticks / fps, 1 / fps)
+        default.reset(seed)
+        long.reset(seed)
+        early_error = 0.0
+        apart = TICKS
+        for frame in range(TICKS // frame_ticks):
+            action = follow_ball(default)
+            start = time.perf_counter()
+            for _ in range(frame_ticks):
+                default.step(action)
+            middle = time.perf_counter()
+            long.step(action)
+            seconds += middle - start, time.perf_counter() - middle
+
+            error = float(np.hypot(*(default.ball_body.position - long.ball_body.position)))
+            ticks = (frame + 1) * frame_ticks
+            if ticks <= COMPARED_TICKS:
+                early_error = max(early_error, error)
+            if error > 1 and apart == TICKS:
+                apart = ticks
+            if default.done or long.done:
+                break
+        close += early_error < 1e-6
+        apart_ticks.append(apart)
+        physics_steps += default.physics_steps, long.physics_steps
+
+    print(f"frames of {frame_ticks} ticks: space steps {physics_steps[0]} -> {physics_steps[1]} "
+          f"(x{physics_steps[0] / physics_steps[1]:.2f} fewer), {seconds[0]:.3f} -> {seconds[1]:.3f} sec, "
+          f"{close} of {len(SEEDS)} paths within 1e-6 px for the first {COMPARED_TICKS} ticks, "
+          f"paths 1 px apart after a median of {int(np.median(apart_ticks))} ticks")
+
+
+if __name__ == "__main__":
+    for frame_ticks in (2, 4, 8):
+        compare(frame_ticks)
@@ -0,0 +1,69 @@
+"""Training in a background process, driven the way the GUI drives it.
+
+A short run with a small episode budget is started in a temporary directory. The script polls it like the window
+does, pauses it after the first generation, resumes it after a second and cancels it after the next generation.
+Reports every event, how long a poll takes, which must not be noticeable on the GUI thread, and how long the
+events took to arrive.
+
+Run from the repository root:
+    python -m benchmarks.bench_training_process
+"""
+
+import configparser
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from sources.training_process import TrainingProcess
+
+GENERATIONS = 5
+POLL_INTERVAL = 0.2
+
+
+def small_config(directory: str) -> str:
+    parser = configparser.ConfigParser()
+    parser.read("NeatConf.txt")
+    parser["BreakoutEvaluation"]["episodes"] = "1"
+    parser["BreakoutEvaluation"]["max_steps"] = "3000"
+    parser["BreakoutEvaluation"]["num_workers"] = "1"
+    path = os.path.join(directory, "config.txt")
+    with open(path, "w") as f:
+        parser.write(f)
+    return path
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    training = TrainingProcess(small_config(directory), GENERATIONS, directory)
+    start = time.perf_counter()
+    training.start()
+    poll_seconds = []
+    generations = 0
+    resume_at = None
+    while not training.finished:
+        time.sleep(POLL_INTERVAL)
+        poll_start = time.perf_counter()
+        events = training.poll()
+        poll_seconds.append(time.perf_counter() - poll_start)
+        for event in events:
+            print(f"{time.perf_counter() - start:7.2f} sec  {event}")
+            if event["type"] == "generation":
+                generations += 1
+                if generations == 1:
+                    training.pause()
+                elif generations == 2:
+                    training.cancel()
+            elif event["type"] == "paused":
+                resume_at = time.perf_counter() + 1.0
+        if resume_at is not None and time.perf_counter() >= resume_at:
+            training.resume()
+            resume_at = None
+    training.join()
+    shutil.rmtree(directory)
+
+    poll_seconds = np.array(poll_seconds) * 1e6
+    print(f"{len(poll_seconds)} polls: p50 {np.percentile(poll_seconds, 50):.0f} us, "
+          f"max {poll_seconds.max():.0f} us, exit code {training.process.exitcode}")
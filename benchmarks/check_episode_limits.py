@@ -0,0 +1,81 @@
+"""Checks that the fitness target of EpisodeLimits ends hopeless episodes early and only those.
+
+The remaining reward bound counts one paddle hit every min_hit_interval frames and both engines pay no hit sooner, so
+first the genomes of the generation 45 checkpoint play on both backends and no two hits of a game may be closer.
+Then they play with a step budget once without and once with a fitness target: every game that reaches the target
+has to be played to the same end, the others have to stop before the step budget runs out.
+
+Run from the repository root, benchmarks/run_benchmarks.py runs it with the benchmarks:
+    python -m benchmarks.check_episode_limits
+"""
+
+import os
+import sys
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+from sources.batch_env import make_batch_env, PLAYER_HIT
+from sources.batch_network import create_batch_network
+from sources.episode_limits import EpisodeLimits
+from sources.evaluation import play_genomes, choose_actions
+from sources.main import load_config
+
+CHECKPOINT = "checkpoints/checkpoint_generation45"
+SEED = 42
+MAX_STEPS = 3000
+FITNESS_TARGET = 300
+
+
+def check_hit_interval(genomes: list, config) -> bool:
+    """No game pays two paddle hits closer than EpisodeLimits.min_hit_interval frames."""
+    interval = EpisodeLimits().min_hit_interval
+    network = create_batch_network(genomes, config)
+    ok = True
+    for backend in ("pymunk", "numpy"):
+        env = make_batch_env(len(genomes), backend)
+        observation = env.reset(SEED)
+        network.reset()
+        last_hit = np.full(len(genomes), -interval)
+        closest = np.inf
+        while not env.done.all() and env.steps.max() < MAX_STEPS:
+            observation, _, _ = env.step(choose_actions(network.activate(observation)))
+            hit = env.events[:, PLAYER_HIT] > 0
+            if hit.any():
+                closest = min(closest, (env.steps[hit] - last_hit[hit]).min())
+                last_hit[hit] = env.steps[hit]
+        ok &= bool(closest >= interval)
+        print(f"{backend}: closest paddle hits {closest} frames apart, bound assumes {interval}")
+    return ok
+
+
+def check_early_stop(genomes: list, config) -> bool:
+    """Games that can not reach the target stop early, the others are played as without it."""
+    results = []
+    for target in (None, FITNESS_TARGET):
+        log = []
+        fitness = play_genomes(genomes, config, SEED, limits=EpisodeLimits(MAX_STEPS, 0, target), log=log)
+        results.append((np.array(fitness), np.array([frames for frames, _ in log])))
+    (fitness, frames), (target_fitness, target_frames) = results
+    reached = fitness >= FITNESS_TARGET
+    kept = bool(np.all(target_fitness[reached] == fitness[reached])
+                and np.all(target_frames[reached] == frames[reached]))
+    hopeless = ~reached & (frames == MAX_STEPS)
+    cut = bool(hopeless.any() and np.all(target_frames[hopeless] < MAX_STEPS))
+    print(f"{reached.sum()} of {len(genomes)} games reach {FITNESS_TARGET} and are played as without the target: "
+          f"{kept}")
+    print(f"{hopeless.sum()} hopeless games run out of steps without the target, with it they stop after "
+          f"{target_frames[hopeless].tolist()} of {MAX_STEPS} frames: {cut}")
+    return kept and cut
+
+
+def run() -> bool:
+    genomes = list(neat.Checkpointer.restore_checkpoint(CHECKPOINT).population.values())
+    config = load_config("NeatConf.txt")
+    return all([check_hit_interval(genomes, config), check_early_stop(genomes, config)])
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
@@ -0,0 +1,191 @@
+"""Parity checks and throughput of the pymunk and the NumPy physics backends.
+
+pymunk detects a collision after the ball already moved into a wall or a brick and reflects it there, the NumPy
+engine sweeps the ball and reflects it exactly at the surface. So free flight has to match exactly and every bounce
+may shift the trajectory by at most one frame of travel, and an event by a frame. Both pay a paddle hit once per
+contact of a ball coming down onto the paddle, so every paddle bounce is paid exactly once. Where the ball runs into
+the seam between two bricks, pymunk pushes it out sideways and it drills up through both columns, while the NumPy
+engine bounces it off the face it reaches first, so the games of the shipped genomes are compared over the first
+HORIZON frames only. Over whole episodes the games drift apart and fitness can differ by a factor of two, so there
+the genomes only have to be ranked alike: the rank correlation of their fitness averaged over EPISODE_SEEDS has to
+reach MIN_RANK_CORRELATION.
+
+Run from the repository root, benchmarks/run_benchmarks.py runs it with the benchmarks:
+    python -m benchmarks.parity_backends
+"""
+
+import sys
+import time
+
+import neat
+import numpy as np
+
+from sources.batch_env import BatchBreakoutEnv, make_batch_env, PLAYER_HIT
+from sources.breakout_env import ball_speed, fps, brick_origin, frame_reward, player_y
+from sources.numpy_engine import NumpyBatchBreakoutEnv
+
+CHECKPOINT = "checkpoints 04.01.2024 14_25/checkpoint_generation_30"
+SEEDS = range(10)
+FRAME_TRAVEL = ball_speed / fps
+# Frames of the shipped genomes' games compared step by step: the serve, the first bricks, the paddle and the lost
+# balls. A ball that reaches the paddle a frame later is tilted a little differently and drifts apart after it
+HORIZON = 110
+# Whole episodes are played with these seeds, the mean fitness of the genomes has to be ranked alike by both backends
+EPISODE_SEEDS = range(42, 47)
+MIN_RANK_CORRELATION = 0.8
+
+
+def without_bricks(pymunk_env: BatchBreakoutEnv, numpy_env: NumpyBatchBreakoutEnv):
+    for env in pymunk_env.envs:
+        env.clear_bricks()
+    numpy_env.bricks[:] = False
+
+
+def check_serve_flight() -> bool:
+    """The serve flies up to the bricks the same way in both backends."""
+    pymunk_env, numpy_env = BatchBreakoutEnv(len(SEEDS)), NumpyBatchBreakoutEnv(len(SEEDS))
+    pymunk_env.reset(list(SEEDS))
+    numpy_env.reset(list(SEEDS))
+    error = 0.0
+    while True:
+        a, _, _ = pymunk_env.step(np.zeros(len(SEEDS)))
+        b, _, _ = numpy_env.step(np.zeros(len(SEEDS)))
+        if a[:, 1].max() > brick_origin[1] - 20:
+            break
+        error = max(error, np.abs(a - b).max())
+    print(f"serve flight: max position error {error:.2e}")
+    return error < 1e-6
+
+
+def check_wall_bounces() -> bool:
+    """Without bricks the ball bounces between the walls until it falls out,
+    every bounce may only shift it by one frame of travel."""
+    directions = np.array([(1, 3), (-1, 3), (3, 2), (-2, 5)], dtype=np.float64)
+    pymunk_env, numpy_env = BatchBreakoutEnv(len(directions)), NumpyBatchBreakoutEnv(len(directions))
+    pymunk_env.reset(0)
+    numpy_env.reset(0)
+    without_bricks(pymunk_env, numpy_env)
+    for env, direction in zip(pymunk_env.envs, directions):
+        env.ball_body.velocity = tuple(direction)
+    numpy_env.velocity[:] = directions
+
+    ok = True
+    bounces = np.zeros(len(directions))
+    previous = numpy_env.velocity.copy()
+    while not (pymunk_env.done.all() and numpy_env.done.all()):
+        a, _, _ = pymunk_env.step(np.zeros(len(directions)))
+        b, _, _ = numpy_env.step(np.zeros(len(directions)))
+        bounces += np.any(np.sign(numpy_env.velocity) != np.sign(previous), axis=1)
+        previous = numpy_env.velocity.copy()
+        both_running = ~(pymunk_env.done | numpy_env.done)
+        error = np.linalg.norm(a[:, :2] - b[:, :2], axis=1)
+        ok &= bool(np.all(error[both_running] <= FRAME_TRAVEL * (bounces[both_running] + 1)))
+    print(f"wall bounces: {int(bounces.sum())} bounces, within one frame of travel per bounce: {ok}")
+    return ok
+
+
+def play(backend: str, networks: list, max_steps: int = 5000,
+         seed: int = 42) -> tuple[np.ndarray, np.ndarray, np.ndarray, float]:
+    """Fitness and ball positions after every step and the paddle hits paid in the games of networks."""
+    env = make_batch_env(len(networks), backend)
+    observation = env.reset(seed)
+    fitness = [np.zeros(len(networks))]
+    trajectory = []
+    hits = np.zeros(len(networks), dtype=np.int64)
+    steps = 0
+    start = time.perf_counter()
+    while not env.done.all() and len(trajectory) < max_steps:
+        outputs = [network.activate(tuple(o)) for network, o in zip(networks, observation)]
+        actions = np.array([output.index(max(output)) - 1 for output in outputs])
+        steps += np.count_nonzero(~env.done)
+        observation, rewards, _ = env.step(actions)
+        fitness.append(fitness[-1] + rewards)
+        trajectory.append(observation[:, :2].copy())
+        hits += env.events[:, PLAYER_HIT].astype(np.int64)
+    return np.array(fitness[1:]), np.array(trajectory), hits, steps / (time.perf_counter() - start)
+
+
+def bounces(trajectory: np.ndarray) -> np.ndarray:
+    """Bounces of every ball up to every step, counted as reversals of its direction on either axis."""
+    direction = np.sign(np.diff(trajectory, axis=0))
+    reversed_ = np.any((direction[1:] != direction[:-1]) & (direction[:-1] != 0), axis=2)
+    return np.concatenate([np.zeros((2, trajectory.shape[1])), np.cumsum(reversed_, axis=0)])
+
+
+def paddle_bounces(trajectory: np.ndarray) -> np.ndarray:
+    """Times every ball turned up below the bricks, only the paddle sends a falling ball back up there."""
+    direction = np.sign(np.diff(trajectory[:, :, 1], axis=0))
+    turns = (direction[:-1] < 0) & (direction[1:] > 0) & (trajectory[1:-1, :, 1] < (player_y + brick_origin[1]) / 2)
+    return turns.sum(axis=0)
+
+
+def ranks(values: np.ndarray) -> np.ndarray:
+    """Ranks of values, equal values share the mean of their ranks."""
+    order = np.argsort(values, kind="stable")
+    result = np.empty(len(values))
+    result[order] = np.arange(len(values))
+    for value in np.unique(values):
+        result[values == value] = result[values == value].mean()
+    return result
+
+
+def first_frames(values: np.ndarray) -> np.ndarray:
+    """The first HORIZON frames of values, games over before it stay as they ended."""
+    return np.concatenate([values, np.repeat(values[-1:], HORIZON, axis=0)])[:HORIZON]
+
+
+def compare_genomes() -> bool:
+    """Genomes of the shipped checkpoint play the same episode in both backends. Over HORIZON frames every bounce
+    may shift a ball by one frame of travel and an event by one frame, which changes fitness by a frame reward.
+    Over the whole episodes both pay one hit per paddle bounce."""
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    networks = [neat.nn.FeedForwardNetwork.create(g, population.config) for g in population.population.values()]
+    pymunk_fitness, pymunk_trajectory, pymunk_hits, pymunk_speed = play("pymunk", networks)
+    numpy_fitness, numpy_trajectory, numpy_hits, numpy_speed = play("numpy", networks)
+
+    hits_ok = True
+    for backend, hits, trajectory in (("pymunk", pymunk_hits, pymunk_trajectory),
+                                      ("numpy", numpy_hits, numpy_trajectory)):
+        bounced = paddle_bounces(trajectory)
+        hits_ok &= bool(np.all(hits == bounced))
+        print(f"{backend}: {hits.sum()} paddle hits paid for {bounced.sum()} paddle bounces")
+
+    allowed = bounces(first_frames(numpy_trajectory)) + 1
+    trajectory_error = np.linalg.norm(first_frames(pymunk_trajectory) - first_frames(numpy_trajectory), axis=2)
+    trajectory_ok = bool(np.all(trajectory_error <= FRAME_TRAVEL * allowed))
+    fitness_error = np.abs(first_frames(pymunk_fitness)[-1] - first_frames(numpy_fitness)[-1])
+    fitness_ok = bool(np.all(fitness_error <= frame_reward * allowed[-1] + 1e-9))
+    print(f"first {HORIZON} frames: max trajectory error {trajectory_error.max():.1f} "
+          f"in {int(allowed[-1].max()) - 1} bounces, within one frame of travel per bounce: {trajectory_ok}, "
+          f"max fitness error {fitness_error.max():.4f}, within a frame reward per bounce: {fitness_ok}")
+
+    for step in (10, 50, 100, 500):
+        if step < min(len(pymunk_trajectory), len(numpy_trajectory)):
+            error = np.linalg.norm(pymunk_trajectory[step] - numpy_trajectory[step], axis=1).max()
+            print(f"trajectory error at step {step}: {error:.1f}")
+    print(f"pymunk: {pymunk_speed:.0f} env-steps/sec, numpy: {numpy_speed:.0f} env-steps/sec")
+    return hits_ok and trajectory_ok and fitness_ok
+
+
+def compare_episodes() -> bool:
+    """Genomes of the shipped checkpoint play whole episodes with every seed of EPISODE_SEEDS in both backends,
+    their mean fitness has to be ranked alike."""
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    networks = [neat.nn.FeedForwardNetwork.create(g, population.config) for g in population.population.values()]
+    fitness = {}
+    for backend in ("pymunk", "numpy"):
+        fitness[backend] = np.mean([play(backend, networks, seed=seed)[0][-1] for seed in EPISODE_SEEDS], axis=0)
+        print(f"mean fitness {backend}:", np.round(fitness[backend], 1))
+    correlation = np.corrcoef(ranks(fitness["pymunk"]), ranks(fitness["numpy"]))[0, 1]
+    ok = bool(correlation >= MIN_RANK_CORRELATION)
+    print(f"whole episodes: fitness rank correlation {correlation:.2f}, at least {MIN_RANK_CORRELATION}: {ok}")
+    return ok
+
+
+def run() -> bool:
+    results = [check_serve_flight(), check_wall_bounces(), compare_genomes(), compare_episodes()]
+    return all(results)
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
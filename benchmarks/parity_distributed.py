@@ -0,0 +1,104 @@
+"""Distributed evaluation on localhost against the evaluation in this process.
+
+Starts workers on two TCP ports and a Unix socket, plays the genomes of the generation 45 checkpoint on them and
+in process with the same seeds and checks that every genome gets exactly the same episode fitness. Then plays
+them again with a worker that accepts connections but never answers, one whose address has nothing listening
+and a worker killed during the run, the jobs have to end up on the healthy workers with the same results.
+benchmarks/run_benchmarks.py runs it on the first QUICK_GENOMES genomes with episodes of at most QUICK_MAX_STEPS
+frames.
+
+Run from the repository root:
+    python -m benchmarks.parity_distributed
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+
+from sources.distributed import Coordinator, parse_address
+from sources.main import load_config, play_locally
+
+CHECKPOINT = "checkpoints/checkpoint_generation45"
+SEEDS = [42, 43]
+TIMEOUT = 30.0
+# Recorded episodes have to match too
+RECORD = True
+QUICK_GENOMES = 10
+QUICK_MAX_STEPS = 2000
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def start_worker(address: str) -> subprocess.Popen:
+    worker = subprocess.Popen([sys.executable, "-m", "sources.distributed", address])
+    family, location = parse_address(address)
+    for _ in range(300):
+        with socket.socket(family, socket.SOCK_STREAM) as probe:
+            if probe.connect_ex(location) == 0:
+                return worker
+        time.sleep(0.1)
+    raise RuntimeError(f"Worker on {address} did not start")
+
+
+def timed(coordinator: Coordinator, genomes: list) -> tuple[list, float]:
+    start = time.perf_counter()
+    results = coordinator.evaluate(genomes, SEEDS, RECORD)
+    return results, time.perf_counter() - start
+
+
+def run(genomes_count: int | None = None, max_steps: int | None = None) -> bool:
+    """Plays genomes_count genomes, all by default, with at most max_steps frames per episode,
+    NeatConf.txt's budget by default."""
+    genomes = list(neat.Checkpointer.restore_checkpoint(CHECKPOINT).population.values())[:genomes_count]
+    config = load_config("NeatConf.txt")
+    config.evaluation_config.record_actions = RECORD
+    if max_steps is not None:
+        config.evaluation_config.max_steps = max_steps
+    start = time.perf_counter()
+    expected = play_locally(genomes, config, SEEDS)
+    print(f"in process: {time.perf_counter() - start:.2f} sec")
+
+    with tempfile.TemporaryDirectory() as directory:
+        addresses = [f"localhost:{free_port()}", f"localhost:{free_port()}", f"unix:{directory}/worker.sock"]
+        workers = [start_worker(address) for address in addresses]
+        # Accepts connections into its backlog but never answers
+        silent = socket.socket()
+        silent.bind(("localhost", 0))
+        silent.listen()
+        silent_address = f"localhost:{silent.getsockname()[1]}"
+        ok = True
+        try:
+            with Coordinator(addresses, config, TIMEOUT) as coordinator:
+                results, seconds = timed(coordinator, genomes)
+                ok &= results == expected
+                print(f"{len(addresses)} workers: {seconds:.2f} sec, same results: {results == expected}, "
+                      f"jobs {[worker.jobs for worker in coordinator.workers]}")
+
+            unreachable = f"localhost:{free_port()}"
+            with Coordinator([silent_address, unreachable, *addresses], config, TIMEOUT, retries=2) as coordinator:
+                workers[0].kill()
+                results, seconds = timed(coordinator, genomes)
+                ok &= results == expected
+                print(f"with a silent, an unreachable and a killed worker: {seconds:.2f} sec, "
+                      f"same results: {results == expected}, jobs {[worker.jobs for worker in coordinator.workers]}")
+        finally:
+            silent.close()
+            for worker in workers:
+                worker.kill()
+                worker.wait()
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if run() else 1)
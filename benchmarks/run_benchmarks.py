@@ -0,0 +1,208 @@
+"""Benchmark suite of the code paths that dominate training, with stored baselines.
+
+Measures
+    physics        steps/sec of one BreakoutEnv with pymunk and of the NumPy engine on a batch of games
+    activation     activations/sec of the genomes of the shipped checkpoint, one neat.nn network per genome
+                   and the whole population compiled into one batch network
+    generation     generations/hour of eval_genomes with NeatConf.txt on the same genomes
+Inputs are seeded, so every run does the same work. Every benchmark also reports a checksum of its results
+(final positions, outputs, fitness) that has to match the baseline exactly, a changed checksum means
+the benchmark measured something different. Speeds are the best of a few repeats and may drop by at most
+the threshold below the baseline.
+
+Checks
+    parity_backends       the pymunk and the NumPy backend play the same games, see benchmarks/parity_backends.py
+    check_episode_limits  the fitness target ends the games that can not reach it early and only those
+    parity_distributed    remote workers score genomes like the local evaluation, see benchmarks/parity_distributed.py
+Checks pass or fail and have no baseline, a failed check fails the run like a regression.
+
+Run from the repository root, headless:
+    python -m benchmarks.run_benchmarks                      compare with benchmarks/baselines.json
+    python -m benchmarks.run_benchmarks --update-baselines   store the results as the new baselines
+    python -m benchmarks.run_benchmarks --only physics --threshold 0.1
+    python -m benchmarks.run_benchmarks --only parity_backends
+"""
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import neat
+import numpy as np
+
+from benchmarks import parity_backends, check_episode_limits, parity_distributed
+from sources.batch_env import make_batch_env
+from sources.batch_network import create_batch_network
+from sources.breakout_env import BreakoutEnv
+from sources.main import eval_genomes, load_config
+
+BASELINES = os.path.join(os.path.dirname(__file__), "baselines.json")
+CHECKPOINT = "checkpoints/checkpoint_generation45"
+SEED = 42
+REPEATS = 3
+PHYSICS_STEPS = 5000
+BATCH_SIZE = 20
+ACTIVATIONS = 2000
+
+
+def best_of(function, repeats: int = REPEATS) -> tuple[float, object]:
+    """Shortest time of the repeats and the result of the last one."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def checksum(values) -> float:
+    return round(float(np.sum(np.asarray(values, dtype=np.float64))), 6)
+
+
+def load_genomes() -> tuple[list, neat.config.Config]:
+    population = neat.Checkpointer.restore_checkpoint(CHECKPOINT)
+    return list(population.population.values()), population.config
+
+
+def bench_physics() -> dict:
+    actions = np.random.default_rng(SEED).integers(-1, 2, size=(PHYSICS_STEPS, BATCH_SIZE))
+    env = BreakoutEnv()
+
+    def single():
+        env.reset(SEED)
+        steps = 0
+        for action in actions[:, 0].tolist():
+            if env.done:
+                env.reset(SEED)
+            env.step(action)
+            steps += 1
+        return steps, tuple(env.ball_body.position)
+
+    seconds, (steps, position) = best_of(single)
+    results = {"pymunk_steps_per_second": (steps / seconds, checksum(position))}
+
+    batch = make_batch_env(BATCH_SIZE, "numpy")
+
+    def numpy_batch():
+        batch.reset(SEED)
+        steps = 0
+        for row in actions:
+            steps += int(np.count_nonzero(~batch.done))
+            batch.step(row)
+        return steps, batch.ball.copy()
+
+    seconds, (steps, positions) = best_of(numpy_batch)
+    results["numpy_steps_per_second"] = (steps / seconds, checksum(positions))
+    return results
+
+
+def bench_activation() -> dict:
+    genomes, config = load_genomes()
+    inputs = np.random.default_rng(SEED).uniform(0, 1000, size=(ACTIVATIONS, len(genomes), 4))
+    networks = [neat.nn.RecurrentNetwork.create(genome, config) if not config.genome_config.feed_forward
+                else neat.nn.FeedForwardNetwork.create(genome, config) for genome in genomes]
+
+    def python_networks():
+        for network in networks:
+            network.reset()
+        return [[network.activate(row[i].tolist()) for i, network in enumerate(networks)] for row in inputs]
+
+    seconds, outputs = best_of(python_networks)
+    results = {"neat_activations_per_second": (inputs.shape[0] * inputs.shape[1] / seconds, checksum(outputs))}
+
+    network = create_batch_network(genomes, config)
+
+    def batch_network():
+        network.reset()
+        return [network.activate(row) for row in inputs]
+
+    seconds, outputs = best_of(batch_network)
+    results["batch_activations_per_second"] = (inputs.shape[0] * inputs.shape[1] / seconds, checksum(outputs))
+    return results
+
+
+def bench_generation() -> dict:
+    genomes, _ = load_genomes()
+    config = load_config("NeatConf.txt")
+    config.evaluation_config.seed = SEED
+    # Every repeat has to play all genomes again
+    config.evaluation_config.fitness_cache_size = 0
+    raw_genomes = list(enumerate(genomes))
+    seconds, _ = best_of(lambda: eval_genomes(raw_genomes, config), repeats=1)
+    fitness = [genome.fitness for genome in genomes]
+    return {"generations_per_hour": (3600 / seconds, checksum(fitness))}
+
+
+benchmarks = {
+    "physics": bench_physics,
+    "activation": bench_activation,
+    "generation": bench_generation,
+}
+
+checks = {
+    "parity_backends": parity_backends.run,
+    "check_episode_limits": check_episode_limits.run,
+    "parity_distributed": lambda: parity_distributed.run(parity_distributed.QUICK_GENOMES,
+                                                         parity_distributed.QUICK_MAX_STEPS),
+}
+
+
+def compare(results: dict, baselines: dict, threshold: float) -> bool:
+    ok = True
+    for name, (value, result_checksum) in results.items():
+        baseline = baselines.get(name)
+        if baseline is None:
+            print(f"{name:<32} {value:14.1f}  (no baseline)")
+            continue
+        change = value / baseline["value"] - 1
+        status = "ok"
+        if result_checksum != baseline["checksum"]:
+            status = f"CHECKSUM CHANGED {baseline['checksum']} -> {result_checksum}"
+            ok = False
+        elif change < -threshold:
+            status = "REGRESSION"
+            ok = False
+        print(f"{name:<32} {value:14.1f}  baseline {baseline['value']:14.1f}  {100 * change:+6.1f}%  {status}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=[*benchmarks, *checks], action="append")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed drop below the baseline, 0.2 is 20%%")
+    parser.add_argument("--update-baselines", action="store_true")
+    arguments = parser.parse_args()
+
+    selected = arguments.only or [*benchmarks, *checks]
+    results = {}
+    for name in selected:
+        if name in benchmarks:
+            results.update(benchmarks[name]())
+    failed_checks = [name for name in selected if name in checks and not checks[name]()]
+    for name in failed_checks:
+        print(f"{name:<32} FAILED")
+
+    baselines = {}
+    if os.path.exists(BASELINES):
+        with open(BASELINES) as f:
+            baselines = json.load(f)
+
+    if arguments.update_baselines:
+        baselines["machine"] = {"platform": platform.platform(), "processor": platform.processor(),
+                                "cpu_count": os.cpu_count(), "python": platform.python_version()}
+        baselines.setdefault("results", {}).update(
+            {name: {"value": value, "checksum": result_checksum} for name, (value, result_checksum) in results.items()})
+        with open(BASELINES, "w") as f:
+            json.dump(baselines, f, indent=4)
+            f.write("\n")
+        print(f"Baselines written to {BASELINES}")
+        compare(results, baselines["results"], arguments.threshold)
+        sys.exit(1 if failed_checks else 0)
+    else:
+        ok = compare(results, baselines.get("results", {}), arguments.threshold)
+        sys.exit(0 if ok and not failed_checks else 1)
@@ -0,0 +1,138 @@
+"""Recorded episodes: the seed and the action of every network decision.
+
+A seeded episode is deterministic, so the seed, the game settings and the actions are enough to play it again
+without the genome and its network. The training records the episodes of every genome it plays and
+ActionLogReporter writes them next to the checkpoints, one file per generation. An action takes two bits,
+a typical episode a few hundred bytes.
+
+Layout of actions_generation_N.npz:
+    settings        JSON with the timestep, substep, decision interval and backend the episodes were played with
+    genome_keys     the genomes of the generation that were played with seeds, their fitness in fitness
+    seeds, frames   seed and frames played of every episode, shape (genomes, episodes)
+    episode_fitness fitness of every episode, shape (genomes, episodes)
+    offsets         where the packed actions of episode e of genome g start in actions: offsets[g * episodes + e]
+    actions         packed actions of all episodes, four to a byte
+"""
+
+import json
+import os
+
+import neat
+import numpy as np
+
+from sources.checkpoint_store import replacing
+from sources.evaluation_config import get_evaluation_config
+
+
+def pack_actions(actions) -> bytes:
+    """Actions -1, 0 and 1, four to a byte, the first one in the lowest bits."""
+    codes = np.zeros(-(-len(actions) // 4) * 4, dtype=np.uint8)
+    codes[:len(actions)] = np.asarray(actions) + 1
+    codes = codes.reshape(-1, 4)
+    return (codes[:, 0] | codes[:, 1] << 2 | codes[:, 2] << 4 | codes[:, 3] << 6).tobytes()
+
+
+def unpack_actions(data, count: int) -> np.ndarray:
+    packed = np.frombuffer(data, dtype=np.uint8)
+    codes = (packed[:, None] >> np.array([0, 2, 4, 6], dtype=np.uint8)) & 3
+    return codes.ravel()[:count].astype(np.int64) - 1
+
+
+def save_action_log(path: str, population: dict, config, generation: int | None = None):
+    """Writes the recorded episodes of the genomes of population, genomes without them are left out."""
+    evaluation_config = get_evaluation_config(config)
+    genomes = [g for g in population.values() if getattr(g, "episode_actions", None) is not None]
+    episodes = evaluation_config.episodes
+    records = [record for g in genomes for record in g.episode_actions]
+    sizes = np.array([len(actions) for _, actions in records], dtype=np.int64)
+    settings = {"timestep": evaluation_config.timestep, "substep": evaluation_config.substep,
+                "decision_interval": evaluation_config.decision_interval, "backend": evaluation_config.backend,
+                "generation": generation}
+    # numpy adds .npz to a file name without it
+    with replacing(path, ".tmp.npz") as temporary:
+        np.savez_compressed(
+            temporary,
+            settings=np.array(json.dumps(settings)),
+            genome_keys=np.array([g.key for g in genomes], dtype=np.int64),
+            fitness=np.array([g.fitness for g in genomes], dtype=np.float64),
+            seeds=np.tile(np.array(evaluation_config.episode_seeds(), dtype=np.int64), (len(genomes), 1)),
+            frames=np.array([frames for frames, _ in records], dtype=np.int64).reshape(len(genomes), episodes),
+            episode_fitness=np.array([g.episode_fitness for g in genomes], dtype=np.float64).reshape(-1, episodes),
+            offsets=np.concatenate([[0], np.cumsum(sizes)]),
+            actions=np.frombuffer(b"".join(actions for _, actions in records), dtype=np.uint8))
+
+
+class ActionLog:
+    """Episodes of one generation read from a file written by save_action_log."""
+
+    def __init__(self, path: str):
+        with np.load(path) as data:
+            self.settings = json.loads(str(data["settings"]))
+            self.genome_keys = data["genome_keys"]
+            self.fitness = data["fitness"]
+            self.seeds = data["seeds"]
+            self.frames = data["frames"]
+            self.episode_fitness = data["episode_fitness"]
+            self.offsets = data["offsets"]
+            self.actions = data["actions"]
+        self.rows = {key: row for row, key in enumerate(self.genome_keys.tolist())}
+
+    @property
+    def episodes(self) -> int:
+        return self.seeds.shape[1]
+
+    def best_genome_key(self) -> int:
+        return int(self.genome_keys[np.argmax(self.fitness)])
+
+    def seed(self, genome_key: int, episode: int = 0) -> int:
+        return int(self.seeds[self.rows[genome_key], episode])
+
+    def frame_actions(self, genome_key: int, episode: int = 0) -> np.ndarray:
+        """The action of every frame of the episode, decisions are held for the decision interval."""
+        row = self.rows[genome_key]
+        frames = int(self.frames[row, episode])
+        interval = self.settings["decision_interval"]
+        index = row * self.episodes + episode
+        data = self.actions[self.offsets[index]:self.offsets[index + 1]]
+        return np.repeat(unpack_actions(data, -(-frames // interval)), interval)[:frames]
+
+    def replay(self, genome_key: int, episode: int = 0) -> float:
+        """Plays the episode again headless and returns its fitness."""
+        from sources.evaluation import shared_batch_env
+        settings = self.settings
+        env = shared_batch_env(1, settings["backend"], settings["timestep"], settings["substep"])
+        env.reset(self.seed(genome_key, episode))
+        fitness = 0.0
+        for action in self.frame_actions(genome_key, episode)[:, None]:
+            _, rewards, _ = env.step(action)
+            fitness += rewards[0]
+        return fitness
+
+    def verify(self) -> list[tuple[int, int, float, float]]:
+        """Replays every episode, returns genome key, episode, recorded and replayed fitness of those that differ."""
+        mismatches = []
+        for key in self.genome_keys.tolist():
+            for episode in range(self.episodes):
+                recorded = float(self.episode_fitness[self.rows[key], episode])
+                replayed = self.replay(key, episode)
+                if replayed != recorded:
+                    mismatches.append((key, episode, recorded, replayed))
+        return mismatches
+
+
+class ActionLogReporter(neat.reporting.BaseReporter):
+    """Writes the recorded episodes of every generation to directory/actions_generation_N.npz."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.generation = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        path = os.path.join(self.directory, f"actions_generation_{self.generation}.npz")
+        save_action_log(path, population, config, self.generation)
+        # The fitness cache keeps the episodes, the genomes do not carry them into checkpoints and worker jobs
+        for genome in population.values():
+            genome.episode_actions = None
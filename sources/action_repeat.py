@@ -0,0 +1,68 @@
+"""Network decisions every few frames.
+
+A paddle controller does not need a new action every 1 / fps seconds. With an interval of N the network is
+activated on every Nth frame and its action is held in between, which cuts the activation cost about N-fold.
+The network sees the last observation, the mean of the observations since its last decision or all of them
+stacked, the last one needs N times as many inputs.
+"""
+
+import numpy as np
+
+observation_modes = ("last", "mean", "stack")
+# Inputs of one observation
+observation_size = 4
+
+
+class ActionRepeat:
+    """Collects the observations of a batch of games and tells when the network decides again.
+    The first decision of an episode is taken on its first observation alone."""
+
+    def __init__(self, interval: int = 1, observation_mode: str = "last"):
+        if interval < 1:
+            raise ValueError(f"The decision interval has to be at least 1, got {interval}")
+        if observation_mode not in observation_modes:
+            raise ValueError(f"Unknown observation mode {observation_mode!r}, expected one of {observation_modes}")
+        self.interval = interval
+        self.observation_mode = observation_mode
+        self.frames = 0
+        self.history = np.zeros((interval, 0, observation_size))
+        self._inputs = np.zeros((0, self.inputs))
+
+    @property
+    def inputs(self) -> int:
+        """Network inputs needed for one decision."""
+        return observation_size * (self.interval if self.observation_mode == "stack" else 1)
+
+    def key(self) -> tuple:
+        return self.interval, self.observation_mode
+
+    def reset(self, size: int):
+        """Starts a batch of size new episodes."""
+        self.frames = 0
+        if self.history.shape[1] != size:
+            self.history = np.zeros((self.interval, size, observation_size))
+            self._inputs = np.zeros((size, self.inputs))
+
+    def observe(self, observation: np.ndarray) -> np.ndarray | None:
+        """Takes the observations of all games after a frame, the first call takes those of the new episodes.
+        Returns the network inputs of all games when a decision is due, None while the last action is held.
+        The inputs are reused, their values change with the next decision."""
+        if self.interval == 1:
+            return observation
+        first = self.frames == 0
+        slot = (self.frames - 1) % self.interval
+        self.frames += 1
+        if first:
+            self.history[:] = observation
+        else:
+            self.history[slot] = observation
+            if slot != self.interval - 1:
+                return None
+
+        if self.observation_mode == "last":
+            return observation
+        if self.observation_mode == "mean":
+            return np.mean(self.history, axis=0, out=self._inputs)
+        # Oldest observation first
+        self._inputs.reshape(-1, self.interval, observation_size)[:] = self.history.transpose(1, 0, 2)
+        return self._inputs
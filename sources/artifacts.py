@@ -0,0 +1,116 @@
+"""Network diagrams and plots rendered on a background thread.
+
+graphviz and matplotlib take longer than a generation of a small population, so training only puts jobs
+into a bounded queue. Jobs have a kind, a newer job of a kind replaces the one still waiting, so when rendering
+falls behind the stale generations are skipped. The queue is worked off before the worker is closed.
+"""
+
+import copy
+import threading
+import warnings
+from collections import OrderedDict
+
+import neat
+
+from sources.profiling import profiler
+
+# Names of the input and output nodes on the diagrams
+node_names = {-1: "Кооордината мяча X", -2: "Коррдината мяча Y", -3: "Разница между X шарика и X платформы",
+              -4: "Разница между Y шарика и Y платформы", 0: "Движение влево", 1: "Стоять на месте",
+              2: "Движение вправо"}
+
+
+def draw_winner(*args, **kwargs):
+    """visualize.draw_net, graphviz and matplotlib are imported on the worker thread by the first job."""
+    from sources.visualize import draw_net
+    draw_net(*args, **kwargs)
+
+
+def plot_fitness(*args, **kwargs):
+    """visualize.plot_stats, imported like draw_winner."""
+    from sources.visualize import plot_stats
+    plot_stats(*args, **kwargs)
+
+
+class ArtifactWorker:
+    """Runs jobs on its own thread. At most max_pending jobs wait, the oldest one is dropped for a new kind."""
+
+    def __init__(self, max_pending: int = 4):
+        self.max_pending = max_pending
+        self.pending = OrderedDict()
+        self.condition = threading.Condition()
+        self.closed = False
+        self.done = 0
+        self.skipped = 0
+        self.thread = threading.Thread(target=self._work, name="artifacts")
+        self.thread.start()
+
+    def submit(self, kind: str, function, *args, **kwargs):
+        """Queues function(*args, **kwargs) without waiting for anything."""
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("ArtifactWorker is closed")
+            if kind in self.pending:
+                del self.pending[kind]
+                self.skipped += 1
+            elif len(self.pending) >= self.max_pending:
+                self.pending.popitem(last=False)
+                self.skipped += 1
+            self.pending[kind] = (function, args, kwargs)
+            self.condition.notify()
+
+    def close(self):
+        """Waits until every queued job is done and stops the thread."""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _work(self):
+        while True:
+            with self.condition:
+                while not self.pending and not self.closed:
+                    self.condition.wait()
+                if not self.pending:
+                    return
+                kind, (function, args, kwargs) = self.pending.popitem(last=False)
+            try:
+                with profiler.phase("visualization"):
+                    function(*args, **kwargs)
+            except Exception as error:
+                warnings.warn(f"Rendering {kind} failed: {error!r}")
+            self.done += 1
+
+
+def statistics_snapshot(statistics: neat.StatisticsReporter) -> neat.StatisticsReporter:
+    """Copy of the statistics that training can go on appending to while the copy is plotted."""
+    snapshot = copy.copy(statistics)
+    snapshot.most_fit_genomes = list(statistics.most_fit_genomes)
+    snapshot.generation_statistics = list(statistics.generation_statistics)
+    return snapshot
+
+
+class ArtifactReporter(neat.reporting.BaseReporter):
+    """Draws the best genome of every generation and the fitness plot into directory."""
+
+    def __init__(self, worker: ArtifactWorker, directory: str, statistics: neat.StatisticsReporter | None = None):
+        self.worker = worker
+        self.directory = directory
+        self.statistics = statistics
+        self.generation = None
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        self.worker.submit("winner", draw_winner, config, best_genome, node_names=node_names,
+                           filename=f"{self.directory}/neuro_schemes/winner_{self.generation}.svg")
+        if self.statistics is not None and self.statistics.most_fit_genomes:
+            self.worker.submit("fitness", plot_fitness, statistics_snapshot(self.statistics),
+                               filename=f"{self.directory}/avg_fitness.svg")
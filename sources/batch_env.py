@@ -0,0 +1,94 @@
+"""Many breakout games advanced in lockstep. Observations, rewards and done flags of all games are NumPy arrays,
+so the controller can work on the whole batch at once.
+"""
+
+import numpy as np
+
+from sources.breakout_env import (BreakoutEnv, fps, frame_reward, player_hit_reward, brick_reward,
+                                  ball_lost_reward)
+
+# Reward of every event counted by BreakoutEnv: player hits, destroyed bricks, lost balls
+event_rewards = np.array([player_hit_reward, brick_reward, ball_lost_reward], dtype=np.float64)
+# Index of every event in event_rewards and in the events of the last step
+PLAYER_HIT, BRICK_DESTROYED, BALL_LOST = range(3)
+
+
+class BatchBreakoutEnv:
+    """N independent breakout games. Games that are over are not stepped any more and get zero rewards
+    until the next reset."""
+
+    def __init__(self, size: int, dt: float = 1.0 / fps, substep: float = 1.0 / fps):
+        self.dt = dt
+        self.substep = substep
+        self.frame_reward = frame_reward * (dt * fps)
+        # Every game built so far, the batch plays the first size of them
+        self.all_envs = []
+        self.resize(size)
+
+    def resize(self, size: int):
+        """Makes it a batch of size games, the next reset starts them. Games left out when it shrinks are kept
+        for when it grows again, so a batch holds as many games as it was ever given."""
+        self.all_envs += [BreakoutEnv(self.dt, self.substep) for _ in range(size - len(self.all_envs))]
+        self.size = size
+        self.envs = self.all_envs[:size]
+        self.done = np.zeros(size, dtype=bool)
+        self.steps = np.zeros(size, dtype=np.int64)
+        # Events of the last step of every game
+        self.events = np.zeros((size, len(event_rewards)))
+        self._observation = np.zeros((size, 4))
+
+    def reset(self, seeds=None):
+        """Starts new games. seeds is one seed for every game or a sequence with a seed per game."""
+        if seeds is None or np.isscalar(seeds):
+            seeds = [seeds] * self.size
+        for env, seed in zip(self.envs, seeds):
+            env.reset(seed)
+        self.done[:] = False
+        self.steps[:] = 0
+        self.events[:] = 0
+        self._observe(np.arange(self.size))
+        return self.observation()
+
+    def observation(self) -> np.ndarray:
+        """Array of shape (size, 4) with the same inputs BreakoutEnv.observation gives for every game.
+        The array is reused, its values change with the next step."""
+        return self._observation
+
+    def _observe(self, games: np.ndarray):
+        positions = np.array([(*self.envs[i].ball_body.position, *self.envs[i].player_body.position)
+                              for i in games], dtype=np.float64).reshape(-1, 4)
+        positions[:, 2:] = np.abs(positions[:, 2:] - positions[:, :2])
+        self._observation[games] = positions
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Advances every running game by one frame with its action from the actions array.
+        Returns observations, rewards and done flags of all games."""
+        running = np.flatnonzero(~self.done)
+        actions = np.asarray(actions)[running].tolist()
+        envs = [self.envs[i] for i in running]
+        events = self.events
+        events[:] = 0
+        running_events = []
+        for env, action in zip(envs, actions):
+            env.step(action)
+            running_events.append((env.player_hits, env.bricks_destroyed, env.balls_lost))
+
+        # Games that are over keep their last observation
+        self._observe(running)
+        events[running] = np.array(running_events, dtype=np.float64).reshape(-1, len(event_rewards))
+        self.done[running] = [env.done for env in envs]
+        self.steps[running] += 1
+        rewards = events @ event_rewards
+        rewards[running] += self.frame_reward
+        return self.observation(), rewards, self.done.copy()
+
+
+def make_batch_env(size: int, backend: str = "pymunk", dt: float = 1.0 / fps, substep: float = 1.0 / fps):
+    """Batch of games simulated by pymunk or by the analytic NumPy engine. Frames are dt seconds long, pymunk splits
+    them into substeps near collisions, the NumPy engine sweeps the ball along the whole frame and needs none."""
+    if backend == "pymunk":
+        return BatchBreakoutEnv(size, dt, substep)
+    if backend == "numpy":
+        from sources.numpy_engine import NumpyBatchBreakoutEnv
+        return NumpyBatchBreakoutEnv(size, dt)
+    raise ValueError(f"Unknown physics backend {backend!r}")
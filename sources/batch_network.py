@@ -0,0 +1,306 @@
+"""NEAT networks compiled to NumPy array programs.
+
+A compiled network evaluates many genomes at once: every node of every genome gets a slot in one value array,
+nodes are evaluated level by level in topological order and all nodes of a level sharing an aggregation
+function are computed together from padded arrays of input slots and weights.
+Outputs match neat.nn.FeedForwardNetwork for the activation and aggregation functions neat ships with.
+Recurrent genomes are compiled the same way with every node on one level, evaluated from the values of the previous
+activation like neat.nn.RecurrentNetwork does.
+"""
+
+import numpy as np
+
+from neat.graphs import feed_forward_layers, required_for_output
+
+
+def _sigmoid(z):
+    z = np.clip(5.0 * z, -60.0, 60.0)
+    return 1.0 / (1.0 + np.exp(-z))
+
+
+def _inv(z):
+    with np.errstate(divide="ignore"):
+        return np.where(z == 0, 0.0, 1.0 / np.where(z == 0, 1.0, z))
+
+
+activation_functions = {
+    "sigmoid": _sigmoid,
+    "tanh": lambda z: np.tanh(np.clip(2.5 * z, -60.0, 60.0)),
+    "sin": lambda z: np.sin(np.clip(5.0 * z, -60.0, 60.0)),
+    "gauss": lambda z: np.exp(-5.0 * np.clip(z, -3.4, 3.4) ** 2),
+    "relu": lambda z: np.where(z > 0.0, z, 0.0),
+    "softplus": lambda z: 0.2 * np.log(1 + np.exp(np.clip(5.0 * z, -60.0, 60.0))),
+    "identity": lambda z: z,
+    "clamped": lambda z: np.clip(z, -1.0, 1.0),
+    "inv": _inv,
+    "log": lambda z: np.log(np.maximum(1e-7, z)),
+    "exp": lambda z: np.exp(np.clip(z, -60.0, 60.0)),
+    "abs": np.abs,
+    "hat": lambda z: np.maximum(0.0, 1 - np.abs(z)),
+    "square": lambda z: z ** 2,
+    "cube": lambda z: z ** 3,
+}
+activation_ids = {name: i for i, name in enumerate(activation_functions)}
+
+
+def _fold(function, values, mask, neutral):
+    # Inputs are folded one by one in connection order, like the Python functions neat uses,
+    # so sums and products round the same way
+    result = np.where(mask[:, 0], values[..., 0], neutral)
+    for i in range(1, values.shape[-1]):
+        result = np.where(mask[:, i], function(result, values[..., i]), result)
+    return result
+
+
+def _sum(values, mask):
+    # Padding has zero weights and adding zero changes nothing, so no masking is needed
+    result = values[..., 0]
+    for i in range(1, values.shape[-1]):
+        result = result + values[..., i]
+    return result
+
+
+def _median(values, mask):
+    # Padding is sorted to the end as NaN
+    ordered = np.sort(np.where(mask, values, np.nan), axis=-1)
+    count = mask.sum(axis=1)
+    low = np.take_along_axis(ordered, np.broadcast_to((count - 1) // 2, ordered.shape[:-1])[..., None], axis=-1)
+    high = np.take_along_axis(ordered, np.broadcast_to(count // 2, ordered.shape[:-1])[..., None], axis=-1)
+    return np.where(count % 2 == 1, low[..., 0], (low[..., 0] + high[..., 0]) / 2.0)
+
+
+def _mean(values, mask):
+    return _sum(values, mask) / mask.sum(axis=1)
+
+
+def _maxabs(values, mask):
+    magnitudes = np.where(mask, np.abs(values), -np.inf)
+    return np.take_along_axis(values, np.argmax(magnitudes, axis=-1)[..., None], axis=-1)[..., 0]
+
+
+aggregation_functions = {
+    "sum": _sum,
+    "product": lambda values, mask: _fold(np.multiply, values, mask, 1.0),
+    "max": lambda values, mask: _fold(np.maximum, values, mask, -np.inf),
+    "min": lambda values, mask: _fold(np.minimum, values, mask, np.inf),
+    "maxabs": _maxabs,
+    "median": _median,
+    "mean": _mean,
+}
+aggregation_ids = {name: i for i, name in enumerate(aggregation_functions)}
+
+
+def function_id(ids: dict, name: str) -> int:
+    try:
+        return ids[name]
+    except KeyError:
+        raise ValueError(f"Function {name!r} can not be compiled to NumPy") from None
+
+
+class NodeGroup:
+    """Nodes of one level with the same aggregation function. Rows are nodes, columns are their inputs,
+    padded up to the largest fan-in of the group."""
+
+    def __init__(self, aggregation_id, slots, activations, biases, responses, links):
+        fan_in = max(len(node_links) for node_links in links)
+        self.aggregation = aggregation_functions[list(aggregation_functions)[aggregation_id]]
+        self.slots = np.array(slots, dtype=np.int64)
+        self.biases = np.array(biases, dtype=np.float64)
+        self.responses = np.array(responses, dtype=np.float64)
+        self.input_slots = np.zeros((len(slots), fan_in), dtype=np.int64)
+        self.weights = np.zeros((len(slots), fan_in), dtype=np.float64)
+        self.mask = np.zeros((len(slots), fan_in), dtype=bool)
+        for row, node_links in enumerate(links):
+            for column, (slot, weight) in enumerate(node_links):
+                self.input_slots[row, column] = slot
+                self.weights[row, column] = weight
+                self.mask[row, column] = True
+
+        # Nodes are split once more by activation function
+        names = list(activation_functions)
+        activations = np.array(activations, dtype=np.int64)
+        self.activations = [(activation_functions[names[i]], np.flatnonzero(activations == i))
+                            for i in np.unique(activations)]
+
+    def evaluate(self, source: np.ndarray, target: np.ndarray):
+        """Reads node inputs from the source values and writes node outputs to the target values."""
+        s = self.aggregation(source[:, self.input_slots] * self.weights, self.mask)
+        z = self.biases + self.responses * s
+        for activation, rows in self.activations:
+            target[:, self.slots[rows]] = activation(z[:, rows])
+
+
+def compile_groups(nodes: list) -> list[NodeGroup]:
+    """nodes are (level, slot, aggregation id, activation id, bias, response, [(input slot, weight), ...])."""
+    grouped = {}
+    for level, slot, aggregation_id, activation_id, bias, response, links in nodes:
+        grouped.setdefault((level, aggregation_id), []).append((slot, activation_id, bias, response, links))
+
+    groups = []
+    for (level, aggregation_id), group_nodes in sorted(grouped.items()):
+        slots, activations, biases, responses, links = zip(*group_nodes)
+        groups.append(NodeGroup(aggregation_id, slots, activations, biases, responses, links))
+    return groups
+
+
+def node_eval(genome, node_key, slot, links, level):
+    node = genome.nodes[node_key]
+    return (level, slot, function_id(aggregation_ids, node.aggregation),
+            function_id(activation_ids, node.activation), node.bias, node.response, links)
+
+
+class BatchFeedForwardNetwork:
+    """Feed forward networks of many genomes evaluated together."""
+
+    def __init__(self, num_slots, input_slots, output_slots, groups):
+        self.num_slots = num_slots
+        self.input_slots = input_slots
+        self.output_slots = output_slots
+        self.groups = groups
+        # Reused by every activation with the same batch size. Every slot is either an input, written by
+        # its node on every activation or never written at all, so old values never leak into new outputs.
+        self.values = np.zeros((1, num_slots))
+
+    def reset(self):
+        """Feed forward networks have no state to forget."""
+
+    def take_state(self, network: "BatchFeedForwardNetwork", rows):
+        """Feed forward networks have no state to take over."""
+
+    def activate(self, inputs) -> np.ndarray:
+        """inputs has the shape (genomes, num_inputs), or (batch, genomes, num_inputs) to evaluate every genome
+        on a batch of inputs. Returns outputs of the same shape with num_outputs in the last axis."""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        batch_inputs = inputs.reshape(-1, *self.input_slots.shape)
+        if batch_inputs.shape[0] != self.values.shape[0]:
+            self.values = np.zeros((batch_inputs.shape[0], self.num_slots))
+        values = self.values
+        values[:, self.input_slots] = batch_inputs
+        for group in self.groups:
+            group.evaluate(values, values)
+        return values[:, self.output_slots].reshape(*inputs.shape[:-1], self.output_slots.shape[1])
+
+    @staticmethod
+    def create(genomes, config):
+        """Receives genomes and returns their phenotypes compiled into one BatchFeedForwardNetwork."""
+        genome_config = config.genome_config
+        input_keys, output_keys = genome_config.input_keys, genome_config.output_keys
+        input_slots = np.zeros((len(genomes), len(input_keys)), dtype=np.int64)
+        output_slots = np.zeros((len(genomes), len(output_keys)), dtype=np.int64)
+        nodes = []
+        num_slots = 0
+        for row, genome in enumerate(genomes):
+            # Gather expressed connections.
+            connections = [cg.key for cg in genome.connections.values() if cg.enabled]
+            layers = feed_forward_layers(input_keys, output_keys, connections)
+
+            slots = {}
+            for key in [*input_keys, *output_keys, *(node for layer in layers for node in layer)]:
+                if key not in slots:
+                    slots[key] = num_slots
+                    num_slots += 1
+            input_slots[row] = [slots[key] for key in input_keys]
+            output_slots[row] = [slots[key] for key in output_keys]
+
+            for level, layer in enumerate(layers):
+                for node in layer:
+                    links = [(slots[i], genome.connections[(i, o)].weight) for i, o in connections if o == node]
+                    nodes.append(node_eval(genome, node, slots[node], links, level))
+
+        return BatchFeedForwardNetwork(num_slots, input_slots, output_slots, compile_groups(nodes))
+
+
+class BatchRecurrentNetwork:
+    """Recurrent networks of many genomes evaluated together. Node values of the last two activations are kept
+    in one preallocated array, every activation reads the older one and overwrites it with the new values."""
+
+    def __init__(self, num_slots, input_slots, output_slots, groups, genome_slots):
+        self.num_slots = num_slots
+        self.input_slots = input_slots
+        self.output_slots = output_slots
+        self.groups = groups
+        # First and last slot + 1 of every genome, its slots are contiguous
+        self.genome_slots = genome_slots
+        self.values = np.zeros((2, 1, num_slots))
+        self.active = 0
+
+    def reset(self):
+        """Forgets the state before a new episode."""
+        self.values.fill(0.0)
+        self.active = 0
+
+    def activate(self, inputs) -> np.ndarray:
+        """inputs has the shape (genomes, num_inputs), or (batch, genomes, num_inputs) to run every genome
+        on a batch of independent episodes. The state is kept for the same batch size between calls
+        and starts from zero when it changes."""
+        inputs = np.asarray(inputs, dtype=np.float64)
+        batch_inputs = inputs.reshape(-1, *self.input_slots.shape)
+        if batch_inputs.shape[0] != self.values.shape[1]:
+            self.values = np.zeros((2, batch_inputs.shape[0], self.num_slots))
+            self.active = 0
+
+        ivalues, ovalues = self.values[self.active], self.values[1 - self.active]
+        self.active = 1 - self.active
+        ivalues[:, self.input_slots] = batch_inputs
+        ovalues[:, self.input_slots] = batch_inputs
+        for group in self.groups:
+            group.evaluate(ivalues, ovalues)
+        return ovalues[:, self.output_slots].reshape(*inputs.shape[:-1], self.output_slots.shape[1])
+
+    def take_state(self, network: "BatchRecurrentNetwork", rows):
+        """Continues the episodes of the network: genome i of this network was compiled from the same genome
+        as genome rows[i] of the network, so the state of that genome is copied over."""
+        self.values = np.zeros((2, network.values.shape[1], self.num_slots))
+        self.active = network.active
+        for (start, end), row in zip(self.genome_slots, rows):
+            other_start, other_end = network.genome_slots[row]
+            self.values[:, :, start:end] = network.values[:, :, other_start:other_end]
+
+    @staticmethod
+    def create(genomes, config):
+        """Receives genomes and returns their phenotypes compiled into one BatchRecurrentNetwork."""
+        genome_config = config.genome_config
+        input_keys, output_keys = genome_config.input_keys, genome_config.output_keys
+        input_slots = np.zeros((len(genomes), len(input_keys)), dtype=np.int64)
+        output_slots = np.zeros((len(genomes), len(output_keys)), dtype=np.int64)
+        genome_slots = []
+        nodes = []
+        num_slots = 0
+        for row, genome in enumerate(genomes):
+            required = required_for_output(input_keys, output_keys, genome.connections)
+
+            # Gather inputs and expressed connections.
+            node_inputs = {}
+            for cg in genome.connections.values():
+                if not cg.enabled:
+                    continue
+
+                i, o = cg.key
+                if o not in required and i not in required:
+                    continue
+
+                node_inputs.setdefault(o, []).append((i, cg.weight))
+
+            start = num_slots
+            slots = {}
+            links_keys = (i for links in node_inputs.values() for i, _ in links)
+            for key in [*input_keys, *output_keys, *node_inputs, *links_keys]:
+                if key not in slots:
+                    slots[key] = num_slots
+                    num_slots += 1
+            genome_slots.append((start, num_slots))
+            input_slots[row] = [slots[key] for key in input_keys]
+            output_slots[row] = [slots[key] for key in output_keys]
+
+            for node, links in node_inputs.items():
+                links = [(slots[i], weight) for i, weight in links]
+                nodes.append(node_eval(genome, node, slots[node], links, 0))
+
+        return BatchRecurrentNetwork(num_slots, input_slots, output_slots, compile_groups(nodes), genome_slots)
+
+
+def create_batch_network(genomes, config):
+    """Compiles the genomes into the network type the config asks for with feed_forward."""
+    if config.genome_config.feed_forward:
+        return BatchFeedForwardNetwork.create(genomes, config)
+    return BatchRecurrentNetwork.create(genomes, config)
@@ -0,0 +1,340 @@
+"""Breakout game as a self-contained simulation. Every BreakoutEnv owns its own pymunk space with walls,
+paddle, ball and bricks, so many games can live in one process and be reset and reused between genomes.
+The scene is built once, a reset puts it back into the state it was built in.
+"""
+
+import math
+import random
+
+import numpy as np
+import pymunk
+from pymunk import Vec2d
+
+from sources.profiling import profiler
+
+width, height = 1000, 800
+
+collision_types = {
+    "ball": 1,
+    "brick": 2,
+    "bottom": 3,
+    "player": 4,
+}
+
+colors = {
+    "ball": (0, 255, 0, 255),
+    "brick": (0, 0, 255, 255),
+    "bottom": (255, 0, 0, 255),
+    "player": (255, 0, 0, 255),
+    "wall": (211, 211, 211, 255),
+    "background": (0, 0, 0, 255),
+}
+
+# Frames are 1 / fps long unless an environment is given another timestep
+fps = 200
+ball_speed = 2000
+player_speed = 2000
+
+# Scene layout
+wall_offset = 50
+wall_radius = 10
+ball_radius = 5
+player_y = 100
+player_half_length = 50
+player_radius = 15
+brick_columns, brick_rows = 41, 10
+brick_size = (20, 10)
+# Centre of the bottom left brick
+brick_origin = (100, height - 200)
+serve_directions = [(1, 10), (-1, 10)]
+# The paddle and the ball above it start up to this far left or right of the centre
+player_start_range = 150
+
+# Fitness rewards, the frame reward is paid for every 1 / fps of play. A paddle hit is paid once per contact of a ball
+# coming down and at most once every min_hit_interval frames, see BreakoutEnv._hit_player. Runs from before it paid
+# every physics step of contact score about 12% higher for the same play
+frame_reward = 0.001
+brick_reward = 0
+player_hit_reward = 15
+ball_lost_reward = -10
+
+# Inner edges of the walls and the bottom and the box around all bricks
+inner_left, inner_right = wall_offset + wall_radius, width - wall_offset - wall_radius
+inner_bottom, inner_top = wall_offset + wall_radius, height - wall_offset - wall_radius
+bricks_box = (brick_origin[0] - brick_size[0] / 2, brick_origin[1] - brick_size[1] / 2,
+              brick_origin[0] + (brick_columns - 0.5) * brick_size[0],
+              brick_origin[1] + (brick_rows - 0.5) * brick_size[1])
+# Shortest way between two paddle hits that score: the ball has to fly up from the paddle to the lowest brick row and
+# back down
+min_hit_distance = 2 * ((brick_origin[1] - brick_size[1] / 2 - ball_radius) - (player_y + player_radius + ball_radius))
+# Distance left between the paddle or the ball and anything they could touch after a long step
+substep_margin = 1.0
+
+# Destroyed bricks stay in the space, this filter keeps anything from colliding with them
+destroyed_brick_filter = pymunk.ShapeFilter(categories=0)
+
+
+def min_hit_interval(dt: float) -> int:
+    """Fewest frames of dt seconds between two paddle hits that score."""
+    return max(1, math.floor(min_hit_distance / (ball_speed * dt)))
+
+
+def serve(rng: random.Random) -> tuple[tuple[float, float], float]:
+    """Serve direction of the ball and the offset of the paddle and the ball from the centre in a new game."""
+    return rng.choice(serve_directions), rng.uniform(-player_start_range, player_start_range)
+
+
+# Keep ball velocity at a static value
+def constant_velocity(body, gravity, damping, dt):
+    body.velocity = body.velocity.normalized() * ball_speed
+
+
+class BreakoutEnv:
+    """One breakout game. Actions are -1, 0 and 1: move the paddle left, stand still or move it right.
+    Every step advances the game by a frame of dt seconds. While the ball and the paddle are too far from anything
+    to touch it during the frame, the space is stepped once. Otherwise the frame is split into physics steps of at
+    most substep seconds, so the ball never travels more than at the default rate into a collision."""
+
+    def __init__(self, dt: float = 1.0 / fps, substep: float = 1.0 / fps):
+        self.space = None
+        self.random = random.Random()
+        self.dt = dt
+        self.substep = substep
+        self.substeps = max(1, math.ceil(dt / substep - 1e-9))
+        self.frame_reward = frame_reward * (dt * fps)
+        self.hit_interval = min_hit_interval(dt)
+        self.done = False
+        self.steps = 0
+        # Steps of the space during this game
+        self.physics_steps = 0
+        # Events of the last step, its reward is computed from them
+        self.player_hits = 0
+        self.bricks_destroyed = 0
+        self.balls_lost = 0
+        # Step of the last paddle hit that scored
+        self.last_hit_step = -self.hit_interval
+        # Observations are written into the same array every step
+        self.observation_buffer = np.zeros(4)
+        # StateRecorder that gets the state after every step, None records nothing
+        self.recorder = None
+
+        ### Game area
+        self.static_body = pymunk.Body(body_type=pymunk.Body.STATIC)
+        # walls - the left-top-right walls
+        self.static_lines = [
+            pymunk.Segment(self.static_body, (50, 50), (50, height - 50), 10),
+            pymunk.Segment(self.static_body, (50, height - 50), (width - 50, height - 50), 10),
+            pymunk.Segment(self.static_body, (width - 50, height - 50), (width - 50, 50), 10),
+        ]
+        for line in self.static_lines:
+            line.color = colors["wall"]
+            line.elasticity = 1.0
+
+        # bottom - a sensor that removes anything touching it
+        self.bottom = pymunk.Segment(self.static_body, (50, 50), (width - 50, 50), 10)
+        self.bottom.sensor = True
+        self.bottom.collision_type = collision_types["bottom"]
+        self.bottom.color = colors["bottom"]
+
+        ### Bricks
+        # All bricks are boxes on the static body, so the broadphase never has to update them. Bricks are numbered
+        # column by column, brick_cells maps a shape to its number and bricks holds which of them are still in the game
+        self.all_bricks = []
+        for column in range(brick_columns):
+            x = column * brick_size[0] + brick_origin[0]
+            for row in range(brick_rows):
+                y = row * brick_size[1] + brick_origin[1]
+                brick_shape = pymunk.Poly.create_box_bb(self.static_body, pymunk.BB(
+                    x - brick_size[0] / 2, y - brick_size[1] / 2, x + brick_size[0] / 2, y + brick_size[1] / 2))
+                brick_shape.elasticity = 1.0
+                brick_shape.color = colors["brick"]
+                brick_shape.group = 1
+                brick_shape.collision_type = collision_types["brick"]
+                self.all_bricks.append(brick_shape)
+        self.brick_cells = {brick_shape: cell for cell, brick_shape in enumerate(self.all_bricks)}
+        self.bricks = np.ones((brick_columns, brick_rows), dtype=bool)
+        # Bricks hit during the current step, they are removed together once the step is over
+        self.hit_bricks = []
+
+        ### Player ship
+        self.player_body = pymunk.Body(500, float("inf"))
+        self.player_body.position = width / 2, player_y
+
+        self.player_shape = pymunk.Segment(self.player_body, (-player_half_length, 0), (player_half_length, 0),
+                                           player_radius)
+        self.player_shape.color = colors["player"]
+        self.player_shape.elasticity = 1.0
+        self.player_shape.collision_type = collision_types["player"]
+
+        ### Ball
+        self.ball_body = pymunk.Body(1, float("inf"))
+        self.ball_body.position = self.player_body.position + (0, 40)
+        self.ball_body.velocity_func = constant_velocity
+
+        self.ball_shape = pymunk.Circle(self.ball_body, ball_radius)
+        self.ball_shape.color = colors["ball"]
+        self.ball_shape.elasticity = 1.0
+        self.ball_shape.collision_type = collision_types["ball"]
+
+        # Chipmunk numbers shapes in the order they are added to a space and that numbering decides the order
+        # contacts are found and solved in. So the scene is added once and nothing is ever removed from it:
+        # destroyed bricks only stop colliding and a lost ball stays where it is until the next reset.
+        self.space = pymunk.Space()
+        self.space.add(self.static_body, *self.static_lines, self.bottom)
+        self.space.add(self.player_body, self.player_shape)
+        self.space.add(self.ball_body, self.ball_shape)
+        self.space.add(*self.all_bricks)
+        # Positions of the moving bodies at the start of every game
+        self.initial_positions = [(body, body.position) for body in (self.player_body, self.ball_body)]
+
+        ### Collision handlers
+        h = self.space.add_collision_handler(collision_types["ball"], collision_types["bottom"])
+        h.begin = self._lose_ball
+        h = self.space.add_collision_handler(collision_types["player"], collision_types["ball"])
+        h.begin = self._hit_player
+        h.pre_solve = self._bounce_from_player
+        h = self.space.add_collision_handler(collision_types["brick"], collision_types["ball"])
+        h.separate = self._remove_brick
+
+        self.reset()
+
+    def reset(self, seed=None):
+        """Starts a new game. Games with the same seed are played the same way for the same actions."""
+        self.random.seed(seed)
+        self.done = False
+        self.steps = 0
+        self.physics_steps = 0
+        self.player_hits = 0
+        self.bricks_destroyed = 0
+        self.balls_lost = 0
+        self.last_hit_step = -self.hit_interval
+        self._restore_scene()
+
+    def _restore_scene(self):
+        # The broadphase tree of the paddle and the ball is rebuilt too, otherwise the order contacts are found in
+        # depends on the games before. Moving the bodies away first makes pymunk reinsert them like in a new space.
+        for body, _ in self.initial_positions:
+            body.position = -width, -height
+            self.space.reindex_shapes_for_body(body)
+        direction, offset = serve(self.random)
+        for body, position in self.initial_positions:
+            body.position = position + (offset, 0)
+            body.velocity = 0, 0
+            # The solver leaves a position correction for the next step in the body, a step of zero length uses it up
+            pymunk.Body.update_position(body, 0)
+        self.ball_body.apply_impulse_at_local_point(Vec2d(*direction))
+        for body, _ in self.initial_positions:
+            self.space.reindex_shapes_for_body(body)
+
+        for cell in np.flatnonzero(~self.bricks.ravel()):
+            brick_shape = self.all_bricks[cell]
+            brick_shape.filter = pymunk.ShapeFilter()
+            brick_shape.color = colors["brick"]
+        self.bricks[:] = True
+        self.hit_bricks.clear()
+
+    def clear_bricks(self):
+        """Destroys all bricks without counting them, the game goes on with an empty field."""
+        self.hit_bricks.extend(brick_shape for cell, brick_shape in enumerate(self.all_bricks)
+                               if self.bricks.flat[cell])
+        self.bricks[:] = False
+        self._remove_hit_bricks(self.space, "bricks")
+
+    def observation(self) -> np.ndarray:
+        """Network inputs: ball position and the distance between the ball and the paddle on both axes.
+        The array is reused, its values change with the next call."""
+        ball_x, ball_y = self.ball_body.position
+        player_x, player_y = self.player_body.position
+        observation = self.observation_buffer
+        observation[0] = ball_x
+        observation[1] = ball_y
+        observation[2] = abs(player_x - ball_x)
+        observation[3] = abs(player_y - ball_y)
+        return observation
+
+    def step(self, action: int) -> tuple[float, bool]:
+        """Moves the paddle and advances the game by one frame. Returns the frame reward and whether the game
+        is over."""
+        self.player_hits = 0
+        self.bricks_destroyed = 0
+        self.balls_lost = 0
+        self.player_body.velocity = (action * player_speed, 0)
+        if self.substeps == 1 or self._far_from_everything(abs(action) * player_speed * self.dt):
+            self.space.step(self.dt)
+            self.physics_steps += 1
+        else:
+            for _ in range(self.substeps):
+                # Contacts push the paddle, it is driven at the same velocity again for every substep
+                self.player_body.velocity = (action * player_speed, 0)
+                self.space.step(self.dt / self.substeps)
+            self.physics_steps += self.substeps
+        self.steps += 1
+        reward = (self.frame_reward + self.player_hits * player_hit_reward + self.bricks_destroyed * brick_reward
+                  + self.balls_lost * ball_lost_reward)
+        if self.recorder is not None:
+            self.recorder.record(self, reward)
+        return reward, self.done
+
+    def _far_from_everything(self, player_travel: float) -> bool:
+        """Whether neither the ball nor the paddle can touch anything during the next frame."""
+        ball_x, ball_y = self.ball_body.position
+        player_x = self.player_body.position.x
+        ball_clearance = min(ball_x - inner_left, inner_right - ball_x, inner_top - ball_y, ball_y - inner_bottom,
+                             abs(ball_y - player_y) - player_radius,
+                             max(bricks_box[0] - ball_x, ball_x - bricks_box[2],
+                                 bricks_box[1] - ball_y, ball_y - bricks_box[3])) - ball_radius
+        player_clearance = min(player_x - inner_left, inner_right - player_x) - player_half_length - player_radius
+        return (ball_clearance > ball_speed * self.dt + substep_margin
+                and player_clearance > player_travel + substep_margin)
+
+    def _lose_ball(self, arbiter, space, data):
+        with profiler.phase("collisions"):
+            self.balls_lost += 1
+            self.done = True
+        return True
+
+    def _bounce_from_player(self, arbiter, space, data):
+        # We want to update the collision normal to make the bounce direction
+        # dependent of where on the paddle the ball hits. Note that this
+        # calculation isn't perfect, but just a quick example.
+        with profiler.phase("collisions"):
+            set_ = arbiter.contact_point_set
+            if len(set_.points) > 0:
+                player_shape = arbiter.shapes[0]
+                width = (player_shape.b - player_shape.a).x
+                delta = (player_shape.body.position - set_.points[0].point_a).x
+                normal = Vec2d(0, 1).rotated(delta / width / 2)
+                set_.normal = normal
+                set_.points[0].distance = 0
+            arbiter.contact_point_set = set_
+        return True
+
+    def _hit_player(self, arbiter, space, data):
+        # pre_solve runs for every physics step the ball touches the paddle, a hit is paid once when the contact
+        # begins. Only a ball coming down scores, between two hits that score it has to fly up and back, so a hit
+        # sooner than that is not paid and EpisodeLimits can count on the interval
+        with profiler.phase("collisions"):
+            if arbiter.shapes[1].body.velocity.y < 0 and self.steps - self.last_hit_step >= self.hit_interval:
+                self.player_hits += 1
+                self.last_hit_step = self.steps
+        return True
+
+    # Make bricks be removed when hit by ball
+    def _remove_brick(self, arbiter, space, data):
+        # A contact left over from the game before the reset separates in the first step of the new one
+        if self.steps == 0:
+            return
+        with profiler.phase("collisions"):
+            cell = self.brick_cells[arbiter.shapes[0]]
+            column, row = divmod(cell, brick_rows)
+            if self.bricks[column, row]:
+                self.bricks[column, row] = False
+                self.hit_bricks.append(arbiter.shapes[0])
+                self.bricks_destroyed += 1
+                space.add_post_step_callback(self._remove_hit_bricks, "bricks")
+
+    def _remove_hit_bricks(self, space, key):
+        for brick_shape in self.hit_bricks:
+            brick_shape.filter = destroyed_brick_filter
+            brick_shape.color = colors["background"]
+        self.hit_bricks.clear()
@@ -0,0 +1,379 @@
+"""Compact incremental checkpoints.
+
+neat.Checkpointer pickles the whole population every generation. CheckpointStore writes a genome only in the
+generation it first appears in, elites carried over are referenced by key. It replaces neat.Checkpointer in training
+runs, restore resumes from any saved generation. With neat_checkpoints = True in [BreakoutEvaluation] the run also
+pickles whole populations with PopulationCheckpointer. Genes are stored in columns, one array
+per gene attribute, and connections refer to a shared table of connection keys that grows by the new innovations.
+
+Layout of the store directory:
+    config.txt          copy of the NEAT config file the run was started with
+    connections.bin     shared table, int64 (input, output) pairs, a connection id is a row of it
+    generation_N.bin    the genomes new in generation N in compressed blocks of up to block_size genomes
+    index.jsonl         a line per saved generation with its members, fitness, species and blocks, the block of
+                        every genome new in it, the string values of gene attributes first used in it, the valid rows
+                        of the connection table. Lines are only appended, saving a generation costs the same in a long
+                        run, the index is read by replaying them
+    random_state.json   the random state after the last generation
+
+A block holds the columns of its genomes. Every column is split into byte planes, so the slowly changing high bytes
+of floats end up next to each other, and the block is compressed with zlib. Loading a genome decodes only its block.
+"""
+
+import json
+import os
+import random
+import shutil
+import zlib
+from contextlib import contextmanager
+from itertools import count
+
+import neat
+import numpy as np
+from neat.attributes import BoolAttribute, FloatAttribute, StringAttribute
+
+from sources.fitness_cache import episode_key, genome_hash
+
+block_size = 16
+
+
+def attribute_dtype(attribute) -> np.dtype:
+    if isinstance(attribute, FloatAttribute):
+        return np.dtype(np.float64)
+    if isinstance(attribute, BoolAttribute):
+        return np.dtype(np.bool_)
+    if isinstance(attribute, StringAttribute):
+        return np.dtype(np.uint16)
+    raise ValueError(f"Gene attribute {attribute.name!r} of type {type(attribute).__name__} can not be stored")
+
+
+def block_schema(genome_config) -> list[tuple[str, np.dtype, str]]:
+    """Columns of a block in order with their type and what they have a row for: genome, node or connection.
+    The counts come first, they tell the length of the node and connection columns."""
+    schema = [("genome_key", np.dtype(np.int64), "genome"),
+              ("node_count", np.dtype(np.int32), "genome"),
+              ("connection_count", np.dtype(np.int32), "genome"),
+              ("node_key", np.dtype(np.int64), "node"),
+              ("connection_id", np.dtype(np.int32), "connection")]
+    for prefix, gene_type in (("node", genome_config.node_gene_type),
+                              ("connection", genome_config.connection_gene_type)):
+        schema += [(f"{prefix}_{a.name}", attribute_dtype(a), prefix) for a in gene_type._gene_attributes]
+    return schema
+
+
+def encode_block(columns: list[np.ndarray]) -> bytes:
+    # Byte i of every value of a column goes to plane i
+    planes = [column.view(np.uint8).reshape(-1, column.dtype.itemsize).T.tobytes() for column in columns]
+    return zlib.compress(b"".join(planes), 6)
+
+
+def decode_block(data: bytes, schema: list, genome_count: int) -> dict[str, np.ndarray]:
+    data = zlib.decompress(data)
+    columns = {}
+    offset = 0
+    for name, dtype, rows in schema:
+        length = genome_count if rows == "genome" else int(columns[f"{rows}_count"].sum())
+        size = length * dtype.itemsize
+        planes = np.frombuffer(data, dtype=np.uint8, count=size, offset=offset)
+        columns[name] = planes.reshape(dtype.itemsize, length).T.copy().view(dtype).ravel()
+        offset += size
+    return columns
+
+
+def encode_genomes(schema: list, genomes: list, connection_id, string_id) -> bytes:
+    """Block of the genomes, connection_id(key) and string_id(attribute, value) number the connection keys and
+    the string values of gene attributes."""
+    genes = {"node": [g.nodes for g in genomes], "connection": [g.connections for g in genomes]}
+    columns = []
+    for name, dtype, rows in schema:
+        if name == "genome_key":
+            values = [g.key for g in genomes]
+        elif name in ("node_count", "connection_count"):
+            values = [len(genome_genes) for genome_genes in genes[name[:-len("_count")]]]
+        elif name == "node_key":
+            values = [key for genome_genes in genes["node"] for key in genome_genes]
+        elif name == "connection_id":
+            values = [connection_id(key) for genome_genes in genes["connection"] for key in genome_genes]
+        else:
+            attribute = name[len(rows) + 1:]
+            values = [getattr(gene, attribute) for genome_genes in genes[rows] for gene in genome_genes.values()]
+            if dtype == np.uint16:
+                values = [string_id(attribute, value) for value in values]
+        columns.append(np.array(values, dtype=dtype))
+    return encode_block(columns)
+
+
+def gene_values(columns: dict, prefix: str, gene_type, strings: dict) -> dict[str, list]:
+    values = {}
+    for attribute in gene_type._gene_attributes:
+        column = columns[f"{prefix}_{attribute.name}"].tolist()
+        if isinstance(attribute, StringAttribute):
+            column = [strings[attribute.name][i] for i in column]
+        values[attribute.name] = column
+    return values
+
+
+def decode_genomes(columns: dict, config, connection_keys: list, strings: dict, rows: list | None = None) -> list:
+    """Genomes of decoded block columns, their fitness is left unset. connection_keys and strings are the tables
+    the block was numbered with. rows picks the genomes by their row in the block, all of them by default."""
+    genome_config = config.genome_config
+    node_values = gene_values(columns, "node", genome_config.node_gene_type, strings)
+    connection_values = gene_values(columns, "connection", genome_config.connection_gene_type, strings)
+    node_keys = columns["node_key"].tolist()
+    connection_keys = [connection_keys[i] for i in columns["connection_id"].tolist()]
+
+    genomes = []
+    node_start = connection_start = 0
+    wanted = None if rows is None else set(rows)
+    for row, (key, node_count, connection_count) in enumerate(zip(columns["genome_key"].tolist(),
+                                                                  columns["node_count"].tolist(),
+                                                                  columns["connection_count"].tolist())):
+        if wanted is not None and row not in wanted:
+            node_start += node_count
+            connection_start += connection_count
+            continue
+        genome = config.genome_type(key)
+        for genes, gene_type, keys, values, start, end in (
+                (genome.nodes, genome_config.node_gene_type, node_keys, node_values,
+                 node_start, node_start + node_count),
+                (genome.connections, genome_config.connection_gene_type, connection_keys, connection_values,
+                 connection_start, connection_start + connection_count)):
+            for i in range(start, end):
+                gene = gene_type(keys[i])
+                for name, column in values.items():
+                    setattr(gene, name, column[i])
+                genes[gene.key] = gene
+        node_start += node_count
+        connection_start += connection_count
+        genomes.append(genome)
+    return genomes
+
+
+@contextmanager
+def replacing(path: str, suffix: str = ".tmp"):
+    """Yields a temporary path next to path, the file written there replaces path when the block ends.
+    A crash while writing leaves the old file in place instead of a half written one."""
+    temporary = path + suffix
+    yield temporary
+    os.replace(temporary, path)
+
+
+class PopulationCheckpointer(neat.Checkpointer):
+    """neat.Checkpointer that pickles the species set without its reporters. They are the reporters of the run, with
+    threads, queues and open stores that have no place in a checkpoint. A restored species set reports to nobody,
+    like the one CheckpointStore.restore builds."""
+
+    def save_checkpoint(self, config, population, species_set, generation):
+        reporters = species_set.reporters
+        species_set.reporters = neat.reporting.ReporterSet()
+        try:
+            super().save_checkpoint(config, population, species_set, generation)
+        finally:
+            species_set.reporters = reporters
+
+
+class CheckpointStore(neat.reporting.BaseReporter):
+    """Saves the population at the end of every generation, the same state neat.Checkpointer saves."""
+
+    index_name = "index.jsonl"
+
+    def __init__(self, directory: str, config_path: str | None = None):
+        self.directory = directory
+        self.current_generation = None
+        os.makedirs(directory, exist_ok=True)
+        if config_path is not None and not os.path.exists(self.config_path):
+            shutil.copyfile(config_path, self.config_path)
+
+        self.index = {"generations": {}, "genomes": {}, "strings": {}, "connections": 0}
+        # String values of gene attributes numbered since the last saved generation
+        self.new_strings = {}
+        if os.path.exists(self.path(self.index_name)):
+            self.read_index()
+        table = np.fromfile(self.path("connections.bin"), dtype=np.int64) \
+            if os.path.exists(self.path("connections.bin")) else np.zeros(0, dtype=np.int64)
+        self.connection_keys = [tuple(pair) for pair in table.reshape(-1, 2)[:self.index["connections"]].tolist()]
+        self.connection_ids = {key: i for i, key in enumerate(self.connection_keys)}
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    @property
+    def config_path(self) -> str:
+        return self.path("config.txt")
+
+    def generations(self) -> list[int]:
+        return sorted(int(generation) for generation in self.index["generations"])
+
+    def start_generation(self, generation):
+        self.current_generation = generation
+
+    def end_generation(self, config, population, species_set):
+        self.save_generation(config, population, species_set, self.current_generation)
+
+    ### Saving
+
+    def save_generation(self, config, population: dict, species_set, generation: int):
+        new_keys = [key for key in population if str(key) not in self.index["genomes"]]
+        schema = block_schema(config.genome_config)
+
+        file_name = f"generation_{generation}.bin"
+        blocks = []
+        offset = 0
+        with open(self.path(file_name), "wb") as f:
+            for block, start in enumerate(range(0, len(new_keys), block_size)):
+                keys = new_keys[start:start + block_size]
+                data = self.encode_genomes(schema, [population[key] for key in keys])
+                f.write(data)
+                blocks.append([offset, len(data), len(keys)])
+                offset += len(data)
+                for row, key in enumerate(keys):
+                    self.index["genomes"][str(key)] = [generation, block, row]
+
+        # Only the new innovations are appended to the table, the index tells how many rows are valid
+        with open(self.path("connections.bin"), "r+b" if self.index["connections"] else "wb") as f:
+            f.seek(self.index["connections"] * 16)
+            new_connections = self.connection_keys[self.index["connections"]:]
+            f.write(np.array(new_connections, dtype=np.int64).reshape(-1, 2).tobytes())
+            f.truncate()
+
+        self.append_index({
+            "generation": generation,
+            "file": file_name,
+            "blocks": blocks,
+            "members": [[key, g.fitness] for key, g in population.items()],
+            "species": {str(sid): {"created": s.created, "last_improved": s.last_improved,
+                                   "representative": s.representative.key, "members": list(s.members),
+                                   "fitness": s.fitness, "adjusted_fitness": s.adjusted_fitness,
+                                   "fitness_history": s.fitness_history}
+                        for sid, s in species_set.species.items()},
+            "episode": repr(episode_key(config)),
+            "genomes": {str(key): self.index["genomes"][str(key)][1:] for key in new_keys},
+            "new_strings": self.new_strings,
+            "connections": len(self.connection_keys),
+        })
+        self.new_strings = {}
+        with replacing(self.path("random_state.json")) as temporary, open(temporary, "w") as f:
+            json.dump({"generation": generation, "random_state": random.getstate()}, f)
+
+    def encode_genomes(self, schema: list, genomes: list) -> bytes:
+        return encode_genomes(schema, genomes, self.connection_id, self.string_id)
+
+    def connection_id(self, key: tuple) -> int:
+        if key not in self.connection_ids:
+            self.connection_ids[key] = len(self.connection_keys)
+            self.connection_keys.append(key)
+        return self.connection_ids[key]
+
+    def string_id(self, attribute: str, value: str) -> int:
+        # The index takes the new values when the generation is appended to it, a line only holds those
+        strings = self.index["strings"].get(attribute, [])
+        if value in strings:
+            return strings.index(value)
+        new_strings = self.new_strings.setdefault(attribute, [])
+        if value not in new_strings:
+            new_strings.append(value)
+        return len(strings) + new_strings.index(value)
+
+    def apply_index(self, line: dict):
+        generation = line["generation"]
+        self.index["generations"][str(generation)] = {name: line[name]
+                                                      for name in ("file", "blocks", "members", "species", "episode")}
+        self.index["genomes"].update({key: [generation, *location] for key, location in line["genomes"].items()})
+        for attribute, values in line["new_strings"].items():
+            self.index["strings"].setdefault(attribute, []).extend(values)
+        self.index["connections"] = line["connections"]
+        self.index["last_generation"] = generation
+
+    def append_index(self, line: dict):
+        text = json.dumps(line)
+        with open(self.path(self.index_name), "a") as f:
+            f.write(text + "\n")
+        # Applied as it is read back, with string keys and lists
+        self.apply_index(json.loads(text))
+
+    def read_index(self):
+        with open(self.path(self.index_name), "rb") as f:
+            data = f.read()
+        valid = 0
+        for line in data.splitlines(keepends=True):
+            # A crash while appending leaves a broken last line, it is dropped and the next line replaces it
+            if not line.endswith(b"\n"):
+                break
+            try:
+                self.apply_index(json.loads(line))
+            except ValueError:
+                break
+            valid += len(line)
+        if valid < len(data):
+            with open(self.path(self.index_name), "r+b") as f:
+                f.truncate(valid)
+
+    ### Loading
+
+    def read_block(self, generation: int, block: int, config, rows: list | None = None) -> list:
+        """Decodes the genomes of one block, the ones in rows or all of them, their fitness is left unset."""
+        info = self.index["generations"][str(generation)]
+        offset, length, genome_count = info["blocks"][block]
+        with open(self.path(info["file"]), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        columns = decode_block(data, block_schema(config.genome_config), genome_count)
+        return decode_genomes(columns, config, self.connection_keys, self.index["strings"], rows)
+
+    def load_genome(self, key: int, config):
+        """Decodes one genome from the block it was stored in, fitness is left unset."""
+        generation, block, row = self.index["genomes"][str(key)]
+        return self.read_block(generation, block, config, [row])[0]
+
+    def load_generation(self, generation: int, config) -> dict:
+        """Population of the generation with the fitness its members had."""
+        info = self.index["generations"][str(generation)]
+        locations = {key: self.index["genomes"][str(key)] for key, _ in info["members"]}
+        # Every block holding a member is decoded once
+        decoded = {}
+        for stored_generation, block, _ in locations.values():
+            if (stored_generation, block) not in decoded:
+                decoded[stored_generation, block] = self.read_block(stored_generation, block, config)
+
+        same_episode = info["episode"] == repr(episode_key(config))
+        population = {}
+        for key, fitness in info["members"]:
+            stored_generation, block, row = locations[key]
+            genome = decoded[stored_generation, block][row]
+            if fitness is not None:
+                genome.fitness = fitness
+                if same_episode:
+                    genome.fitness_key = genome_hash(genome), episode_key(config)
+            population[key] = genome
+        return population
+
+    def restore(self, config, generation: int | None = None) -> neat.Population:
+        """Resumes the run from a generation, the last one by default, like neat.Checkpointer.restore_checkpoint."""
+        if generation is None:
+            generation = self.generations()[-1]
+        info = self.index["generations"][str(generation)]
+        population = self.load_generation(generation, config)
+
+        species_set = config.species_set_type(config.species_set_config, neat.reporting.ReporterSet())
+        for sid, data in info["species"].items():
+            species = neat.species.Species(int(sid), data["created"])
+            species.last_improved = data["last_improved"]
+            species.fitness = data["fitness"]
+            species.adjusted_fitness = data["adjusted_fitness"]
+            species.fitness_history = data["fitness_history"]
+            species.update(population[data["representative"]], {key: population[key] for key in data["members"]})
+            species_set.species[int(sid)] = species
+            for key in data["members"]:
+                species_set.genome_to_species[key] = int(sid)
+        species_set.indexer = count(max(species_set.species, default=0) + 1)
+
+        if generation == self.index["last_generation"] and os.path.exists(self.path("random_state.json")):
+            with open(self.path("random_state.json")) as f:
+                saved = json.load(f)
+            if saved["generation"] == generation:
+                version, state, gauss = saved["random_state"]
+                random.setstate((version, tuple(state), gauss))
+        restored = neat.Population(config, (population, species_set, generation))
+        # New genomes must not reuse keys of the genomes already stored
+        restored.reproduction.genome_indexer = count(max(map(int, self.index["genomes"]), default=0) + 1)
+        return restored
@@ -0,0 +1,110 @@
+"""Genomes with slotted genes that pickle their genes as columns.
+
+Every gene of a DefaultGenome is an object with a __dict__ of its own, which takes most of the memory of a large
+population, and pickling it for the worker processes and neat.Checkpointer writes the class, the attribute names
+and the values of every gene one by one. CompactGenome keeps the same nodes and connections dicts, the neat
+genome and gene methods work on them unchanged, but its genes list their attributes in __slots__. Pickled, the genes
+of a genome are columns instead: every numeric attribute as the bytes of an array, the keys and string attributes
+as tuples of the values themselves, which pickle writes once and refers to wherever else they occur.
+
+A population evolves the same with either genome type. CompactGenome is opt-in: it is selected by naming the genome
+section of the NEAT config file [CompactGenome] instead of [DefaultGenome], the shipped NeatConf.txt keeps
+DefaultGenome. A resumed run keeps the genome type it was started with, neat.Checkpointer pickles the config and
+CheckpointStore copies the config file into its directory.
+"""
+
+from array import array
+from configparser import ConfigParser
+
+import neat
+from neat.attributes import BoolAttribute, FloatAttribute, StringAttribute
+from neat.genes import BaseGene, DefaultConnectionGene, DefaultNodeGene
+from neat.genome import DefaultGenomeConfig
+
+
+def genome_type(config_path: str):
+    """CompactGenome when the config file has a [CompactGenome] section, DefaultGenome otherwise."""
+    parser = ConfigParser()
+    parser.read(config_path)
+    return CompactGenome if parser.has_section(CompactGenome.__name__) else neat.DefaultGenome
+
+
+class CompactGene:
+    """BaseGene without a __dict__, subclasses list the key and their attributes in __slots__."""
+    __slots__ = ()
+
+    __str__ = BaseGene.__str__
+    __lt__ = BaseGene.__lt__
+    parse_config = classmethod(BaseGene.parse_config.__func__)
+    get_config_params = classmethod(BaseGene.get_config_params.__func__)
+    init_attributes = BaseGene.init_attributes
+    mutate = BaseGene.mutate
+    copy = BaseGene.copy
+    crossover = BaseGene.crossover
+
+
+class CompactNodeGene(CompactGene):
+    __slots__ = ("key", "bias", "response", "activation", "aggregation")
+    _gene_attributes = DefaultNodeGene._gene_attributes
+
+    __init__ = DefaultNodeGene.__init__
+    distance = DefaultNodeGene.distance
+
+
+class CompactConnectionGene(CompactGene):
+    __slots__ = ("key", "weight", "enabled")
+    _gene_attributes = DefaultConnectionGene._gene_attributes
+
+    __init__ = DefaultConnectionGene.__init__
+    distance = DefaultConnectionGene.distance
+
+
+# Array type codes of the numeric gene attributes
+attribute_typecodes = {FloatAttribute: "d", BoolAttribute: "b"}
+
+
+def pack_genes(genes: dict) -> tuple:
+    """Columns of genes: the keys, every numeric attribute as the bytes of an array and every string attribute.
+    The key objects are kept, pickle writes a key shared by the genes of many genomes once."""
+    columns = [tuple(genes)]
+    values = list(genes.values())
+    for attribute in type(values[0])._gene_attributes if values else ():
+        column = [getattr(gene, attribute.name) for gene in values]
+        if isinstance(attribute, StringAttribute):
+            columns.append(tuple(column))
+        else:
+            columns.append(array(attribute_typecodes[type(attribute)], column).tobytes())
+    return tuple(columns)
+
+
+def unpack_genes(columns: tuple, gene_type) -> dict:
+    keys = columns[0]
+    genes = list(map(gene_type, keys))
+    for attribute, column in zip(gene_type._gene_attributes, columns[1:]):
+        if isinstance(attribute, BoolAttribute):
+            column = map(bool, array("b", column))
+        elif not isinstance(attribute, StringAttribute):
+            column = array(attribute_typecodes[type(attribute)], column).tolist()
+        for gene, value in zip(genes, column):
+            setattr(gene, attribute.name, value)
+    return dict(zip(keys, genes))
+
+
+class CompactGenome(neat.DefaultGenome):
+    """DefaultGenome with CompactNodeGene and CompactConnectionGene genes, pickled as columns."""
+
+    @classmethod
+    def parse_config(cls, param_dict):
+        param_dict["node_gene_type"] = CompactNodeGene
+        param_dict["connection_gene_type"] = CompactConnectionGene
+        return DefaultGenomeConfig(param_dict)
+
+    def __getstate__(self):
+        # Recorded episodes stay in the fitness cache and the action logs, not in checkpoints and worker jobs
+        state = {key: value for key, value in self.__dict__.items() if key != "episode_actions"}
+        return {**state, "nodes": pack_genes(self.nodes), "connections": pack_genes(self.connections)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.nodes = unpack_genes(state["nodes"], CompactNodeGene)
+        self.connections = unpack_genes(state["connections"], CompactConnectionGene)
@@ -0,0 +1,394 @@
+"""Genome evaluation on worker processes reached over TCP or a Unix socket.
+
+One machine limits the population size, so the headless evaluation can run on workers anywhere the repository is
+checked out. Start a worker per core or machine:
+    python -m sources.distributed 0.0.0.0:5000
+    python -m sources.distributed unix:/tmp/breakout.sock
+and list them in [BreakoutEvaluation]: workers = node1:5000, node2:5000, unix:/tmp/breakout.sock
+
+A message is a JSON header and a binary body, both length prefixed. The coordinator connects, sends the NEAT config
+with its evaluation settings and then jobs: genomes encoded as a CheckpointStore block with their own tables of
+connection keys and strings, and the episode seeds. The worker answers every job with the episode fitness of its
+genomes, how long it played and, when episodes are recorded, their frames and packed decisions. A job that times
+out, fails or loses its connection goes to the next free worker, at most retries times. Once no job is waiting, idle
+workers play the jobs still running elsewhere too and the first result counts, so a slow machine does not hold up
+the generation. Seeded games give the same fitness on every worker.
+"""
+
+import argparse
+import json
+import os
+import socket
+import struct
+import tempfile
+import threading
+import time
+from collections import deque
+
+import neat
+import numpy as np
+
+from sources.checkpoint_store import block_schema, decode_block, decode_genomes, encode_genomes
+from sources.compact_genome import genome_type
+from sources.evaluation import play_episodes, record_episodes
+from sources.evaluation_config import EvaluationConfig, get_evaluation_config
+from sources.profiling import profiler, run_profiled, run_counted
+from sources.speciation import species_set_type
+
+# Jobs per worker and generation, more of them balance the load better, fewer keep the batches large
+jobs_per_worker = 2
+# Sizes of the header and the body of a message
+_sizes = struct.Struct("!II")
+
+
+class WorkerError(Exception):
+    """A worker could not play a job."""
+
+
+### Messages
+
+def parse_address(address: str) -> tuple[int, object]:
+    """Socket family and address of "host:port" or "unix:/path"."""
+    address = address.strip()
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:"):]
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "localhost", int(port))
+
+
+def send_message(connection: socket.socket, header: dict, body: bytes = b""):
+    data = json.dumps(header).encode()
+    connection.sendall(_sizes.pack(len(data), len(body)) + data + body)
+
+
+def _receive(connection: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = connection.recv(min(size - len(data), 1 << 20))
+        if not chunk:
+            raise ConnectionError("Connection closed by the other side")
+        data += chunk
+    return bytes(data)
+
+
+def receive_message(connection: socket.socket) -> tuple[dict, bytes]:
+    header_size, body_size = _sizes.unpack(_receive(connection, _sizes.size))
+    header = json.loads(_receive(connection, header_size))
+    return header, _receive(connection, body_size)
+
+
+def encode_payload(genomes: list, genome_config) -> tuple[dict, bytes]:
+    """Header fields and body of a job: a block of the genomes and the tables it is numbered with."""
+    connection_ids = {}
+    strings = {}
+
+    def connection_id(key: tuple) -> int:
+        return connection_ids.setdefault(key, len(connection_ids))
+
+    def string_id(attribute: str, value: str) -> int:
+        values = strings.setdefault(attribute, [])
+        if value not in values:
+            values.append(value)
+        return values.index(value)
+
+    body = encode_genomes(block_schema(genome_config), genomes, connection_id, string_id)
+    return {"genome_count": len(genomes), "connections": list(connection_ids), "strings": strings}, body
+
+
+def decode_payload(header: dict, body: bytes, config) -> list:
+    columns = decode_block(body, block_schema(config.genome_config), header["genome_count"])
+    connection_keys = [tuple(key) for key in header["connections"]]
+    return decode_genomes(columns, config, connection_keys, header["strings"])
+
+
+def config_message(config) -> tuple[dict, bytes]:
+    """The NEAT config as its file and the evaluation settings, which NEAT does not save."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "config.txt")
+        config.save(path)
+        with open(path, "rb") as f:
+            text = f.read()
+    return {"type": "config", "evaluation": vars(get_evaluation_config(config))}, text
+
+
+def read_config_message(header: dict, body: bytes) -> neat.config.Config:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "config.txt")
+        with open(path, "wb") as f:
+            f.write(body)
+        config = neat.config.Config(genome_type(path), neat.DefaultReproduction,
+                                    species_set_type(path), neat.DefaultStagnation, path)
+    config.evaluation_config = EvaluationConfig()
+    vars(config.evaluation_config).update(header["evaluation"])
+    return config
+
+
+def read_recorded_episodes(reply: dict, body: bytes, episodes: int) -> list[list[tuple]]:
+    """The frames and packed decisions of every episode of every genome of a job."""
+    ends = np.cumsum(reply["sizes"]).tolist()
+    records = [(frames, body[end - size:end]) for frames, size, end in zip(reply["frames"], reply["sizes"], ends)]
+    return [records[i:i + episodes] for i in range(0, len(records), episodes)]
+
+
+### Worker
+
+def handle(connection: socket.socket):
+    """Plays the jobs of one coordinator until it closes the connection."""
+    config = None
+    while True:
+        try:
+            header, body = receive_message(connection)
+        except ConnectionError:
+            # The coordinator went away without saying goodbye
+            return
+        if header["type"] == "close":
+            return
+        try:
+            if header["type"] == "config":
+                config = read_config_message(header, body)
+                send_message(connection, {"type": "ready"})
+            elif header["type"] == "evaluate":
+                start = time.perf_counter()
+                evaluation_config = config.evaluation_config
+                job = (decode_payload(header, body, config), config, header["seeds"], evaluation_config.backend,
+                       evaluation_config.episode_limits())
+                play = record_episodes if header["record"] else play_episodes
+                if header["profile"]:
+                    result, (samples, counters) = run_profiled(play, *job)
+                elif header["count"]:
+                    result, (samples, counters) = run_counted(play, *job)
+                else:
+                    result, samples, counters = play(*job), {}, {}
+                reply = {"type": "result", "job": header["job"], "seconds": time.perf_counter() - start,
+                         "samples": samples, "counters": counters}
+                if header["record"]:
+                    # Frames of every episode in the header, the packed decisions one after the other in the body
+                    reply["fitness"], episode_actions = result
+                    records = [record for episodes in episode_actions for record in episodes]
+                    reply["frames"] = [frames for frames, _ in records]
+                    reply["sizes"] = [len(actions) for _, actions in records]
+                    send_message(connection, reply, b"".join(actions for _, actions in records))
+                else:
+                    reply["fitness"] = result
+                    send_message(connection, reply)
+            else:
+                raise ValueError(f"Unknown message type {header['type']!r}")
+        except Exception as error:
+            send_message(connection, {"type": "error", "job": header.get("job"), "error": repr(error)})
+
+
+def serve(address: str):
+    """Runs a worker, it serves one coordinator at a time."""
+    family, location = parse_address(address)
+    with socket.socket(family, socket.SOCK_STREAM) as listener:
+        if family == socket.AF_UNIX:
+            if os.path.exists(location):
+                os.remove(location)
+        else:
+            listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        listener.bind(location)
+        listener.listen()
+        print(f"Worker listening on {address}", flush=True)
+        while True:
+            connection, _ = listener.accept()
+            with connection:
+                if family != socket.AF_UNIX:
+                    connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                try:
+                    handle(connection)
+                except (OSError, ValueError) as error:
+                    print(f"Coordinator connection lost: {error!r}", flush=True)
+
+
+### Coordinator
+
+class WorkerConnection:
+    """Connection to one worker, opened on the first job and again after a failure."""
+
+    def __init__(self, address: str, timeout: float):
+        self.address = address
+        self.timeout = timeout
+        self.socket = None
+        self.abandoned = False
+        # Failures in a row, the worker gets no more jobs in this generation beyond the retries
+        self.failures = 0
+        self.jobs = 0
+        self.seconds = 0.0
+
+    def connect(self, hello: tuple[dict, bytes]):
+        family, location = parse_address(self.address)
+        # Set before the handshake, so abandon can interrupt it
+        self.socket = connection = socket.socket(family, socket.SOCK_STREAM)
+        connection.settimeout(self.timeout)
+        connection.connect(location)
+        if family != socket.AF_UNIX:
+            connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        send_message(connection, *hello)
+        reply, _ = receive_message(connection)
+        if reply["type"] != "ready":
+            raise WorkerError(f"Worker {self.address} rejected the config: {reply.get('error')}")
+
+    def run(self, hello: tuple[dict, bytes], header: dict, body: bytes) -> tuple[dict, bytes]:
+        if self.abandoned:
+            self.close()
+        if self.socket is None:
+            self.connect(hello)
+        send_message(self.socket, header, body)
+        reply, body = receive_message(self.socket)
+        if reply["type"] != "result":
+            raise WorkerError(f"Worker {self.address} failed job {header['job']}: {reply.get('error')}")
+        return reply, body
+
+    def abandon(self):
+        """Stops waiting for the job running on the worker, another one already played it."""
+        self.abandoned = True
+        if self.socket is not None:
+            try:
+                self.socket.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def close(self, goodbye: bool = False):
+        if self.socket is not None:
+            try:
+                if goodbye and not self.abandoned:
+                    send_message(self.socket, {"type": "close"})
+            except OSError:
+                pass
+            self.socket.close()
+        self.socket = None
+        self.abandoned = False
+
+
+class _Jobs:
+    """Jobs of one call, which worker plays them and their results. Every method runs under lock."""
+
+    def __init__(self, count: int):
+        self.lock = threading.Lock()
+        self.waiting = deque(range(count))
+        self.running = [set() for _ in range(count)]
+        self.results = [None] * count
+        self.attempts = [0] * count
+        self.error = None
+
+    def take(self, worker: WorkerConnection) -> int | None:
+        if self.error is not None:
+            return None
+        if self.waiting:
+            job = self.waiting.popleft()
+        else:
+            # Stragglers, the job with the fewest workers on it first
+            jobs = [job for job, workers in enumerate(self.running)
+                    if self.results[job] is None and workers and worker not in workers]
+            if not jobs:
+                return None
+            job = min(jobs, key=lambda job: len(self.running[job]))
+        self.running[job].add(worker)
+        return job
+
+    def finish(self, job: int, worker: WorkerConnection, result: tuple) -> bool:
+        """Records the result, returns whether it is the first one of the job."""
+        self.running[job].discard(worker)
+        worker.failures = 0
+        if self.results[job] is not None:
+            return False
+        self.results[job] = result
+        for other in self.running[job]:
+            other.abandon()
+        return True
+
+    def fail(self, job: int, worker: WorkerConnection, error: Exception, retries: int):
+        self.running[job].discard(worker)
+        if self.results[job] is not None:
+            # An abandoned straggler
+            return
+        worker.failures += 1
+        if self.running[job]:
+            # Still played elsewhere, the failed copy was a straggler run
+            return
+        self.attempts[job] += 1
+        if self.attempts[job] > retries:
+            self.error = self.error or WorkerError(
+                f"Job {job} failed {self.attempts[job]} times, last on {worker.address}: {error!r}")
+        elif job not in self.waiting:
+            self.waiting.append(job)
+
+
+class Coordinator:
+    """Plays the episodes of genomes on remote workers. Like a multiprocessing pool it is opened once per run and
+    closed at its end. A job gets timeout seconds and is played again after a failure at most retries times."""
+
+    def __init__(self, addresses: list[str], config, timeout: float = 120.0, retries: int = 2):
+        if not addresses:
+            raise ValueError("The coordinator needs at least one worker address")
+        self.workers = [WorkerConnection(address, timeout) for address in addresses]
+        self.retries = retries
+        self.hello = config_message(config)
+        self.genome_config = config.genome_config
+
+    def evaluate(self, genomes: list, seeds: list, record: bool = False) -> tuple[list[list[float]], list | None]:
+        """Fitness of every genome in every episode, in the order of genomes, and with record their recorded
+        episodes like evaluation.record_episodes."""
+        if not genomes:
+            return [], [] if record else None
+        chunks = np.array_split(np.array(genomes, dtype=object), min(len(genomes), jobs_per_worker * len(self.workers)))
+        payloads = [encode_payload(list(chunk), self.genome_config) for chunk in chunks]
+        jobs = _Jobs(len(payloads))
+        for worker in self.workers:
+            worker.failures = 0
+        threads = [threading.Thread(target=self._drive, args=(worker, jobs, payloads, list(seeds), record),
+                                    name=f"worker {worker.address}") for worker in self.workers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if jobs.error is not None:
+            raise jobs.error
+        if any(result is None for result in jobs.results):
+            raise WorkerError("Every worker failed, no worker is left to play the remaining jobs")
+        episode_fitness = [episodes for fitness, _ in jobs.results for episodes in fitness]
+        if not record:
+            return episode_fitness, None
+        return episode_fitness, [episodes for _, actions in jobs.results for episodes in actions]
+
+    def _drive(self, worker: WorkerConnection, jobs: _Jobs, payloads: list, seeds: list, record: bool):
+        """Gives the worker jobs until none is left or it failed too often."""
+        while worker.failures <= self.retries:
+            with jobs.lock:
+                job = jobs.take(worker)
+            if job is None:
+                return
+            header, body = payloads[job]
+            header = {**header, "type": "evaluate", "job": job, "seeds": seeds, "record": record,
+                      "profile": profiler.enabled, "count": profiler.counting}
+            try:
+                reply, body = worker.run(self.hello, header, body)
+            except (OSError, ValueError, WorkerError) as error:
+                worker.close()
+                with jobs.lock:
+                    jobs.fail(job, worker, error, self.retries)
+                continue
+            worker.jobs += 1
+            worker.seconds += reply["seconds"]
+            result = reply["fitness"], read_recorded_episodes(reply, body, len(seeds)) if record else None
+            with jobs.lock:
+                if jobs.finish(job, worker, result) and (profiler.enabled or profiler.counting):
+                    profiler.merge((reply["samples"], reply["counters"]))
+                    profiler.count("remote_jobs")
+
+    def close(self):
+        for worker in self.workers:
+            worker.close(goodbye=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("address", help="host:port or unix:/path to listen on")
+    serve(parser.parse_args().address)
@@ -0,0 +1,54 @@
+"""Rules that end an episode before the ball is lost.
+
+A genome that keeps the ball bouncing between the walls and the paddle without destroying bricks would play forever,
+so every episode has a step budget, a timeout without progress and can end once its fitness can no longer reach
+the fitness target. The rules work on arrays, one entry per game, and are shared by the batch and the rendered games.
+"""
+
+import numpy as np
+
+from sources.breakout_env import (fps, brick_columns, brick_rows, frame_reward, player_hit_reward, brick_reward,
+                                  min_hit_interval)
+
+
+class EpisodeLimits:
+    """max_steps ends an episode after that many frames, no_progress_steps once no brick was destroyed for that
+    many frames and fitness_target once even a perfect rest of the episode stays below it. 0 and None turn a rule
+    off, the fitness target needs a step budget to tell what is still reachable. Frames are dt seconds long."""
+
+    def __init__(self, max_steps: int = 0, no_progress_steps: int = 0, fitness_target: float | None = None,
+                 dt: float = 1.0 / fps):
+        self.max_steps = max_steps
+        self.no_progress_steps = no_progress_steps
+        self.fitness_target = fitness_target
+        self.dt = dt
+        # Both engines pay at most one paddle hit per this many frames
+        self.min_hit_interval = min_hit_interval(dt)
+        self.steps_without_progress = np.zeros(0, dtype=np.int64)
+
+    def key(self) -> tuple:
+        return self.max_steps, self.no_progress_steps, self.fitness_target, self.dt
+
+    def reset(self, size: int):
+        """Starts counting for a batch of size new episodes."""
+        self.steps_without_progress = np.zeros(size, dtype=np.int64)
+
+    def max_remaining_reward(self, steps: np.ndarray) -> np.ndarray:
+        """Upper bound of the reward still to be collected after steps frames."""
+        remaining = np.maximum(self.max_steps - steps, 0)
+        hits = np.ceil(remaining / self.min_hit_interval)
+        return (remaining * frame_reward * (self.dt * fps) + hits * max(player_hit_reward, 0)
+                + brick_columns * brick_rows * max(brick_reward, 0))
+
+    def update(self, steps: np.ndarray, fitness: np.ndarray, bricks_destroyed: np.ndarray) -> np.ndarray:
+        """Takes the steps played, the fitness so far and the bricks destroyed in the last step of every game.
+        Returns the games that have to stop."""
+        self.steps_without_progress = np.where(bricks_destroyed > 0, 0, self.steps_without_progress + 1)
+        stop = np.zeros(len(steps), dtype=bool)
+        if self.max_steps:
+            stop |= steps >= self.max_steps
+            if self.fitness_target is not None:
+                stop |= fitness + self.max_remaining_reward(steps) < self.fitness_target
+        if self.no_progress_steps:
+            stop |= self.steps_without_progress >= self.no_progress_steps
+        return stop
@@ -0,0 +1,55 @@
+"""Fitness of a genome over several episodes.
+
+One episode depends a lot on where the paddle starts and which way the ball is served, so a genome can win a
+generation by luck. Every genome plays the same K seeded episodes instead and their fitness is reduced to one
+value: the mean, the worst episode or a quantile. EpisodeVarianceReporter shows how much the episodes disagree.
+"""
+
+import neat
+import numpy as np
+
+fitness_reductions = ("mean", "min", "quantile")
+
+
+def episode_seeds(seed, episodes: int) -> list:
+    """Seeds of the episodes every genome plays, None plays random episodes."""
+    if seed is None:
+        return [None] * episodes
+    return [seed + episode for episode in range(episodes)]
+
+
+def reduce_fitness(episode_fitness, reduction: str = "mean", quantile: float = 0.25) -> np.ndarray:
+    """Fitness of every genome from an array of shape (genomes, episodes)."""
+    episode_fitness = np.asarray(episode_fitness, dtype=np.float64)
+    if reduction == "mean":
+        return episode_fitness.mean(axis=1)
+    if reduction == "min":
+        return episode_fitness.min(axis=1)
+    if reduction == "quantile":
+        return np.quantile(episode_fitness, quantile, axis=1)
+    raise ValueError(f"Unknown fitness reduction {reduction!r}, expected one of {fitness_reductions}")
+
+
+class EpisodeVarianceReporter(neat.reporting.BaseReporter):
+    """Reports the spread of the episode fitness of every genome after it was evaluated.
+    Genomes without episode fitness, like ones restored from a checkpoint, are left out."""
+
+    def __init__(self):
+        self.generation = None
+        # Standard deviation of the episode fitness of every genome, one array per generation
+        self.generation_deviations = []
+
+    def start_generation(self, generation):
+        self.generation = generation
+
+    def post_evaluate(self, config, population, species, best_genome):
+        episodes = [g.episode_fitness for g in population.values() if getattr(g, "episode_fitness", None) is not None]
+        if not episodes:
+            return
+        deviations = np.std(episodes, axis=1)
+        self.generation_deviations.append(deviations)
+        print(f"Episode fitness std: mean {deviations.mean():.3f}, max {deviations.max():.3f}")
+        best_episodes = getattr(best_genome, "episode_fitness", None)
+        if best_episodes is not None:
+            print(f"Best genome's episodes: {' '.join(f'{fitness:.3f}' for fitness in best_episodes)} "
+                  f"(std {np.std(best_episodes):.3f})")
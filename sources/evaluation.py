@@ -0,0 +1,116 @@
+"""Headless fitness evaluation: genomes play their games in lockstep in a batch environment
+and are controlled by one compiled network."""
+
+from functools import cache
+
+import numpy as np
+
+from sources.action_log import pack_actions
+from sources.action_repeat import ActionRepeat
+from sources.batch_env import make_batch_env, BRICK_DESTROYED
+from sources.batch_network import create_batch_network
+from sources.episode_limits import EpisodeLimits
+from sources.evaluation_config import get_evaluation_config
+from sources.profiling import profiler
+
+
+@cache
+def batch_env(backend: str, dt: float, substep: float):
+    return make_batch_env(0, backend, dt, substep)
+
+
+def shared_batch_env(size: int, backend: str, dt: float, substep: float):
+    """Every process reuses one batch environment for all the genomes it evaluates, resized to the batch.
+    It keeps as many games as the largest batch, not a set of games for every batch size."""
+    env = batch_env(backend, dt, substep)
+    if env.size != size:
+        env.resize(size)
+    return env
+
+
+def choose_actions(outputs: np.ndarray) -> np.ndarray:
+    """The output with the highest value picks the move: left, stand still or right."""
+    return np.argmax(outputs, axis=-1) - 1
+
+
+def create_action_repeat(config) -> ActionRepeat:
+    """The decision schedule of the evaluation config, checked against the inputs of the networks."""
+    repeat = get_evaluation_config(config).action_repeat()
+    if repeat.inputs != config.genome_config.num_inputs:
+        raise ValueError(f"Observation mode {repeat.observation_mode!r} with a decision interval of {repeat.interval} "
+                         f"needs num_inputs = {repeat.inputs}, the genome config has "
+                         f"{config.genome_config.num_inputs}")
+    return repeat
+
+
+def play_genomes(genomes: list, config, seed=None, backend="pymunk",
+                 limits: EpisodeLimits | None = None, log: list | None = None) -> list[float]:
+    """Plays one game per genome until the ball is lost or the limits end it and returns their fitness.
+    seed is one seed for all games or a sequence with a seed per game. Frames, substeps and the decision interval
+    are what the evaluation config of config says. When log is a list, the frames played and the packed decisions
+    of every game are appended to it. Safe to run in a pool worker."""
+    evaluation_config = get_evaluation_config(config)
+    env = shared_batch_env(len(genomes), backend, evaluation_config.timestep, evaluation_config.substep)
+    limits = limits or EpisodeLimits()
+    repeat = create_action_repeat(config)
+    limits.reset(len(genomes))
+    repeat.reset(len(genomes))
+    inputs = repeat.observe(env.reset(seed))
+    fitness = np.zeros(len(genomes))
+    actions = np.zeros(len(genomes), dtype=np.int64)
+    # Genomes the network is compiled for, it is recompiled for the running ones once half of them are over
+    # and a recurrent network carries their state over
+    playing = np.arange(len(genomes))
+    with profiler.phase("compile"):
+        network = create_batch_network(genomes, config)
+    network.reset()
+    decisions = []
+    while not env.done.all():
+        running = np.flatnonzero(~env.done)
+        if len(running) <= len(playing) // 2:
+            with profiler.phase("compile"):
+                compacted = create_batch_network([genomes[i] for i in running], config)
+                compacted.take_state(network, np.searchsorted(playing, running))
+            playing, network = running, compacted
+
+        # Between decisions the actions are held
+        if inputs is not None:
+            with profiler.phase("activate"):
+                actions[playing] = choose_actions(network.activate(inputs[playing]))
+            profiler.count("decisions", len(running))
+            if log is not None:
+                decisions.append(actions.astype(np.int8))
+        with profiler.phase("physics"):
+            observation, rewards, _ = env.step(actions)
+        profiler.count("steps", len(running))
+        inputs = repeat.observe(observation)
+        fitness += rewards
+        env.done |= limits.update(env.steps, fitness, env.events[:, BRICK_DESTROYED])
+
+    if log is not None:
+        # A game took a decision on every interval-th of the frames it played
+        decisions = np.reshape(decisions, (-1, len(genomes)))
+        for game, frames in enumerate(env.steps.tolist()):
+            log.append((frames, pack_actions(decisions[:-(-frames // repeat.interval), game])))
+    return fitness.tolist()
+
+
+def play_episodes(genomes: list, config, seeds: list, backend="pymunk",
+                  limits: EpisodeLimits | None = None) -> list[list[float]]:
+    """Plays an episode for every seed with every genome, all of them in one batch.
+    Returns the fitness of every genome in every episode. Safe to run in a pool worker."""
+    games = [genome for genome in genomes for _ in seeds]
+    fitness = play_genomes(games, config, list(seeds) * len(genomes), backend, limits)
+    return np.reshape(fitness, (len(genomes), len(seeds))).tolist()
+
+
+def record_episodes(genomes: list, config, seeds: list, backend="pymunk",
+                    limits: EpisodeLimits | None = None) -> tuple[list[list[float]], list[list[tuple]]]:
+    """play_episodes that also returns the frames played and the packed decisions of every episode of every genome.
+    Safe to run in a pool worker."""
+    games = [genome for genome in genomes for _ in seeds]
+    log = []
+    fitness = play_genomes(games, config, list(seeds) * len(genomes), backend, limits, log)
+    episodes = len(seeds)
+    return (np.reshape(fitness, (len(genomes), episodes)).tolist(),
+            [log[i:i + episodes] for i in range(0, len(log), episodes)])
@@ -0,0 +1,122 @@
+import warnings
+from configparser import ConfigParser
+from functools import cache
+
+from sources.action_repeat import ActionRepeat
+from sources.breakout_env import fps
+from sources.episode_limits import EpisodeLimits
+from sources.episodes import episode_seeds
+
+
+class EvaluationConfig:
+    """Game evaluation settings from the [BreakoutEvaluation] section of the NEAT config file.
+    NEAT itself ignores this section, so the same file serves both."""
+    section_name = "BreakoutEvaluation"
+
+    def __init__(self, config_path: str | None = None):
+        # 0 workers means one worker per CPU core
+        self.num_workers = 0
+        # Episodes are replayed with this seed, None means a new random episode every time
+        self.seed = None
+        # Addresses of remote workers, host:port or unix:/path, none evaluates on a local process pool.
+        # A job that does not finish within worker_timeout seconds or fails is played again at most
+        # worker_retries times
+        self.workers = []
+        self.worker_timeout = 120.0
+        self.worker_retries = 2
+        # Physics backend of headless games: pymunk or numpy. numpy is approximate, it ranks genomes like pymunk but
+        # their games drift apart and fitness can be half as high, fitness_threshold is meant for pymunk
+        self.backend = "pymunk"
+        # Seconds of play per frame and the longest physics step pymunk takes near a collision
+        self.timestep = 1.0 / fps
+        self.substep = 1.0 / fps
+        # The network decides every decision_interval frames and holds its action in between, it sees the last
+        # observation, the mean of the interval's observations or all of them stacked (last, mean or stack)
+        self.decision_interval = 1
+        self.observation_mode = "last"
+        # Every genome plays this many episodes, seeded with seed, seed + 1, ..., their fitness is reduced
+        # by mean, min or quantile, the last one takes fitness_quantile of the episodes
+        self.episodes = 1
+        self.fitness_reduction = "mean"
+        self.fitness_quantile = 0.25
+        # Seeded episodes are recorded and written next to the checkpoints for replay
+        self.record_actions = False
+        # Fitness of this many seeded genomes is remembered, 0 plays every genome again
+        self.fitness_cache_size = 10000
+        # Episode limits, 0 and an empty fitness target turn a limit off. An episode that can not reach the fitness
+        # target only rules the genome out when its fitness is that episode or the minimum of its episodes,
+        # with a mean or a quantile of several episodes the target ends none
+        self.max_steps = 0
+        self.no_progress_steps = 0
+        self.fitness_target = None
+        # Whole populations pickled every generation next to the CheckpointStore, see sources/checkpoint_store.py
+        self.neat_checkpoints = False
+        # Per-phase timings of every generation, also appended to profile_path as JSON lines when it is set
+        self.profile = False
+        self.profile_path = None
+
+        if config_path is None:
+            return
+
+        parser = ConfigParser()
+        parser.read(config_path)
+        if not parser.has_section(self.section_name):
+            return
+
+        section = parser[self.section_name]
+        self.num_workers = section.getint("num_workers", self.num_workers)
+        self.workers = [address.strip() for address in section.get("workers", "").split(",") if address.strip()]
+        self.worker_timeout = section.getfloat("worker_timeout", self.worker_timeout)
+        self.worker_retries = section.getint("worker_retries", self.worker_retries)
+        self.backend = section.get("backend", self.backend).strip()
+        self.timestep = section.getfloat("timestep", self.timestep)
+        self.substep = section.getfloat("substep", self.substep)
+        self.decision_interval = section.getint("decision_interval", self.decision_interval)
+        self.observation_mode = section.get("observation_mode", self.observation_mode).strip()
+        self.episodes = section.getint("episodes", self.episodes)
+        self.fitness_reduction = section.get("fitness_reduction", self.fitness_reduction).strip()
+        self.fitness_quantile = section.getfloat("fitness_quantile", self.fitness_quantile)
+        self.record_actions = section.getboolean("record_actions", self.record_actions)
+        self.fitness_cache_size = section.getint("fitness_cache_size", self.fitness_cache_size)
+        self.max_steps = section.getint("max_steps", self.max_steps)
+        self.no_progress_steps = section.getint("no_progress_steps", self.no_progress_steps)
+        fitness_target = section.get("fitness_target", "").strip()
+        self.fitness_target = float(fitness_target) if fitness_target and fitness_target.lower() != "none" else None
+        self.neat_checkpoints = section.getboolean("neat_checkpoints", self.neat_checkpoints)
+        self.profile = section.getboolean("profile", self.profile)
+        self.profile_path = section.get("profile_path", "").strip() or None
+        seed = section.get("seed", "").strip()
+        self.seed = int(seed) if seed and seed.lower() != "none" else None
+        # Warns about a fitness target that is dropped while the config is loaded
+        self.episode_limits()
+
+    def episode_limits(self) -> EpisodeLimits:
+        """The same limits for the same settings, they are built and checked once."""
+        return episode_limits(self.max_steps, self.no_progress_steps, self.fitness_target, self.timestep,
+                              self.episodes, self.fitness_reduction)
+
+    def action_repeat(self) -> ActionRepeat:
+        return ActionRepeat(self.decision_interval, self.observation_mode)
+
+    def episode_seeds(self) -> list:
+        return episode_seeds(self.seed, self.episodes)
+
+    def recording(self) -> bool:
+        """Random episodes can not be replayed, so only seeded ones are recorded."""
+        return self.record_actions and self.seed is not None
+
+
+@cache
+def episode_limits(max_steps: int, no_progress_steps: int, fitness_target: float | None, timestep: float,
+                   episodes: int, fitness_reduction: str) -> EpisodeLimits:
+    target_rules_out = episodes == 1 or fitness_reduction == "min"
+    if fitness_target is not None and not target_rules_out:
+        warnings.warn(f"fitness_target = {fitness_target} is ignored, with {episodes} episodes reduced "
+                      f"by {fitness_reduction} one episode can not rule a genome out")
+        fitness_target = None
+    return EpisodeLimits(max_steps, no_progress_steps, fitness_target, timestep)
+
+
+def get_evaluation_config(config) -> EvaluationConfig:
+    """Checkpoints written before the section existed have no evaluation config attached."""
+    return getattr(config, "evaluation_config", None) or EvaluationConfig()
@@ -0,0 +1,112 @@
+"""Fitness of genomes that were already played.
+
+A seeded episode is deterministic, so a genome with the same structure, seed and game always scores the same.
+Elites are carried over unchanged into the next generation and checkpoints store scored genomes,
+both are looked up here instead of being played again.
+"""
+
+import hashlib
+from collections import OrderedDict
+from functools import cache
+
+from sources import breakout_env
+from sources.evaluation_config import get_evaluation_config
+
+# Everything in the game that changes the fitness of a genome
+game_parameters = ("width", "height", "fps", "ball_speed", "player_speed", "wall_offset", "wall_radius",
+                   "ball_radius", "player_y", "player_half_length", "player_radius", "brick_columns",
+                   "brick_rows", "brick_size", "brick_origin", "serve_directions", "player_start_range",
+                   "frame_reward", "brick_reward", "player_hit_reward", "ball_lost_reward")
+
+
+def genome_hash(genome) -> str:
+    """Hash of everything that makes up the phenotype of the genome, its key and fitness are left out."""
+    nodes = [(key, *(getattr(gene, a.name) for a in gene._gene_attributes))
+             for key, gene in sorted(genome.nodes.items())]
+    connections = [(key, *(getattr(gene, a.name) for a in gene._gene_attributes))
+                   for key, gene in sorted(genome.connections.items())]
+    return hashlib.blake2b(repr((nodes, connections)).encode(), digest_size=16).hexdigest()
+
+
+def episode_key(config) -> tuple | None:
+    """The seeds, the fitness reduction, the decision interval, the episode limits and everything about the game that
+    is not part of the genome, None when every episode is random and can not be cached."""
+    evaluation_config = get_evaluation_config(config)
+    if evaluation_config.seed is None:
+        return None
+    game = repr(tuple(getattr(breakout_env, name) for name in game_parameters))
+    return (evaluation_config.seed, evaluation_config.episodes, evaluation_config.fitness_reduction,
+            evaluation_config.fitness_quantile, evaluation_config.backend, evaluation_config.substep,
+            evaluation_config.action_repeat().key(), config.genome_config.feed_forward,
+            evaluation_config.episode_limits().key(), game)
+
+
+class FitnessCache:
+    """Fitness, episode fitness and recorded episodes by genome hash and episode, the least recently used entries
+    are dropped beyond max_size."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, genome, config) -> tuple | None:
+        episode = episode_key(config)
+        if episode is None or self.max_size <= 0:
+            return None
+        return genome_hash(genome), episode
+
+    def get(self, key):
+        if key is None or key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, entry: tuple):
+        if key is None:
+            return
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def lookup(self, genomes: list, config) -> tuple[list, list]:
+        """Sets the fitness of the genomes that were already played.
+        Returns the cache keys of all genomes and the indexes of the genomes that still have to be played.
+        A genome that carries the fitness of the same episode, like one restored from a checkpoint,
+        counts as played too, its recorded episodes are the cached ones when it no longer carries them."""
+        keys = [self.key(genome, config) for genome in genomes]
+        missing = []
+        for i, (genome, key) in enumerate(zip(genomes, keys)):
+            if key is not None and genome.fitness is not None and getattr(genome, "fitness_key", None) == key:
+                cached = self.entries.get(key)
+                if getattr(genome, "episode_actions", None) is None and cached is not None:
+                    genome.episode_actions = cached[2]
+                self.put(key, (genome.fitness, getattr(genome, "episode_fitness", None),
+                               getattr(genome, "episode_actions", None)))
+                self.hits += 1
+                continue
+            entry = self.get(key)
+            if entry is None:
+                missing.append(i)
+            else:
+                genome.fitness, genome.episode_fitness, genome.episode_actions = entry
+                genome.fitness_key = key
+        return keys, missing
+
+    def store(self, genome, key, fitness: float, episode_fitness: list[float] | None = None,
+              episode_actions: list | None = None):
+        genome.fitness = fitness
+        genome.episode_fitness = episode_fitness
+        genome.episode_actions = episode_actions
+        genome.fitness_key = key
+        self.put(key, (fitness, episode_fitness, episode_actions))
+
+
+@cache
+def shared_fitness_cache(max_size: int) -> FitnessCache:
+    """The process running the training keeps one cache for all generations."""
+    return FitnessCache(max_size)
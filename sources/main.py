@@ -1,376 +1,374 @@
-"""Very simple breakout clone. A circle shape serves as the paddle, then
-breakable bricks constructed of Poly-shapes.
-
-The code showcases several pymunk concepts such as elasitcity, impulses,
-constant object speed, joints, collision handlers and post step callbacks.
+"""Very simple breakout clone played by NEAT genomes. The game itself lives in
+sources.breakout_env, this module plays it, renders it and runs the training.
 """
 
-import random
+import multiprocessing
+import numpy as np
 import neat
 import os
-from functools import partial
+from functools import partial, cache
 from datetime import datetime
-from sources.visualize import *
-
-import pygame
-
-import pymunk
-import pymunk.pygame_util
-from pymunk import Vec2d
-
-
-class GenerationCounter:
-    generation_num: int = 0
-    current_time: str
-
-    @staticmethod
-    def add_generation():
-        GenerationCounter.generation_num += 1
-
-    @staticmethod
-    def set_current_time(time: str):
-        GenerationCounter.current_time = time
-
-
-width, height = 1000, 800
-
-collision_types = {
-    "ball": 1,
-    "brick": 2,
-    "bottom": 3,
-    "player": 4,
-}
-
-
-def spawn_ball(space, position, direction):
-    global ball_body
-    ball_body = pymunk.Body(1, float("inf"))
-    ball_body.position = position
-
-    ball_shape = pymunk.Circle(ball_body, 5)
-    ball_shape.color = pygame.Color("green")
-    ball_shape.elasticity = 1.0
-    ball_shape.collision_type = collision_types["ball"]
-
-    ball_body.apply_impulse_at_local_point(Vec2d(*direction))
+from sources.evaluation_config import EvaluationConfig, get_evaluation_config
+from sources.breakout_env import BreakoutEnv, width, height, colors
+from sources.evaluation import play_episodes, record_episodes, choose_actions, create_action_repeat
+from sources.action_repeat import ActionRepeat
+from sources.fitness_cache import shared_fitness_cache
+from sources.episode_limits import EpisodeLimits
+from sources.episodes import reduce_fitness, EpisodeVarianceReporter
+from sources.checkpoint_store import CheckpointStore, PopulationCheckpointer
+from sources.compact_genome import genome_type
+from sources.action_log import ActionLog, ActionLogReporter
+from sources.artifacts import ArtifactWorker, ArtifactReporter, statistics_snapshot, plot_fitness
+from sources.distributed import Coordinator
+from sources.profiling import profiler, run_profiled, run_counted, ProfilingReporter
+from sources.batch_network import create_batch_network
+from sources.speciation import species_set_type
 
-    # Keep ball velocity at a static value
-    def constant_velocity(body, gravity, damping, dt):
-        body.velocity = body.velocity.normalized() * 2000
+# pygame is imported by the functions that draw and read the keyboard, the graphviz and matplotlib diagrams by
+# the artifacts worker, so headless training and the processes evaluating for it load neither of them
 
-    ball_body.velocity_func = constant_velocity
 
-    space.add(ball_body, ball_shape)
-    return ball_shape
+class GameClosed(Exception):
+    """The window of a rendered game was closed, nothing more is shown."""
 
 
-def setup_level(space, player_body, brick_destroyed_callback):
-    # Remove balls and bricks
-    for s in space.shapes[:]:
-        if s.body.body_type == pymunk.Body.DYNAMIC and s.body not in [player_body]:
-            space.remove(s.body, s)
+def choose_action(network, observation: np.ndarray) -> int:
+    return int(choose_actions(network.activate(observation[None]))[0])
 
-    # Spawn a ball for the player to have something to play with
-    spawn_ball(
-        space, player_body.position + (0, 40), random.choice([(1, 10), (-1, 10)])
-    )
 
-    # Spawn bricks
-    for x in range(0, 41):
-        x = x * 20 + 100
-        for y in range(0, 10):
-            y = y * 10 + height - 200
-            brick_body = pymunk.Body(body_type=pymunk.Body.KINEMATIC)
-            brick_body.position = x, y
-            brick_shape = pymunk.Poly.create_box(brick_body, (20, 10))
-            brick_shape.elasticity = 1.0
-            brick_shape.color = pygame.Color("blue")
-            brick_shape.group = 1
-            brick_shape.collision_type = collision_types["brick"]
-            space.add(brick_body, brick_shape)
+def keyboard_action() -> int:
+    import pygame
+    keys = pygame.key.get_pressed()
+    return keys[pygame.K_RIGHT] - keys[pygame.K_LEFT]
 
-    # Make bricks be removed when hit by ball
-    def remove_brick(arbiter, space, data):
-        brick_shape = arbiter.shapes[0]
-        space.remove(brick_shape, brick_shape.body)
-        brick_destroyed_callback()
 
-    h = space.add_collision_handler(collision_types["brick"], collision_types["ball"])
-    h.separate = remove_brick
+def limit_reached(limits: EpisodeLimits, env: BreakoutEnv, fitness: float) -> bool:
+    return bool(limits.update(np.array([env.steps]), np.array([fitness]), np.array([env.bricks_destroyed]))[0])
 
 
-def main(game_end_callback, game_update_callback, brick_destroyed_callback, ball_collision_callback, gen_id):
-    ### PyGame init
+@cache
+def game_window() -> tuple:
+    """The window, clock, font and draw options, created once and reused by every rendered game."""
+    import pygame
+    import pymunk.pygame_util
     pygame.init()
     screen = pygame.display.set_mode((width, height))
-    clock = pygame.time.Clock()
-    running = True
-    font = pygame.font.SysFont("Arial", 16)
-    ### Physics stuff
-    space = pymunk.Space()
     pymunk.pygame_util.positive_y_is_up = True
-    draw_options = pymunk.pygame_util.DrawOptions(screen)
-
-    ### Game area
-    # walls - the left-top-right walls
-
-    static_lines = [
-        pymunk.Segment(space.static_body, (50, 50), (50, height - 50), 10),
-        pymunk.Segment(space.static_body, (50, height - 50), (width - 50, height - 50), 10),
-        pymunk.Segment(space.static_body, (width - 50, height - 50), (width - 50, 50), 10),
-    ]
-    for line in static_lines:
-        line.color = pygame.Color("lightgray")
-        line.elasticity = 1.0
-
-    space.add(*static_lines)
-
-    # bottom - a sensor that removes anything touching it
-    bottom = pymunk.Segment(space.static_body, (50, 50), (width - 50, 50), 10)
-    bottom.sensor = True
-    bottom.collision_type = collision_types["bottom"]
-    bottom.color = pygame.Color("red")
-
-    def remove_first(arbiter, space, data):
-        ball_shape = arbiter.shapes[0]
-        space.remove(ball_shape, ball_shape.body)
-        game_end_callback()
-        return True
-
-    h = space.add_collision_handler(collision_types["ball"], collision_types["bottom"])
-    h.begin = remove_first
-    space.add(bottom)
-
-    ### Player ship
-    global player_body
-    player_body = pymunk.Body(500, float("inf"))
-    player_body.position = width / 2, 100
-
-    player_shape = pymunk.Segment(player_body, (-50, 0), (50, 0), 15)
-    player_shape.color = pygame.Color("red")
-    player_shape.elasticity = 1.0
-    player_shape.collision_type = collision_types["player"]
-
-    def pre_solve(arbiter, space, data):
-        # We want to update the collision normal to make the bounce direction
-        # dependent of where on the paddle the ball hits. Note that this
-        # calculation isn't perfect, but just a quick example.
-        set_ = arbiter.contact_point_set
-        if len(set_.points) > 0:
-            player_shape = arbiter.shapes[0]
-            width = (player_shape.b - player_shape.a).x
-            delta = (player_shape.body.position - set_.points[0].point_a).x
-            normal = Vec2d(0, 1).rotated(delta / width / 2)
-            set_.normal = normal
-            set_.points[0].distance = 0
-        arbiter.contact_point_set = set_
-        ball_collision_callback()
-        return True
-
-    h = space.add_collision_handler(collision_types["player"], collision_types["ball"])
-    h.pre_solve = pre_solve
-
-    # restrict movement of player to a straigt line
-    # move_joint = pymunk.GrooveJoint(
-    #     space.static_body, player_body, (100, 100), (width - 100, 100), (0, 0)
-    # )
-    space.add(player_body, player_shape)
-    global state
-    # Start game
-    setup_level(space, player_body, brick_destroyed_callback)
-    while running:
-        game_update_callback()
+    return screen, pygame.time.Clock(), pygame.font.SysFont("Arial", 16), pymunk.pygame_util.DrawOptions(screen)
+
+
+def main(env: BreakoutEnv, network=None, seed=None, headless=False, limits: EpisodeLimits | None = None,
+         repeat: ActionRepeat | None = None) -> float:
+    """Plays one game and returns its fitness. The network moves the paddle, without one the arrow keys do.
+    The network decides when repeat says so and holds its action in between.
+    In headless mode there is no window, no drawing and no frame-rate cap,
+    the space is stepped as fast as possible until the ball is lost or the limits end the game.
+    Closing the window raises GameClosed, ESC and Q only end this game."""
+    limits = limits or EpisodeLimits()
+    repeat = repeat or ActionRepeat()
+    env.reset(seed)
+    limits.reset(1)
+    repeat.reset(1)
+    if network is not None:
+        network.reset()
+    fitness = 0.0
+    action = 0
+    inputs = repeat.observe(env.observation()[None])
+
+    if headless:
+        while not env.done:
+            if inputs is not None:
+                with profiler.phase("activate"):
+                    action = choose_action(network, inputs[0])
+                profiler.count("decisions")
+            with profiler.phase("physics"):
+                reward, _ = env.step(action)
+            profiler.count("steps")
+            inputs = repeat.observe(env.observation()[None])
+            fitness += reward
+            env.done |= limit_reached(limits, env, fitness)
+        return fitness
 
+    ### PyGame init
+    import pygame
+    screen, clock, font, draw_options = game_window()
+    running = True
+
+    while running and not env.done:
         for event in pygame.event.get():
-            if event.type == pygame.USEREVENT:
-                running = False
             if event.type == pygame.QUIT:
                 pygame.quit()
+                game_window.cache_clear()
+                raise GameClosed()
             elif event.type == pygame.KEYDOWN and (
                     event.key in [pygame.K_ESCAPE, pygame.K_q]
             ):
                 running = False
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
                 pygame.image.save(screen, "breakout.png")
-
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
-                player_body.velocity = (-1500, 0)
-            elif event.type == pygame.KEYUP and event.key == pygame.K_LEFT:
-                player_body.velocity = 0, 0
-
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
-                player_body.velocity = (1000, 0)
-            elif event.type == pygame.KEYUP and event.key == pygame.K_RIGHT:
-                player_body.velocity = 0, 0
-
             elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
-                setup_level(space, player_body)
-            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
-                spawn_ball(
-                    space,
-                    player_body.position + (0, 40),
-                    random.choice([(1, 10), (-1, 10)]),
-                )
-
-        ### Clear screen
-        screen.fill(pygame.Color("black"))
-
-        ### Draw stuff
-        space.debug_draw(draw_options)
-
-        state = []
-        for x in space.shapes:
-            s = "%s %s %s" % (x, x.body.position, x.body.velocity)
-            state.append(s)
+                env.reset(seed)
+                limits.reset(1)
+                repeat.reset(1)
+                if network is not None:
+                    network.reset()
+                fitness = 0.0
+                inputs = repeat.observe(env.observation()[None])
+
+        with profiler.phase("activate"):
+            if network is None:
+                action = keyboard_action()
+            elif inputs is not None:
+                action = choose_action(network, inputs[0])
+
+        with profiler.phase("draw"):
+            ### Clear screen
+            screen.fill(colors["background"])
+
+            ### Draw stuff
+            env.space.debug_draw(draw_options)
+
+            ### Info
+            screen.blit(
+                font.render("fps: " + str(clock.get_fps()), 1, pygame.Color("white")),
+                (0, 0),
+            )
+            screen.blit(
+                font.render(
+                    "Move with left/right arrows when no genome is playing",
+                    1,
+                    pygame.Color("darkgrey"),
+                ),
+                (5, height - 35),
+            )
+            screen.blit(
+                font.render(
+                    "Press R to reset, ESC or Q to quit", 1, pygame.Color("darkgrey")
+                ),
+                (5, height - 20),
+            )
 
         ### Update physics
-        fps = 200
-        dt = 1.0 / fps
-        space.step(dt)
-
-        ### Info and flip screen
-        screen.blit(
-            font.render("fps: " + str(clock.get_fps()), 1, pygame.Color("white")),
-            (0, 0),
-        )
-        screen.blit(
-            font.render(
-                "Move with left/right arrows, space to spawn a ball",
-                1,
-                pygame.Color("darkgrey"),
-            ),
-            (5, height - 35),
-        )
-        screen.blit(
-            font.render(
-                "Press R to reset, ESC or Q to quit", 1, pygame.Color("darkgrey")
-            ),
-            (5, height - 20),
-        )
-
-        pygame.display.flip()
-        clock.tick(fps)
-    return genomes[gen_id]
-
-
-def eval_genomes(raw_genomes: list[neat.DefaultGenome], config):
-    global genomes, networks, tries
-
-    tries = 0
-    networks = []
-    genomes = raw_genomes
-
-    for _, g in raw_genomes:
-        net = neat.nn.FeedForwardNetwork.create(g, config)
-        networks.append(net)
-        g.fitness = 0
-
-    genomes = raw_genomes
-    run = True
-    for i in range(len(genomes)):
-        main(partial(restart_game, i),
-             partial(update_event, i),
-             partial(add_val_to_fitness, i, 0),
-             partial(add_val_to_fitness, i, 15), i)
-
-    genomes = sorted(genomes, key=lambda x: x[1].fitness)
-    winner = genomes[0][1]
-    node_names = {-1: "Кооордината мяча X", -2: "Коррдината мяча Y", -3: "Разница между X шарика и X платформы",
-                  -4: "Разница между Y шарика и Y платформы", 0: "Движение влево", 1: "Стоять на месте",
-                  2: "Движение вправо"}
-    checkpoints_dir_name = f"checkpoints {GenerationCounter.current_time}"
-    draw_net(config, winner, True, node_names=node_names,
-             filename=f"{checkpoints_dir_name}/neuro_schemes/winner_{GenerationCounter.generation_num}.svg")
-    GenerationCounter.add_generation()
-
-    # visualise.plot_stats(stats, ylog=False, view=True)
-    # visualise.plot_species(stats, view=True)
-    # with multiprocessing.Pool(multiprocessing.cpu_count() - 1,
-    #                           initializer=initialize_values, initargs=(raw_genomes, networks)) as pool:
-    #     genomes = genomes
-    #     tries = tries
-    #     networks = networks
-    #     # restart_cb = lambda: restart_game(i)
-    #     # update_cb = lambda: update_event(i)
-    #     # add_val2 = lambda: add_val_to_fitness(i, 2)
-    #     # add_val15 = lambda: add_val_to_fitness(i, 15)
-    #     p = pool.starmap(main, [[partial(restart_game, i),
-    #                             partial(update_event, i),
-    #                             partial(add_val_to_fitness, i, 2),
-    #                             partial(add_val_to_fitness, i, 15), i] for i in range(len(raw_genomes))])
-    #
-    #     p.sort(key=lambda x: x[0], reverse=True)
-    #
-    # for raw_genome in raw_genomes:
-    #     trained = p.pop(-1)
-    #     raw_genome[1].fitness = trained[1].fitness
-
-
-def initialize_values(g, n):
-    global genomes, networks
-    genomes = g
-    networks = n
-
-
-def restart_game(gen_id):
-    pygame.event.post(pygame.event.Event(pygame.USEREVENT, code=0))
-    add_val_to_fitness(gen_id, -10)
-
-
-def add_val_to_fitness(gen_id, val):
-    try:
-        genomes[gen_id][1].fitness += val
-    except Exception:
-        print(genomes)
-        print(gen_id)
-        raise ValueError()
-
-
-def update_event(gen_id):
-    global genomes, player_body, ball_body
-    add_val_to_fitness(gen_id, 0.001)
-    # if not (player_body.position.x > 100 and player_body.position.x < width - 100):
-    #     add_val_to_fitness(gen_id, -20)
-    #     pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_ESCAPE))
-
-    output = networks[gen_id].activate(
-        (ball_body.position.x, ball_body.position.y,
-         abs(player_body.position.x - ball_body.position.x), abs(player_body.position.y - ball_body.position.y)))
-    general_output = output.index(max(output)) - 1
-
-    player_body.velocity = (general_output * 2000, 0)
+        with profiler.phase("physics"):
+            reward, _ = env.step(action)
+        profiler.count("steps")
+        fitness += reward
+        env.done |= limit_reached(limits, env, fitness)
+        inputs = repeat.observe(env.observation()[None])
+
+        ### Flip screen
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        with profiler.phase("tick"):
+            clock.tick(1 / env.dt)
+    return fitness
+
+
+def watch_episode(log: ActionLog, genome_key: int | None = None, episode: int = 0, seek: int = 0,
+                  speed: int = 1) -> float:
+    """Shows a recorded episode, the best genome's by default, and returns its fitness.
+    It starts at frame seek and plays speed frames per drawn frame. The arrow keys double and halve the speed,
+    space pauses, S skips ten seconds ahead, R starts over and ESC or Q quit."""
+    import pygame
+    if log.settings["backend"] != "pymunk":
+        raise ValueError(f"Episodes played with the {log.settings['backend']} backend can not be shown")
+    genome_key = log.best_genome_key() if genome_key is None else genome_key
+    actions = log.frame_actions(genome_key, episode)
+    env = BreakoutEnv(log.settings["timestep"], log.settings["substep"])
+    env.reset(log.seed(genome_key, episode))
+    frame, fitness, target = 0, 0.0, seek
+    paused = False
+
+    screen, clock, font, draw_options = game_window()
+    running = True
+    while running and frame < len(actions):
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                game_window.cache_clear()
+                return fitness
+            elif event.type == pygame.KEYDOWN and event.key in [pygame.K_ESCAPE, pygame.K_q]:
+                running = False
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_RIGHT:
+                speed *= 2
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_LEFT:
+                speed = max(1, speed // 2)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_SPACE:
+                paused = not paused
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_s:
+                target = frame + round(10 / env.dt)
+            elif event.type == pygame.KEYDOWN and event.key == pygame.K_r:
+                env.reset(log.seed(genome_key, episode))
+                frame, fitness, target = 0, 0.0, 0
+
+        ### Seeking plays the frames in between without drawing them
+        if not paused:
+            target = max(target, frame + speed)
+        with profiler.phase("physics"):
+            while frame < min(target, len(actions)):
+                reward, _ = env.step(int(actions[frame]))
+                fitness += reward
+                frame += 1
+
+        with profiler.phase("draw"):
+            screen.fill(colors["background"])
+            env.space.debug_draw(draw_options)
+            screen.blit(
+                font.render(f"genome {genome_key}, episode {episode}, frame {frame} of {len(actions)}, "
+                            f"x{speed}{' paused' if paused else ''}, fitness {fitness:.2f}",
+                            1, pygame.Color("white")),
+                (0, 0),
+            )
+            screen.blit(
+                font.render(
+                    "Arrows change the speed, space pauses, S skips ahead, R restarts, ESC or Q quits",
+                    1,
+                    pygame.Color("darkgrey"),
+                ),
+                (5, height - 20),
+            )
+
+        with profiler.phase("flip"):
+            pygame.display.flip()
+        with profiler.phase("tick"):
+            clock.tick(1 / env.dt)
+    return fitness
+
+
+@cache
+def shared_env(dt: float, substep: float) -> BreakoutEnv:
+    """Every process plays all of its games in one environment."""
+    return BreakoutEnv(dt, substep)
+
+
+def eval_genome(genome: neat.DefaultGenome, config, seed=None, headless=True):
+    """Plays one game with the genome and returns its fitness. Safe to run in a pool worker."""
+    network = create_batch_network([genome], config)
+    evaluation_config = get_evaluation_config(config)
+    env = shared_env(evaluation_config.timestep, evaluation_config.substep)
+    return main(env, network, seed, headless, evaluation_config.episode_limits(), create_action_repeat(config))
+
+
+def eval_genomes(raw_genomes: list[neat.DefaultGenome], config, headless=True, pool=None):
+    evaluation_config = get_evaluation_config(config)
+    seeds = evaluation_config.episode_seeds()
+    reduction = evaluation_config.fitness_reduction, evaluation_config.fitness_quantile
+    profiler.count("genomes", len(raw_genomes))
+    if not headless:
+        for _, g in raw_genomes:
+            g.episode_fitness = [eval_genome(g, config, seed, headless) for seed in seeds]
+            g.fitness = float(reduce_fitness([g.episode_fitness], *reduction)[0])
+    else:
+        # Genomes played before with the same seeds keep their fitness
+        with profiler.phase("fitness_cache"):
+            fitness_cache = shared_fitness_cache(evaluation_config.fitness_cache_size)
+            all_genomes = [g for _, g in raw_genomes]
+            keys, missing = fitness_cache.lookup(all_genomes, config)
+
+        # Every worker plays all episodes of its share of the remaining genomes as one batch
+        with profiler.phase("evaluation"):
+            if isinstance(pool, Coordinator):
+                episode_fitness, episode_actions = pool.evaluate([all_genomes[i] for i in missing], seeds,
+                                                                 evaluation_config.recording())
+            else:
+                episode_fitness, episode_actions = play_locally([all_genomes[i] for i in missing], config, seeds,
+                                                                pool)
+
+        if missing:
+            fitnesses = reduce_fitness(episode_fitness, *reduction)
+            episode_actions = episode_actions or [None] * len(missing)
+            for i, fitness, episodes, actions in zip(missing, fitnesses.tolist(), episode_fitness, episode_actions):
+                fitness_cache.store(all_genomes[i], keys[i], fitness, episodes, actions)
+
+
+def play_locally(genomes: list, config, seeds: list, pool=None) -> tuple[list[list[float]], list | None]:
+    """Episode fitness of the genomes, played in this process or split over the processes of pool,
+    and their recorded episodes when the evaluation config records them."""
+    evaluation_config = get_evaluation_config(config)
+    play = record_episodes if evaluation_config.recording() else play_episodes
+    batches = np.array_split(np.array(genomes, dtype=object), worker_count(config))
+    jobs = [(list(batch), config, seeds, evaluation_config.backend, evaluation_config.episode_limits())
+            for batch in batches if len(batch)]
+    if pool is None:
+        results = [play(*job) for job in jobs]
+    elif profiler.enabled or profiler.counting:
+        results = []
+        run = run_profiled if profiler.enabled else run_counted
+        for result, samples in pool.starmap(run, [(play, *job) for job in jobs]):
+            results.append(result)
+            profiler.merge(samples)
+    else:
+        results = pool.starmap(play, jobs)
+
+    if play is play_episodes:
+        return [episodes for batch in results for episodes in batch], None
+    return ([episodes for batch, _ in results for episodes in batch],
+            [episodes for _, batch in results for episodes in batch])
+
+
+def worker_count(config) -> int:
+    num_workers = get_evaluation_config(config).num_workers or multiprocessing.cpu_count()
+    return min(num_workers, config.pop_size)
+
+
+def create_pool(config):
+    """Remote workers when the evaluation config lists them, a local process pool otherwise."""
+    evaluation_config = get_evaluation_config(config)
+    if evaluation_config.workers:
+        return Coordinator(evaluation_config.workers, config, evaluation_config.worker_timeout,
+                           evaluation_config.worker_retries)
+    return multiprocessing.Pool(worker_count(config))
+
+
+def load_config(config_path) -> neat.config.Config:
+    config = neat.config.Config(genome_type(config_path), neat.DefaultReproduction,
+                                species_set_type(config_path), neat.DefaultStagnation,
+                                config_path)
+    config.evaluation_config = EvaluationConfig(config_path)
+    return config
 
 
-def run(config_path):
-    config = neat.config.Config(neat.DefaultGenome, neat.DefaultReproduction,
-                                neat.DefaultSpeciesSet, neat.DefaultStagnation,
-                                config_path)
+def run(config_path, reporters=(), generations: int | None = None):
+    """Trains until the fitness threshold is reached or for the given number of generations and returns the winner.
+    reporters are added after the built-in ones."""
+    config = load_config(config_path)
 
     current_time = datetime.now().strftime("%d.%m.%Y %H_%M")
-    GenerationCounter.current_time = current_time
     checkpoints_dir_name = f"checkpoints {current_time}"
     if not os.path.exists(checkpoints_dir_name):
         os.mkdir(checkpoints_dir_name)
 
-    checkpointer = neat.Checkpointer(True, filename_prefix=f"{checkpoints_dir_name}/checkpoint_generation_")
-    checkpointer.generation = True
-    checkpointer.show_species_detail = True
-
     p = neat.Population(config)
 
     reporter = neat.reporting.StdOutReporter(True)
     reporter.generation = True
     reporter.show_species_detail = True
     p.add_reporter(neat.reporting.StdOutReporter(True))
-    p.add_reporter(checkpointer)
+    p.add_reporter(CheckpointStore(f"{checkpoints_dir_name}/store", config_path))
+    if config.evaluation_config.neat_checkpoints:
+        checkpointer = PopulationCheckpointer(True, filename_prefix=f"{checkpoints_dir_name}/checkpoint_generation_")
+        checkpointer.generation = True
+        checkpointer.show_species_detail = True
+        p.add_reporter(checkpointer)
     stats = neat.StatisticsReporter()
     p.add_reporter(stats)
-
-    winner = p.run(eval_genomes)
-
-    plot_stats(stats)
+    if config.evaluation_config.episodes > 1:
+        p.add_reporter(EpisodeVarianceReporter())
+    if config.evaluation_config.recording():
+        p.add_reporter(ActionLogReporter(checkpoints_dir_name))
+    if config.evaluation_config.profile:
+        p.add_reporter(ProfilingReporter(config.evaluation_config.profile_path))
+
+    # Diagrams and plots are rendered in the background, leaving the block waits for the last of them
+    with ArtifactWorker() as artifacts, create_pool(config) as pool:
+        p.add_reporter(ArtifactReporter(artifacts, checkpoints_dir_name, stats))
+        for reporter in reporters:
+            p.add_reporter(reporter)
+        winner = p.run(partial(eval_genomes, pool=pool), generations)
+        artifacts.submit("final fitness", plot_fitness, statistics_snapshot(stats))
 
     print("Best fitness -> {}".format(winner))
+    return winner
 
 
 def run_learning(file_name: str):
@@ -397,9 +395,14 @@ def run_generation():
     run_generation_checkpoint(checkpoint_path)
 
 
-def run_generation_checkpoint(checkpoint_path: str):
-
-    population = neat.Checkpointer.restore_checkpoint(checkpoint_path)
+def run_generation_checkpoint(checkpoint_path: str, generation: int | None = None):
+    """checkpoint_path is a neat.Checkpointer file or the index of a CheckpointStore,
+    a store restores the generation, the last one by default."""
+    if os.path.basename(checkpoint_path) == CheckpointStore.index_name:
+        store = CheckpointStore(os.path.dirname(checkpoint_path))
+        population = store.restore(load_config(store.config_path), generation)
+    else:
+        population = neat.Checkpointer.restore_checkpoint(checkpoint_path)
     reporter = neat.reporting.StdOutReporter(True)
     reporter.generation = True
     reporter.show_species_detail = True
@@ -408,16 +411,29 @@ def run_generation_checkpoint(checkpoint_path: str):
     population.add_reporter(stats)
 
     try:
-
-        winner = population.run(eval_genomes, n=1)
+        winner = population.run(partial(eval_genomes, headless=False), n=1)
+    except GameClosed:
+        return
     except Exception:
+        import pygame
         pygame.quit()
+        game_window.cache_clear()
+        raise
 
     # plot_stats(stats)
 
     print("Best fitness -> {}".format(winner))
 
 
+def run_replay(log_path: str, genome_key: int | None = None, episode: int = 0, seek: int = 0, speed: int = 1):
+    """Shows an episode of an actions_generation_N.npz file written next to the checkpoints."""
+    log = ActionLog(log_path)
+    genome_key = log.best_genome_key() if genome_key is None else genome_key
+    fitness = watch_episode(log, genome_key, episode, seek, speed)
+    print(f"Genome {genome_key}, episode {episode}: recorded fitness "
+          f"{log.episode_fitness[log.rows[genome_key], episode]:.3f}, shown {fitness:.3f}")
+
+
 def choose_checkpoint_directory(chckpoints: [str]) -> str:
     value = ""
     while not (type(value) is int):
@@ -0,0 +1,242 @@
+"""Analytic breakout physics in NumPy, an alternative to the pymunk backend of BatchBreakoutEnv.
+
+The game only needs a constant speed ball, a paddle, three walls, a bottom sensor and the brick grid,
+so instead of a general physics space every game is a few numbers and a brick occupancy bitmap.
+The ball is swept along its path each frame against the walls, the paddle and the expanded boxes of the bricks
+around it, for all games at once. Rules follow BreakoutEnv: elastic bounces, the paddle normal tilted by the hit
+offset like in its pre_solve callback, a paddle hit paid once per contact of a ball coming down and at most once
+every min_hit_interval frames like in its begin callback, bricks removed once hit and the game over once the ball
+reaches the bottom sensor.
+
+The games are not the same frame by frame. pymunk finds a collision only after the ball moved into a surface, so
+every bounce may be a frame of travel off and a ball reaching the paddle a frame later leaves it at a slightly
+different angle. At the seam between two bricks pymunk pushes the ball out sideways and it drills up through both
+columns, here it bounces off the face it reaches first. Over whole episodes fitness only ranks genomes alike,
+see benchmarks/parity_backends.py. Every step costs a few dozen array operations whatever the batch size, the
+engine gets faster than pymunk from about sixty games per batch.
+"""
+
+import math
+import random
+
+import numpy as np
+
+from sources.breakout_env import (width, height, fps, ball_speed, player_speed, wall_offset, wall_radius,
+                                  ball_radius, player_y, player_half_length, player_radius, brick_columns,
+                                  brick_rows, brick_size, brick_origin, serve, frame_reward, min_hit_interval)
+from sources.batch_env import event_rewards, PLAYER_HIT, BRICK_DESTROYED, BALL_LOST
+
+# Ball centre limits
+left_limit = wall_offset + wall_radius + ball_radius
+right_limit = width - wall_offset - wall_radius - ball_radius
+top_limit = height - wall_offset - wall_radius - ball_radius
+bottom_limit = wall_offset + wall_radius + ball_radius
+
+# Paddle centre limits, its round ends stop at the walls
+player_min_x = wall_offset + wall_radius + player_radius + player_half_length
+player_max_x = width - player_min_x
+
+# Paddle and bricks grown by the ball radius, so the ball is tested as a point
+player_reach_x = player_half_length + player_radius + ball_radius
+player_reach_y = player_radius + ball_radius
+brick_reach_x = brick_size[0] / 2 + ball_radius
+brick_reach_y = brick_size[1] / 2 + ball_radius
+
+# Collisions a ball can have during one frame
+max_bounces = 4
+
+
+class NumpyBatchBreakoutEnv:
+    """Drop-in replacement for BatchBreakoutEnv working on arrays only."""
+
+    def __init__(self, size: int, dt: float = 1.0 / fps):
+        self.dt = dt
+        self.frame_reward = frame_reward * (dt * fps)
+        self.hit_interval = min_hit_interval(dt)
+        self.resize(size)
+
+        # Brick cells that can be touched during one frame, relative to the cell of the ball's lower left reach
+        travel = ball_speed * dt
+        columns = math.ceil((travel + 2 * brick_reach_x) / brick_size[0]) + 1
+        rows = math.ceil((travel + 2 * brick_reach_y) / brick_size[1]) + 1
+        column_offsets, row_offsets = np.meshgrid(np.arange(columns), np.arange(rows), indexing="ij")
+        self._column_offsets = column_offsets.ravel()
+        self._row_offsets = row_offsets.ravel()
+
+    def resize(self, size: int):
+        """Makes it a batch of size games, the next reset starts them."""
+        self.size = size
+        self.done = np.zeros(size, dtype=bool)
+        self.steps = np.zeros(size, dtype=np.int64)
+        # Step of the last paddle hit that scored in every game
+        self.last_hit_step = np.zeros(size, dtype=np.int64)
+        self.ball = np.zeros((size, 2))
+        self.velocity = np.zeros((size, 2))
+        self.player_x = np.zeros(size)
+        self.bricks = np.ones((size, brick_columns, brick_rows), dtype=bool)
+        # Events of the last step of every game
+        self.events = np.zeros((size, len(event_rewards)))
+        self._observation = np.zeros((size, 4))
+
+    def reset(self, seeds=None):
+        """Starts new games. seeds is one seed for every game or a sequence with a seed per game.
+        A seed serves the ball from the same position in the same direction as BreakoutEnv.reset with that seed."""
+        if seeds is None or np.isscalar(seeds):
+            seeds = [seeds] * self.size
+        self.done[:] = False
+        self.steps[:] = 0
+        self.last_hit_step[:] = -self.hit_interval
+        self.events[:] = 0
+        serves = [serve(random.Random(seed)) for seed in seeds]
+        self.velocity[:] = [direction for direction, _ in serves]
+        self.player_x[:] = [width / 2 + offset for _, offset in serves]
+        self.ball[:, 0] = self.player_x
+        self.ball[:, 1] = player_y + 40
+        self.bricks[:] = True
+        return self.observation()
+
+    def observation(self) -> np.ndarray:
+        """The array is reused, its values change with the next step."""
+        observation = self._observation
+        observation[:, :2] = self.ball
+        np.abs(self.player_x - self.ball[:, 0], out=observation[:, 2])
+        np.abs(player_y - self.ball[:, 1], out=observation[:, 3])
+        return observation
+
+    def step(self, actions) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        running = ~self.done
+        events = self.events
+        events[:] = 0
+
+        self.player_x[running] += np.asarray(actions)[running] * player_speed * self.dt
+        np.clip(self.player_x, player_min_x, player_max_x, out=self.player_x)
+
+        # Part of the frame each ball still has to travel
+        remaining = np.where(running, 1.0, 0.0)
+        for _ in range(max_bounces):
+            moving = np.flatnonzero(remaining > 0)
+            if moving.size == 0:
+                break
+            self._bounce(moving, remaining, events)
+
+        lost = running & (self.ball[:, 1] <= bottom_limit)
+        events[lost, BALL_LOST] += 1
+        self.done |= lost
+
+        # Like constant_velocity, the speed is restored after the ball moved
+        self.velocity[running] *= ball_speed / np.linalg.norm(self.velocity[running], axis=1, keepdims=True)
+
+        self.steps += running
+        rewards = events @ event_rewards
+        rewards[running] += self.frame_reward
+        return self.observation(), rewards, self.done.copy()
+
+    def _bounce(self, games: np.ndarray, remaining: np.ndarray, events: np.ndarray):
+        """Moves the balls of the games until their first collision or the end of the frame."""
+        position = self.ball[games]
+        delta = self.velocity[games] * (self.dt * remaining[games])[:, None]
+        count = games.size
+
+        # Walls, time is the part of delta travelled before the hit
+        with np.errstate(divide="ignore", invalid="ignore"):
+            wall_x = np.where(delta[:, 0] < 0, (left_limit - position[:, 0]) / delta[:, 0],
+                              np.where(delta[:, 0] > 0, (right_limit - position[:, 0]) / delta[:, 0], np.inf))
+            wall_y = np.where(delta[:, 1] > 0, (top_limit - position[:, 1]) / delta[:, 1], np.inf)
+        wall_x = np.maximum(wall_x, 0)
+        wall_y = np.maximum(wall_y, 0)
+
+        # Paddle
+        player_time, player_x_axis = sweep(position, delta,
+                                           self.player_x[games] - player_reach_x, self.player_x[games] + player_reach_x,
+                                           np.full(count, player_y - player_reach_y),
+                                           np.full(count, player_y + player_reach_y))
+
+        # Bricks around the path of the ball
+        low = np.minimum(position, position + delta)
+        first_column = np.floor((low[:, 0] - brick_reach_x - brick_origin[0] + brick_size[0] / 2) / brick_size[0])
+        first_row = np.floor((low[:, 1] - brick_reach_y - brick_origin[1] + brick_size[1] / 2) / brick_size[1])
+        columns = first_column.astype(np.int64)[:, None] + self._column_offsets
+        rows = first_row.astype(np.int64)[:, None] + self._row_offsets
+        inside = (columns >= 0) & (columns < brick_columns) & (rows >= 0) & (rows < brick_rows)
+        columns_clipped = np.clip(columns, 0, brick_columns - 1)
+        rows_clipped = np.clip(rows, 0, brick_rows - 1)
+        present = inside & self.bricks[games[:, None], columns_clipped, rows_clipped]
+
+        centre_x = brick_origin[0] + columns * brick_size[0]
+        centre_y = brick_origin[1] + rows * brick_size[1]
+        brick_times, brick_x_axes = sweep(position[:, None, :], delta[:, None, :],
+                                          centre_x - brick_reach_x, centre_x + brick_reach_x,
+                                          centre_y - brick_reach_y, centre_y + brick_reach_y)
+        brick_times = np.where(present, brick_times, np.inf)
+        nearest_brick = np.argmin(brick_times, axis=1)
+        brick_time = brick_times[np.arange(count), nearest_brick]
+        brick_x_axis = brick_x_axes[np.arange(count), nearest_brick]
+
+        # The earliest collision wins
+        times = np.stack([wall_x, wall_y, player_time, brick_time], axis=1)
+        kind = np.argmin(times, axis=1)
+        time = times[np.arange(count), kind]
+        hit = time <= 1
+        time = np.where(hit, time, 1.0)
+
+        self.ball[games] = position + delta * time[:, None]
+        remaining[games] = np.where(hit, remaining[games] * (1 - time), 0.0)
+
+        velocity = self.velocity[games]
+        velocity[hit & (kind == 0), 0] *= -1
+        velocity[hit & (kind == 1), 1] *= -1
+
+        player_hit = hit & (kind == 2)
+        # Like BreakoutEnv._hit_player, a hit scores when the ball comes down onto the paddle and the last one is
+        # min_hit_interval frames ago
+        scoring = games[player_hit & (velocity[:, 1] < 0)]
+        scoring = scoring[self.steps[scoring] - self.last_hit_step[scoring] >= self.hit_interval]
+        events[scoring, PLAYER_HIT] += 1
+        self.last_hit_step[scoring] = self.steps[scoring]
+        side_hit = player_hit & player_x_axis
+        velocity[side_hit, 0] *= -1
+        top_hit = player_hit & ~player_x_axis
+        if top_hit.any():
+            # Same normal as BreakoutEnv._bounce_from_player: tilted by the hit offset from the paddle centre
+            offset = self.player_x[games[top_hit]] - self.ball[games[top_hit], 0]
+            angle = offset / (2 * player_half_length) / 2
+            normal = np.stack([-np.sin(angle), np.cos(angle)], axis=1)
+            v = velocity[top_hit]
+            v -= 2 * np.sum(v * normal, axis=1, keepdims=True) * normal
+            v[:, 1] = np.abs(v[:, 1])
+            velocity[top_hit] = v
+
+        brick_hit = hit & (kind == 3)
+        velocity[brick_hit & brick_x_axis, 0] *= -1
+        velocity[brick_hit & ~brick_x_axis, 1] *= -1
+        hit_games = np.flatnonzero(brick_hit)
+        self.bricks[games[hit_games], columns[hit_games, nearest_brick[hit_games]],
+                    rows[hit_games, nearest_brick[hit_games]]] = False
+        events[games[brick_hit], BRICK_DESTROYED] += 1
+
+        self.velocity[games] = velocity
+
+
+def sweep(position, delta, left, right, bottom, top) -> tuple[np.ndarray, np.ndarray]:
+    """Swept point vs axis aligned box test. Returns the part of delta travelled before entering the box,
+    inf when it is not entered, and whether it is entered through a vertical side."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x1 = (left - position[..., 0]) / delta[..., 0]
+        x2 = (right - position[..., 0]) / delta[..., 0]
+        y1 = (bottom - position[..., 1]) / delta[..., 1]
+        y2 = (top - position[..., 1]) / delta[..., 1]
+
+    # A point standing still on an axis is inside the slab for all times or never
+    inside_x = (left <= position[..., 0]) & (position[..., 0] <= right)
+    inside_y = (bottom <= position[..., 1]) & (position[..., 1] <= top)
+    still_x = delta[..., 0] == 0
+    still_y = delta[..., 1] == 0
+    enter_x = np.where(still_x, np.where(inside_x, -np.inf, np.inf), np.minimum(x1, x2))
+    exit_x = np.where(still_x, np.where(inside_x, np.inf, -np.inf), np.maximum(x1, x2))
+    enter_y = np.where(still_y, np.where(inside_y, -np.inf, np.inf), np.minimum(y1, y2))
+    exit_y = np.where(still_y, np.where(inside_y, np.inf, -np.inf), np.maximum(y1, y2))
+
+    enter = np.maximum(enter_x, enter_y)
+    leave = np.minimum(exit_x, exit_y)
+    hit = (enter >= 0) & (enter < leave) & (enter <= 1)
+    return np.where(hit, enter, np.inf), enter_x > enter_y
@@ -0,0 +1,139 @@
+"""Time spent in the phases of a generation.
+
+Code wraps its phases in `with profiler.phase(name):` and counts work with profiler.count. While the profiler is
+disabled a phase is one shared do-nothing context manager and nothing is recorded. ProfilingReporter enables it
+for the generations of its run and turns the samples of every generation into p50/p95 per phase, steps/sec and
+genomes/sec. With counting on and the profiler disabled only the counters are kept, which costs as little as a
+disabled profiler.
+Pool workers have their own profiler, run_profiled and run_counted bring their samples back to the training process.
+"""
+
+import json
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+import neat
+import numpy as np
+
+_disabled = nullcontext()
+
+
+class _Phase:
+    __slots__ = ("samples", "start")
+
+    def __init__(self, samples: list):
+        self.samples = samples
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.samples.append(time.perf_counter() - self.start)
+
+
+class Profiler:
+    def __init__(self):
+        self.enabled = False
+        # Counters are kept while enabled or counting, phases are only timed while enabled
+        self.counting = False
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+
+    def phase(self, name: str):
+        if not self.enabled:
+            return _disabled
+        return _Phase(self.samples[name])
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled or self.counting:
+            self.counters[name] += amount
+
+    def take(self) -> tuple[dict, dict]:
+        """Returns the samples and counters recorded so far and starts over."""
+        taken = dict(self.samples), dict(self.counters)
+        self.samples = defaultdict(list)
+        self.counters = defaultdict(int)
+        return taken
+
+    def merge(self, taken: tuple[dict, dict]):
+        samples, counters = taken
+        for name, durations in samples.items():
+            self.samples[name].extend(durations)
+        for name, amount in counters.items():
+            self.counters[name] += amount
+
+
+# Every process has one profiler
+profiler = Profiler()
+
+
+def run_profiled(function, *args):
+    """Runs function(*args) in a pool worker with its profiler enabled, returns the result and the samples."""
+    profiler.enabled = True
+    profiler.take()
+    try:
+        return function(*args), profiler.take()
+    finally:
+        profiler.enabled = False
+
+
+def run_counted(function, *args):
+    """run_profiled that only keeps the counters, for a training process that counts without profiling."""
+    profiler.counting = True
+    profiler.take()
+    try:
+        return function(*args), profiler.take()
+    finally:
+        profiler.counting = False
+
+
+def summarize(samples: dict, counters: dict, seconds: float) -> dict:
+    phases = {}
+    for name, durations in sorted(samples.items()):
+        durations = np.array(durations) * 1000
+        phases[name] = {"count": len(durations), "total_ms": float(durations.sum()),
+                        "p50_ms": float(np.percentile(durations, 50)), "p95_ms": float(np.percentile(durations, 95))}
+    return {
+        "seconds": seconds,
+        "steps_per_second": counters.get("steps", 0) / seconds if seconds else 0.0,
+        "genomes_per_second": counters.get("genomes", 0) / seconds if seconds else 0.0,
+        "counters": counters,
+        "phases": phases,
+    }
+
+
+class ProfilingReporter(neat.reporting.BaseReporter):
+    """Enables the profiler during every generation and reports it, appending it to a JSON lines file when one is
+    given. Between generations and after the run the profiler is disabled again."""
+
+    def __init__(self, path: str | None = None):
+        self.path = path
+        self.generation = None
+        self.generation_start = None
+        self.summaries = []
+
+    def start_generation(self, generation):
+        self.generation = generation
+        self.generation_start = time.perf_counter()
+        profiler.take()
+        profiler.enabled = True
+
+    def end_generation(self, config, population, species_set):
+        profiler.enabled = False
+        summary = summarize(*profiler.take(), time.perf_counter() - self.generation_start)
+        summary["generation"] = self.generation
+        self.summaries.append(summary)
+
+        print(f"Profile of generation {self.generation}: {summary['seconds']:.2f} sec, "
+              f"{summary['steps_per_second']:.0f} steps/sec, {summary['genomes_per_second']:.1f} genomes/sec")
+        for name, phase in summary["phases"].items():
+            print(f"  {name:<20} {phase['count']:>9} x  p50 {phase['p50_ms']:9.3f} ms  p95 {phase['p95_ms']:9.3f} ms"
+                  f"  total {phase['total_ms'] / 1000:8.2f} sec")
+        if self.path is not None:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(summary) + "\n")
+
+    def found_solution(self, config, generation, best):
+        # The run stops before the generation ends
+        profiler.enabled = False
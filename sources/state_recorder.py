@@ -0,0 +1,48 @@
+"""Game state snapshots in a structured NumPy array.
+
+Attach a StateRecorder to BreakoutEnv.recorder and every step writes one row into a preallocated array,
+without a recorder nothing is recorded and nothing is allocated for it.
+"""
+
+import numpy as np
+
+state_dtype = np.dtype([
+    ("step", np.int64),
+    ("ball_position", np.float64, 2),
+    ("ball_velocity", np.float64, 2),
+    ("player_position", np.float64, 2),
+    ("player_velocity", np.float64, 2),
+    ("bricks", np.int32),
+    ("reward", np.float64),
+    ("done", np.bool_),
+])
+
+
+class StateRecorder:
+    """Rows are stored in an array of capacity rows that doubles once full."""
+
+    def __init__(self, capacity: int = 1024):
+        self.buffer = np.zeros(capacity, dtype=state_dtype)
+        self.size = 0
+
+    @property
+    def states(self) -> np.ndarray:
+        """Recorded rows, a view into the buffer."""
+        return self.buffer[:self.size]
+
+    def clear(self):
+        self.size = 0
+
+    def record(self, env, reward: float):
+        if self.size == len(self.buffer):
+            self.buffer = np.concatenate([self.buffer, np.zeros(len(self.buffer), dtype=state_dtype)])
+        row = self.buffer[self.size]
+        row["step"] = env.steps
+        row["ball_position"] = env.ball_body.position
+        row["ball_velocity"] = env.ball_body.velocity
+        row["player_position"] = env.player_body.position
+        row["player_velocity"] = env.player_body.velocity
+        row["bricks"] = np.count_nonzero(env.bricks)
+        row["reward"] = reward
+        row["done"] = env.done
+        self.size += 1
@@ -0,0 +1,152 @@
+"""Training in a background process that reports its progress.
+
+The GUI must keep handling events while a run takes hours, so TrainingProcess runs sources.main.run in a process of
+its own. ProgressReporter sends an event after every generation over a bounded queue: the best and mean fitness,
+the species count, the frames played per second and, when the number of generations is known, the time left.
+A full queue drops progress events, the GUI only ever needs the newest. The events ending the run always arrive.
+Pause and cancel take effect at the start of the next generation, checkpoints of the finished ones stay.
+
+Events are dicts with a type: generation, paused, resumed and finally finished, cancelled or error.
+"""
+
+import multiprocessing
+import os
+import queue
+import time
+import traceback
+
+import neat
+import numpy as np
+
+from sources.profiling import profiler
+
+# Progress events waiting for the GUI, the oldest are the first to lose their meaning
+queue_size = 64
+# Seconds an event ending the run waits for room in the queue
+final_event_timeout = 5.0
+
+
+class TrainingCancelled(Exception):
+    """The GUI cancelled the run between two generations."""
+
+
+class ProgressReporter(neat.reporting.BaseReporter):
+    """Sends the progress of every generation to events and waits at the start of a generation while paused.
+    Turns on the profiler's counters to count the frames played, its phases stay untimed."""
+
+    def __init__(self, events, cancel, pause, generations: int | None = None):
+        self.events = events
+        self.cancel = cancel
+        self.pause = pause
+        self.generations = generations
+        self.generation = None
+        self.generation_start = None
+        self.generation_seconds = []
+        self.progress = {}
+        self.dropped = 0
+        profiler.counting = True
+
+    def send(self, event: dict):
+        try:
+            self.events.put_nowait({**event, "dropped": self.dropped})
+        except queue.Full:
+            self.dropped += 1
+
+    def start_generation(self, generation):
+        if self.pause.is_set() and not self.cancel.is_set():
+            self.send({"type": "paused", "generation": generation})
+            while self.pause.is_set() and not self.cancel.is_set():
+                self.cancel.wait(0.1)
+            self.send({"type": "resumed", "generation": generation})
+        if self.cancel.is_set():
+            raise TrainingCancelled(f"Cancelled before generation {generation}")
+        self.generation = generation
+        self.generation_start = time.perf_counter()
+        # Only this generation is counted, and the samples of a long run do not pile up
+        profiler.take()
+
+    def post_evaluate(self, config, population, species, best_genome):
+        fitness = np.array([g.fitness for g in population.values() if g.fitness is not None])
+        seconds = time.perf_counter() - self.generation_start
+        self.progress = {"generation": self.generation, "best_fitness": float(best_genome.fitness),
+                         "mean_fitness": float(fitness.mean()) if len(fitness) else None,
+                         "steps_per_second": profiler.counters.get("steps", 0) / seconds if seconds else 0.0}
+
+    def end_generation(self, config, population, species_set):
+        self.generation_seconds.append(time.perf_counter() - self.generation_start)
+        eta = None
+        if self.generations is not None:
+            remaining = self.generations - len(self.generation_seconds)
+            eta = max(remaining, 0) * float(np.mean(self.generation_seconds[-10:]))
+        self.send({"type": "generation", **self.progress, "species": len(species_set.species),
+                   "seconds": self.generation_seconds[-1], "eta": eta})
+
+
+def train(config_path: str, events, cancel, pause, generations: int | None = None, directory: str | None = None):
+    """Entry of the training process. Runs the training in directory, the working directory by default,
+    and ends with a finished, cancelled or error event."""
+    if directory is not None:
+        os.chdir(directory)
+    from sources.main import run
+    reporter = ProgressReporter(events, cancel, pause, generations)
+    try:
+        winner = run(config_path, [reporter], generations)
+        final = {"type": "finished", "best_fitness": winner.fitness, "generation": reporter.generation}
+    except TrainingCancelled as error:
+        final = {"type": "cancelled", "generation": reporter.generation, "message": str(error)}
+    except Exception as error:
+        final = {"type": "error", "error": repr(error), "traceback": traceback.format_exc(),
+                 "generation": reporter.generation}
+    try:
+        events.put(final, timeout=final_event_timeout)
+    except queue.Full:
+        pass
+
+
+class TrainingProcess:
+    """Controls a training run in a background process from the GUI thread, none of its methods block."""
+
+    def __init__(self, config_path: str, generations: int | None = None, directory: str | None = None):
+        # A forked Tk process breaks, spawned processes start from scratch
+        context = multiprocessing.get_context("spawn")
+        self.events = context.Queue(queue_size)
+        self.cancel_event = context.Event()
+        self.pause_event = context.Event()
+        self.process = context.Process(target=train, name="training",
+                                       args=(os.path.abspath(config_path), self.events, self.cancel_event,
+                                             self.pause_event, generations, directory))
+        self.finished = False
+
+    def start(self):
+        self.process.start()
+
+    def poll(self) -> list[dict]:
+        """Events that arrived since the last call. A process that died without saying so ends with an error."""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        if any(event["type"] in ("finished", "cancelled", "error") for event in events):
+            self.finished = True
+        elif not self.finished and self.process.exitcode is not None and self.events.empty():
+            self.finished = True
+            events.append({"type": "error", "error": f"The training process exited with code {self.process.exitcode}",
+                           "traceback": "", "generation": None})
+        return events
+
+    def pause(self):
+        self.pause_event.set()
+
+    def resume(self):
+        self.pause_event.clear()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def is_alive(self) -> bool:
+        return self.process.is_alive()
+
+    def join(self, timeout: float | None = None):
+        self.process.join(timeout)
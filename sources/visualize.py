@@ -3,6 +3,7 @@ import warnings
 import graphviz
 import matplotlib.pyplot as plt
 import numpy as np
+from matplotlib.figure import Figure
 
 
 def plot_stats(statistics, ylog=False, view=False, filename='avg_fitness.svg'):
@@ -16,24 +17,26 @@ def plot_stats(statistics, ylog=False, view=False, filename='avg_fitness.svg'):
     avg_fitness = np.array(statistics.get_fitness_mean())
     stdev_fitness = np.array(statistics.get_fitness_stdev())
 
-    plt.plot(generation, avg_fitness, 'b-', label="average")
-    plt.plot(generation, avg_fitness - stdev_fitness, 'g-.', label="-1 sd")
-    plt.plot(generation, avg_fitness + stdev_fitness, 'g-.', label="+1 sd")
-    plt.plot(generation, best_fitness, 'r-', label="best")
-
-    plt.title("Population's average and best fitness")
-    plt.xlabel("Generations")
-    plt.ylabel("Fitness")
-    plt.grid()
-    plt.legend(loc="best")
+    # Without a window to show the plot is drawn on a bare Figure, which works from any thread
+    fig = plt.figure() if view else Figure()
+    ax = fig.subplots()
+    ax.plot(generation, avg_fitness, 'b-', label="average")
+    ax.plot(generation, avg_fitness - stdev_fitness, 'g-.', label="-1 sd")
+    ax.plot(generation, avg_fitness + stdev_fitness, 'g-.', label="+1 sd")
+    ax.plot(generation, best_fitness, 'r-', label="best")
+
+    ax.set_title("Population's average and best fitness")
+    ax.set_xlabel("Generations")
+    ax.set_ylabel("Fitness")
+    ax.grid()
+    ax.legend(loc="best")
     if ylog:
-        plt.gca().set_yscale('symlog')
+        ax.set_yscale('symlog')
 
-    plt.savefig(filename)
+    fig.savefig(filename)
     if view:
         plt.show()
-
-    plt.close()
+        plt.close(fig)
 
 
 def plot_spikes(spikes, view=False, filename=None, title=None):
@@ -176,6 +179,9 @@ def draw_net(config, genome, view=False, filename=None, node_names=None, show_di
             width = str(0.1 + abs(cg.weight / 5.0))
             dot.edge(a, b, _attributes={'style': style, 'color': color, 'penwidth': width})
 
-    dot.render(filename)
+    # graphviz appends the format to the file name itself
+    if filename is not None and filename.endswith('.' + fmt):
+        filename = filename[:-len(fmt) - 1]
+    dot.render(filename, view=view, cleanup=True)
 
     return dot
\ No newline at end of file